@@ -11,10 +11,17 @@ import uuid
 # from database.connection import get_db  # Commented out - not needed with Supabase SDK
 from database.models import Analysis, UploadedFile, User, RateLimit, Profile
 from security.auth import decode_jwt_token
-from tasks.analysis_tasks import analyze_cv_background
+from tasks.analysis_tasks import analyze_cv_background, compare_candidates_background
+from tasks.celery_app import celery_app
 from supabase import create_client, Client
 import os
+import time
 from cv_analysis import CVAnalyzer, CandidateComparisonMatrix
+from cv_analysis.candidates import comparison_jobs
+from cv_analysis.checkpoints import analysis_run_key, completed_run_key
+from cv_analysis.circuit_breaker import CircuitOpenError, mistral_circuit_breaker
+from cv_analysis.partial_results import partial_results as partial_result_store
+from cv_analysis.rate_limiter import RateLimitTimeoutError
 import base64
 from config import BUCKET_NAME, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
 
@@ -28,6 +35,18 @@ if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment variables")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
+def _circuit_open(e: CircuitOpenError) -> HTTPException:
+    """503 с Retry-After, пока circuit breaker Mistral открыт"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(int(e.retry_after))}
+    )
+
+def _rate_limited(e: RateLimitTimeoutError) -> HTTPException:
+    """503, если квота Mistral не освободилась за время ожидания"""
+    return HTTPException(status_code=503, detail=str(e))
+
 # Pydantic models
 class AnalysisCreate(BaseModel):
     job_description: str
@@ -37,6 +56,9 @@ class AnalysisResponse(BaseModel):
     job_description: str
     status: str
     results: Optional[Dict[str, Any]] = None
+    partial_results: Optional[Dict[str, Any]] = None
+    processing_time: Optional[float] = None
+    stage_timings: Optional[Dict[str, float]] = None
     created_at: str
     updated_at: datetime
 
@@ -48,9 +70,10 @@ class DetailedAnalysisRequest(BaseModel):
     cv_text: str
     job_description: Optional[str] = ""
 
-class ComparisonMatrixResponse(BaseModel):
-    comparison_matrix: Dict[str, Any]
-    metadata: Dict[str, Any]
+class ComparisonJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
 
 class CandidateInsightsResponse(BaseModel):
     insights: Dict[str, Any]
@@ -121,7 +144,7 @@ async def analyze_cv_detailed(
         profile_id = decode_jwt_token(credentials.credentials)
         
         # Perform detailed analysis
-        result = cv_analyzer.analyze_cv_detailed(
+        result = await cv_analyzer.analyze_cv_detailed_async(
             cv_text=request.cv_text,
             job_description=request.job_description or ""
         )
@@ -136,44 +159,41 @@ async def analyze_cv_detailed(
             }
         }
         
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except RateLimitTimeoutError as e:
+        # Квота Mistral исчерпана - простой анализ ждал бы ее снова
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-@router.post("/compare-candidates", response_model=ComparisonMatrixResponse)
+@router.post("/compare-candidates", response_model=ComparisonJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def compare_candidates(
     request: CandidateComparisonRequest,
     credentials=Depends(bearer_scheme)
 ):
     """
-    Generate comparison matrix for top candidates
+    Start a background comparison of top candidates (uploaded file ids).
+    Returns a job handle; poll GET /compare-candidates/{job_id} for progress and the matrix.
     """
     try:
         profile_id = decode_jwt_token(credentials.credentials)
         
-        # Get candidate data from database
-        candidates_data = []
-        for candidate_id in request.candidate_ids:
-            resp = supabase.table("uploaded_files").select("*").eq("id", candidate_id).single().execute()
-            if resp.data and resp.data.get("analysis_results"):
-                candidates_data.append(resp.data["analysis_results"])
-        
-        if not candidates_data:
-            raise HTTPException(status_code=404, detail="No candidate data found")
+        if not request.candidate_ids:
+            raise HTTPException(status_code=400, detail="candidate_ids must not be empty")
         
-        # Generate comparison matrix
-        comparison_result = comparison_matrix.generate_comparison_matrix(
-            candidates_data=candidates_data,
-            top_n=request.top_n
+        # Сравнение (загрузка кандидатов и запрос к модели) выполняется в Celery;
+        # владелец записывается до постановки, чтобы статус был доступен сразу
+        job_id = str(uuid.uuid4())
+        comparison_jobs.register(job_id, profile_id)
+        compare_candidates_background.apply_async(
+            args=(profile_id, request.candidate_ids, request.top_n or 3), task_id=job_id
         )
         
-        return ComparisonMatrixResponse(
-            comparison_matrix=comparison_result,
-            metadata={
-                "generated_at": datetime.utcnow().isoformat(),
-                "user_id": profile_id,
-                "candidates_compared": len(candidates_data),
-                "top_n": request.top_n
-            }
+        return ComparisonJobResponse(
+            job_id=job_id,
+            status="queued",
+            status_url=f"/api/v1/analysis/compare-candidates/{job_id}"
         )
         
     except HTTPException:
@@ -181,6 +201,47 @@ async def compare_candidates(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Comparison failed: {str(e)}")
 
+@router.get("/compare-candidates/{job_id}")
+async def get_comparison_job(
+    job_id: str = Path(..., description="Comparison job ID"),
+    credentials=Depends(bearer_scheme)
+):
+    """
+    Status, progress and result of a background candidate comparison
+    """
+    try:
+        profile_id = decode_jwt_token(credentials.credentials)
+        
+        # Владелец проверяется для любого состояния. Неизвестный или истекший id
+        # в Celery выглядит как PENDING, но владельца у него нет;
+        # сравнения других пользователей не раскрываются
+        if comparison_jobs.owner(job_id) != profile_id:
+            raise HTTPException(status_code=404, detail="Comparison job not found or expired")
+        
+        job = celery_app.AsyncResult(job_id)
+        state = job.state
+        if state in ("PENDING", "RECEIVED"):
+            return {"job_id": job_id, "status": "queued"}
+        if state == "RETRY":
+            return {"job_id": job_id, "status": "retrying"}
+        if state == "FAILURE":
+            return {"job_id": job_id, "status": "failed", "error": str(job.info)}
+        
+        info = job.info if isinstance(job.info, dict) else {}
+        if state == "PROGRESS":
+            progress = {key: value for key, value in info.items() if key != "user_id"}
+            return {"job_id": job_id, "status": "processing", "progress": progress}
+        if state == "STARTED":
+            return {"job_id": job_id, "status": "processing"}
+        
+        result = {key: value for key, value in info.items() if key != "user_id"}
+        return {"job_id": job_id, **result}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get comparison job: {str(e)}")
+
 @router.post("/analyze-multiple-candidates")
 async def analyze_multiple_candidates(
     request: CandidateComparisonRequest,
@@ -203,7 +264,7 @@ async def analyze_multiple_candidates(
             raise HTTPException(status_code=404, detail="No candidate data found")
         
         # Analyze candidates together
-        analysis_result = comparison_matrix.analyze_candidates_together(candidates_data)
+        analysis_result = await comparison_matrix.analyze_candidates_together_async(candidates_data)
         
         return {
             "success": True,
@@ -217,6 +278,10 @@ async def analyze_multiple_candidates(
         
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except RateLimitTimeoutError as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -242,7 +307,7 @@ async def get_hiring_recommendations(
             raise HTTPException(status_code=404, detail="No candidate data found")
         
         # Get hiring recommendations
-        recommendations = comparison_matrix.get_hiring_recommendations(candidates_data)
+        recommendations = await comparison_matrix.get_hiring_recommendations_async(candidates_data)
         
         return {
             "success": True,
@@ -256,6 +321,10 @@ async def get_hiring_recommendations(
         
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except RateLimitTimeoutError as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Recommendations failed: {str(e)}")
 
@@ -402,7 +471,7 @@ async def export_comparison_csv(
             raise HTTPException(status_code=404, detail="No candidate data found")
         
         # Generate comparison matrix
-        comparison_result = comparison_matrix.generate_comparison_matrix(
+        comparison_result = await comparison_matrix.generate_comparison_matrix_async(
             candidates_data=candidates_data,
             top_n=request.top_n
         )
@@ -424,6 +493,10 @@ async def export_comparison_csv(
         
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except RateLimitTimeoutError as e:
+        raise _rate_limited(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"CSV export failed: {str(e)}")
 
@@ -450,18 +523,13 @@ async def get_analysis(
         if analysis["user_id"] != profile_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        # Get uploaded files for this analysis
-        files_resp = supabase.table("uploaded_files").select("*").eq("analysis_id", analysis_id).execute()
-        files = files_resp.data or []
+        # Собранный результат анализа (лучший файл, candidates, analysis_metadata)
+        results = analysis.get("results") if analysis["status"] == "completed" else None
         
-        # If analysis is completed, get the results from the first file
-        results = None
-        if analysis["status"] == "completed" and files:
-            # Get results from the first file that has analysis_results
-            for file in files:
-                if file.get("analysis_results"):
-                    results = file["analysis_results"]
-                    break
+        # Пока анализ идет, отдаем уже сгенерированные секции
+        partial = None
+        if analysis["status"] == "processing":
+            partial = partial_result_store.get(analysis_id) or None
         
         # Format dates
         created_at = analysis.get("created_at", "")
@@ -479,6 +547,9 @@ async def get_analysis(
             job_description=analysis["job_description"],
             status=analysis["status"],
             results=results,
+            partial_results=partial,
+            processing_time=analysis.get("processing_time"),
+            stage_timings=analysis.get("stage_timings"),
             created_at=created_at,
             updated_at=updated_at
         )
@@ -518,11 +589,15 @@ async def retry_analysis(
         if not files:
             raise HTTPException(status_code=400, detail="No files found for analysis")
         
+        # Результат для тех же вакансии и файлов уже сохранен - статус не сбрасываем
+        if completed_run_key(analysis) == analysis_run_key(analysis_id, analysis.get("job_description", ""), files):
+            return {"success": True, "message": "Analysis is already completed for the same input"}
+        
         # Update status to pending
         supabase.table("analyses").update({"status": "pending"}).eq("id", analysis_id).execute()
         
         # Trigger background analysis
-        analyze_cv_background.delay(analysis_id)
+        analyze_cv_background.delay(analysis_id, enqueued_at=time.time())
         
         return {"success": True, "message": "Analysis retry initiated"}
         
@@ -561,11 +636,15 @@ async def run_analysis(
         if not files:
             raise HTTPException(status_code=400, detail="No files found for analysis")
         
+        # Результат для тех же вакансии и файлов уже сохранен - статус не сбрасываем
+        if completed_run_key(analysis) == analysis_run_key(analysis_id, analysis.get("job_description", ""), files):
+            return {"success": True, "message": "Analysis is already completed for the same input"}
+        
         # Update status to processing
         supabase.table("analyses").update({"status": "processing"}).eq("id", analysis_id).execute()
         
         # Trigger background analysis
-        analyze_cv_background.delay(analysis_id)
+        analyze_cv_background.delay(analysis_id, enqueued_at=time.time())
         
         return {"success": True, "message": "Analysis started"}
         
@@ -731,6 +810,7 @@ async def get_cv_analysis_status():
     try:
         # Test if the analyzer can be initialized
         test_analyzer = CVAnalyzer()
+        breaker_state = mistral_circuit_breaker.state()
         
         return {
             "new_system_available": True,
@@ -747,7 +827,8 @@ async def get_cv_analysis_status():
             },
             "ai_provider": "Mistral AI",
             "model": os.getenv("MISTRAL_MODEL", "mistral-large-latest"),
-            "status": "operational"
+            "circuit_breaker": breaker_state,
+            "status": "operational" if breaker_state == "closed" else "degraded"
         }
     except Exception as e:
         return {
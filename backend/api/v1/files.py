@@ -2,6 +2,7 @@
 File upload and management endpoints for API v1
 """
 import os
+import time
 import uuid
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
@@ -15,6 +16,7 @@ from supabase import create_client, Client
 from database.models import UploadedFile, Analysis, User
 from security.auth import decode_jwt_token
 # from cv_analysis.cv_analyzer import extract_text_from_file
+from cv_analysis.upload_index import content_hash, upload_index
 from config import BUCKET_NAME, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, MAX_FILE_SIZE, ALLOWED_EXTENSIONS
 
 router = APIRouter()
@@ -111,18 +113,30 @@ async def upload_files(
                     detail=f"File too large: {f.filename} ({len(content) // (1024*1024)}MB)"
                 )
             mime_type = f.content_type or (mimetypes.guess_type(f.filename or "")[0] or "application/octet-stream")
-            storage_path = f"{user_id}/{analysis_id}/{f.filename}"
-            res = supabase.storage.from_(BUCKET_NAME).upload(
-                storage_path,
-                content,
-                {"content-type": mime_type}
-            )
-            if not res or getattr(res, 'error', None):
-                error_msg = getattr(res, 'error', 'Unknown error') if res else 'Unknown error'
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to upload {f.filename} to storage: {error_msg}"
+            
+            # Тот же файл уже загружался этим пользователем - переиспользуем объект в storage
+            digest = content_hash(content)
+            storage_path = upload_index.find_object(user_id, digest)
+            stored_text = None
+            if storage_path:
+                print(f"♻️ Duplicate upload of {f.filename}, reusing {storage_path}")
+                # Текст дубликата уже извлечен: сохраняем его в строке файла, чтобы анализ
+                # не разбирал файл заново (в том числе после истечения индекса в Redis)
+                stored_text = upload_index.get_encoded_text(storage_path)
+            else:
+                storage_path = f"{user_id}/{analysis_id}/{f.filename}"
+                res = supabase.storage.from_(BUCKET_NAME).upload(
+                    storage_path,
+                    content,
+                    {"content-type": mime_type}
                 )
+                if not res or getattr(res, 'error', None):
+                    error_msg = getattr(res, 'error', 'Unknown error') if res else 'Unknown error'
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"Failed to upload {f.filename} to storage: {error_msg}"
+                    )
+                upload_index.register_object(user_id, digest, storage_path)
             file_record = {
                 "analysis_id": analysis_id,
                 "filename": f.filename,
@@ -132,6 +146,8 @@ async def upload_files(
                 "mime_type": mime_type,
                 "user_id": user_id
             }
+            if stored_text:
+                file_record["extracted_text"] = stored_text
             dbres = supabase.table("uploaded_files").insert(file_record).execute()
             if not dbres.data or not dbres.data[0].get("id"):
                 raise HTTPException(
@@ -158,7 +174,7 @@ async def upload_files(
     # Автоматически запускаем анализ после загрузки файлов
     try:
         from tasks.analysis_tasks import analyze_cv_background
-        analyze_cv_background.delay(analysis_id)
+        analyze_cv_background.delay(analysis_id, enqueued_at=time.time())
         print(f"✅ Analysis task triggered for analysis_id: {analysis_id}")
     except Exception as e:
         print(f"⚠️ Failed to trigger analysis task: {e}")
@@ -0,0 +1,78 @@
+"""
+Benchmark: streaming DOCX extractor vs python-docx paragraphs
+=============================================================
+
+Usage:
+    python benchmark_docx_extraction.py [--paragraphs 20000] [--tables 200] [--repeat 3]
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+
+import docx
+
+from cv_analysis.text_extraction import collect_text, iter_docx_text
+
+
+def build_docx(paragraphs: int, tables: int) -> bytes:
+    """Синтетическое резюме: абзацы, таблицы и колонтитулы"""
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Candidate Name | candidate@example.com"
+    per_table = max(paragraphs // max(tables, 1), 1)
+    for i in range(paragraphs):
+        document.add_paragraph(f"Paragraph {i}: designed and shipped backend services in Python")
+        if tables and i % per_table == 0:
+            table = document.add_table(rows=3, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"cell {i}"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def previous_path(data: bytes) -> str:
+    """Прежнее извлечение: объектная модель python-docx, только абзацы тела"""
+    document = docx.Document(io.BytesIO(data))
+    text = ""
+    for paragraph in document.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+
+def streaming_path(data: bytes) -> str:
+    return collect_text(iter_docx_text(data), None)
+
+
+def measure(fn, data: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - started)
+    # tracemalloc не видит C-аллокации lxml, так что пик python-docx занижен
+    tracemalloc.start()
+    text = fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DOCX extraction benchmark")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = build_docx(args.paragraphs, args.tables)
+    print(f"DOCX: {len(data) / 1024:.0f} KiB, {args.paragraphs} paragraphs, {args.tables} tables")
+    for name, fn in (("python-docx", previous_path), ("streaming", streaming_path)):
+        seconds, peak, chars = measure(fn, data, args.repeat)
+        print(f"{name:12} {seconds * 1000:8.1f} ms  peak {peak / 1024 / 1024:7.1f} MiB  {chars} chars")
+
+
+if __name__ == "__main__":
+    main()
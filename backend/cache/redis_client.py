@@ -96,6 +96,35 @@ class RedisCache:
             logger.error(f"Error setting key {key}: {e}")
             return False
     
+    def set_nx(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
+        """Set value only if key does not exist (atomic lock acquisition)"""
+        if not self.is_connected():
+            return False
+        
+        try:
+            serialized_value = self._serialize(value)
+            return bool(self.client.set(key, serialized_value, nx=True, ex=expire))
+        except Exception as e:
+            logger.error(f"Error setting key {key} (nx): {e}")
+            return False
+    
+    def delete_if_equals(self, key: str, value: Any) -> bool:
+        """Delete key only if it still holds the given value (safe lock release)"""
+        if not self.is_connected():
+            return False
+        
+        script = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('del', KEYS[1])
+        end
+        return 0
+        """
+        try:
+            return bool(self.client.eval(script, 1, key, self._serialize(value)))
+        except Exception as e:
+            logger.error(f"Error conditionally deleting key {key}: {e}")
+            return False
+    
     def setex(self, key: str, seconds: int, value: Any) -> bool:
         """Set value with expiration in seconds"""
         return self.set(key, value, expire=seconds)
@@ -218,6 +247,74 @@ class RedisCache:
             logger.error(f"Error getting list {name}: {e}")
             return []
     
+    def zadd(self, name: str, mapping: Dict[str, float]) -> Optional[int]:
+        """Add members with scores to sorted set"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            return self.client.zadd(name, mapping)
+        except Exception as e:
+            logger.error(f"Error adding to sorted set {name}: {e}")
+            return None
+    
+    def zcard(self, name: str) -> int:
+        """Get number of members in sorted set"""
+        if not self.is_connected():
+            return 0
+        
+        try:
+            return self.client.zcard(name)
+        except Exception as e:
+            logger.error(f"Error getting size of sorted set {name}: {e}")
+            return 0
+    
+    def zpopmin(self, name: str, count: int = 1) -> List[str]:
+        """Pop members with the lowest scores from sorted set"""
+        if not self.is_connected():
+            return []
+        
+        try:
+            result = self.client.zpopmin(name, count)
+            return [member.decode('utf-8') if isinstance(member, bytes) else member
+                    for member, _ in result]
+        except Exception as e:
+            logger.error(f"Error popping from sorted set {name}: {e}")
+            return []
+    
+    def eval_script(self, script: str, keys: List[str], args: List[Any]) -> Any:
+        """Run Lua script atomically on the server"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            return self.client.eval(script, len(keys), *keys, *args)
+        except Exception as e:
+            logger.error(f"Error running Lua script on {keys}: {e}")
+            return None
+    
+    def publish(self, channel: str, value: Any) -> int:
+        """Publish message to channel, returns number of receivers"""
+        if not self.is_connected():
+            return 0
+        
+        try:
+            return self.client.publish(channel, self._serialize(value))
+        except Exception as e:
+            logger.error(f"Error publishing to channel {channel}: {e}")
+            return 0
+    
+    def pubsub(self):
+        """Get PubSub object for subscribing to channels"""
+        if not self.is_connected():
+            return None
+        
+        try:
+            return self.client.pubsub(ignore_subscribe_messages=True)
+        except Exception as e:
+            logger.error(f"Error creating pubsub: {e}")
+            return None
+    
     def flushdb(self) -> bool:
         """Clear all keys from current database"""
         if not self.is_connected():
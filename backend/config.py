@@ -21,9 +21,83 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
 # Mistral AI конфигурация
-MISTRAL_API_URL = "https://api.mistral.ai/v1/chat/completions"
+# Можно направить на локальную заглушку (mistral_stub.py) для бенчмарков
+MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions")
 MISTRAL_MODEL = "mistral-small-latest"
 
+# Пул соединений к Mistral AI (keep-alive, общий для всех запросов процесса)
+MISTRAL_REQUEST_TIMEOUT = float(os.getenv("MISTRAL_REQUEST_TIMEOUT", "60"))
+MISTRAL_MAX_CONNECTIONS = int(os.getenv("MISTRAL_MAX_CONNECTIONS", "64"))
+MISTRAL_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MISTRAL_MAX_KEEPALIVE_CONNECTIONS", "32"))
+
+# Кэш ответов LLM (Redis), ключ - хэш модели, версии промптов и текста запроса
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # 7 дней
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_MAX_ENTRY_BYTES = int(os.getenv("LLM_CACHE_MAX_ENTRY_BYTES", str(256 * 1024)))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.2"))
+
+# Объединение одинаковых одновременных запросов к LLM (single-flight)
+LLM_SINGLE_FLIGHT_LOCK_TTL = int(os.getenv("LLM_SINGLE_FLIGHT_LOCK_TTL", "300"))
+LLM_SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.getenv("LLM_SINGLE_FLIGHT_WAIT_TIMEOUT", "300"))
+
+# Общая для всех воркеров квота Mistral AI (token bucket в Redis)
+MISTRAL_REQUESTS_PER_SECOND = float(os.getenv("MISTRAL_REQUESTS_PER_SECOND", "5"))
+MISTRAL_TOKENS_PER_MINUTE = int(os.getenv("MISTRAL_TOKENS_PER_MINUTE", "500000"))
+MISTRAL_RATE_LIMIT_MAX_WAIT = float(os.getenv("MISTRAL_RATE_LIMIT_MAX_WAIT", "120"))
+MISTRAL_BACKOFF_BASE = float(os.getenv("MISTRAL_BACKOFF_BASE", "1"))
+MISTRAL_BACKOFF_MAX = float(os.getenv("MISTRAL_BACKOFF_MAX", "30"))
+
+# Circuit breaker для Mistral AI (состояние общее для всех воркеров, в Redis)
+MISTRAL_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("MISTRAL_CIRCUIT_FAILURE_THRESHOLD", "5"))
+MISTRAL_CIRCUIT_RESET_TIMEOUT = int(os.getenv("MISTRAL_CIRCUIT_RESET_TIMEOUT", "60"))
+MISTRAL_CIRCUIT_PROBE_TIMEOUT = int(os.getenv("MISTRAL_CIRCUIT_PROBE_TIMEOUT", "90"))
+
+# Потоковые ответы Mistral: секции анализа публикуются по мере готовности
+MISTRAL_STREAMING_ENABLED = os.getenv("MISTRAL_STREAMING_ENABLED", "true").lower() == "true"
+PARTIAL_RESULTS_TTL = int(os.getenv("PARTIAL_RESULTS_TTL", "3600"))
+
+# Map-reduce для длинных CV: лимиты в токенах (оценка ~4 символа на токен)
+CV_INPUT_TOKEN_BUDGET = int(os.getenv("CV_INPUT_TOKEN_BUDGET", "12000"))
+CV_MAX_INPUT_TOKENS = int(os.getenv("CV_MAX_INPUT_TOKENS", "200000"))
+CV_CHUNK_TOKENS = int(os.getenv("CV_CHUNK_TOKENS", "6000"))
+CV_CHUNK_SUMMARY_TOKENS = int(os.getenv("CV_CHUNK_SUMMARY_TOKENS", "800"))
+CV_MAP_CONCURRENCY = int(os.getenv("CV_MAP_CONCURRENCY", "4"))
+
+# Бюджет токенов: окно модели и max_tokens ответа по типу промпта
+MISTRAL_CONTEXT_WINDOW = int(os.getenv("MISTRAL_CONTEXT_WINDOW", "32000"))
+LLM_MAX_TOKENS_DETAILED = int(os.getenv("LLM_MAX_TOKENS_DETAILED", "4000"))
+LLM_MAX_TOKENS_SIMPLE = int(os.getenv("LLM_MAX_TOKENS_SIMPLE", "1000"))
+LLM_MAX_TOKENS_COMPARISON = int(os.getenv("LLM_MAX_TOKENS_COMPARISON", "4000"))
+LLM_MAX_TOKENS_DEFAULT = int(os.getenv("LLM_MAX_TOKENS_DEFAULT", "2000"))
+
+# Извлечение текста из файлов: лимиты страниц и символов на файл
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "100"))
+EXTRACTION_MAX_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", "400000"))
+# Пул процессов для извлечения: 0 - по числу ядер, 1 - без пула (в текущем процессе)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0"))
+EXTRACTION_PDF_PAGES_PER_TASK = int(os.getenv("EXTRACTION_PDF_PAGES_PER_TASK", "25"))
+# Песочница извлечения: каждый файл разбирается в отдельном процессе с лимитами
+# CPU-времени, прироста памяти (МБ) и общего времени; при превышении - ошибка по файлу
+EXTRACTION_SANDBOX_ENABLED = os.getenv("EXTRACTION_SANDBOX_ENABLED", "true").lower() == "true"
+EXTRACTION_CPU_SECONDS = int(os.getenv("EXTRACTION_CPU_SECONDS", "30"))
+EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "512"))
+EXTRACTION_TIMEOUT_SECONDS = int(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+
+# Индекс загрузок по SHA-256: дубликаты не загружаются и не анализируются повторно
+UPLOAD_INDEX_TTL = int(os.getenv("UPLOAD_INDEX_TTL", str(30 * 24 * 3600)))
+# Одновременные скачивания файлов анализа из storage
+STORAGE_DOWNLOAD_CONCURRENCY = int(os.getenv("STORAGE_DOWNLOAD_CONCURRENCY", "4"))
+
+# Идемпотентность анализа: повторная постановка того же запуска, пока он идет, ничего не делает
+ANALYSIS_RUN_CLAIM_TTL = int(os.getenv("ANALYSIS_RUN_CLAIM_TTL", str(2 * 3600)))
+# Владелец фонового сравнения кандидатов хранится столько же, сколько результат задачи (result_expires)
+COMPARISON_JOB_TTL = int(os.getenv("COMPARISON_JOB_TTL", "3600"))
+
+# Отчет о задержках анализа (p50/p95): окно в часах и максимум анализов в выборке
+LATENCY_REPORT_WINDOW_HOURS = int(os.getenv("LATENCY_REPORT_WINDOW_HOURS", str(7 * 24)))
+LATENCY_REPORT_MAX_ROWS = int(os.getenv("LATENCY_REPORT_MAX_ROWS", "5000"))
+
 # Storage конфигурация
 BUCKET_NAME = "cvs"
 
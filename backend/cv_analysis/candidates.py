@@ -0,0 +1,96 @@
+"""
+Loading analysed candidates (uploaded files) for comparison
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache.redis_client import RedisCache, redis_cache
+from config import COMPARISON_JOB_TTL
+
+# Служебные поля результата анализа, которые не нужны для сравнения кандидатов
+_ANALYSIS_ONLY_FIELDS = ("analysis_metadata", "candidates", "best_file")
+
+
+def candidate_results(file_row: Dict[str, Any], analysis_results: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Анализ одного загруженного файла внутри результата анализа.
+
+    Анализ по файлам хранит каждый файл в results["candidates"]; у старых
+    анализов без этого списка файлом считается весь результат. None, если
+    файл не проанализирован.
+    """
+    if not isinstance(analysis_results, dict):
+        return None
+    candidates = analysis_results.get("candidates")
+    if isinstance(candidates, list):
+        entry = next((c for c in candidates if c.get("file_path") == file_row["file_path"]), None)
+        if entry is None or not isinstance(entry.get("results"), dict):
+            return None
+        results = entry["results"]
+    else:
+        results = analysis_results
+    data = {key: value for key, value in results.items() if key not in _ANALYSIS_ONLY_FIELDS}
+    data["candidate_id"] = file_row["id"]
+    data["filename"] = file_row["filename"]
+    return data
+
+
+def load_candidates(client, user_id: str, candidate_ids: List[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Результаты анализа кандидатов по id загруженных файлов (двумя запросами,
+    а не запросом на каждого кандидата). Учитываются только завершенные
+    анализы пользователя user_id.
+
+    Возвращает (данные кандидатов в порядке candidate_ids, id без результата).
+    """
+    ids = list(dict.fromkeys(candidate_ids))
+    if not ids:
+        return [], []
+    files = client.table("uploaded_files").select("id, analysis_id, filename, file_path").in_("id", ids).execute().data or []
+    analysis_ids = list({f["analysis_id"] for f in files})
+    analyses = {}
+    if analysis_ids:
+        rows = client.table("analyses").select("id, results").in_("id", analysis_ids) \
+            .eq("user_id", user_id).eq("status", "completed").execute().data or []
+        analyses = {row["id"]: row.get("results") for row in rows}
+
+    by_id = {f["id"]: f for f in files}
+    candidates, missing = [], []
+    for candidate_id in ids:
+        file_row = by_id.get(candidate_id)
+        data = candidate_results(file_row, analyses.get(file_row["analysis_id"])) if file_row else None
+        if data is None:
+            missing.append(candidate_id)
+        else:
+            candidates.append(data)
+    return candidates, missing
+
+
+class ComparisonJobRegistry:
+    """
+    Владельцы фоновых сравнений кандидатов.
+
+    Состояния PENDING, RETRY и FAILURE задачи Celery не содержат user_id,
+    а неизвестный или истекший id тоже выглядит как PENDING. Поэтому
+    владелец записывается при постановке задачи и проверяется при каждом
+    запросе статуса; запись истекает вместе с результатом задачи.
+    """
+
+    KEY_PREFIX = "comparison:job"
+
+    def __init__(self, cache: RedisCache = redis_cache, ttl: int = COMPARISON_JOB_TTL):
+        self.cache = cache
+        self.ttl = ttl
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{job_id}"
+
+    def register(self, job_id: str, user_id: str):
+        self.cache.set(self._key(job_id), user_id, expire=self.ttl)
+
+    def owner(self, job_id: str) -> Optional[str]:
+        """Владелец задачи или None, если задача неизвестна или ее результат истек"""
+        return self.cache.get(self._key(job_id))
+
+
+# Global comparison job registry
+comparison_jobs = ComparisonJobRegistry()
@@ -0,0 +1,97 @@
+"""
+Idempotency keys and run claims for staged CV analysis
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from cache.redis_client import RedisCache, redis_cache
+from config import ANALYSIS_RUN_CLAIM_TTL
+from .result_assembly import is_complete_assembly
+from .text_store import extractor_tag
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(material: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(material, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def analysis_run_key(analysis_id: str, job_description: str, files: List[Dict[str, Any]]) -> str:
+    """
+    Ключ идемпотентности запуска анализа: анализ, описание вакансии и набор
+    файлов. Повторная постановка с теми же входными данными - тот же запуск
+    """
+    return _digest({
+        "analysis_id": analysis_id,
+        "job_description": job_description or "",
+        "files": sorted([f["id"], f["file_path"]] for f in files),
+    })
+
+
+def completed_run_key(analysis: Dict[str, Any]) -> Optional[str]:
+    """
+    Ключ запуска, результат которого сохранен в analyses.results. Не зависит
+    от статуса: /run и /retry сбрасывают статус до постановки задачи.
+    Результат с ошибками файлов или ответами-заглушками не считается
+    завершенным - такой анализ можно запустить повторно
+    """
+    results = analysis.get("results")
+    if not is_complete_assembly(results):
+        return None
+    return (results.get("analysis_metadata") or {}).get("run_key")
+
+
+def file_checkpoint_key(file_path: str, job_description_text: str) -> str:
+    """
+    Ключ контрольной точки анализа файла: сохраненный ответ модели годится,
+    только если не изменились файл, текст вакансии и версия экстрактора
+    """
+    return _digest({
+        "file_path": file_path,
+        "job_description": job_description_text,
+        "extractor": extractor_tag(),
+    })
+
+
+class AnalysisRunRegistry:
+    """
+    Запуски анализа, которые сейчас выполняются.
+
+    Загрузка файлов и /run могут поставить один и тот же анализ дважды.
+    Первая постановка занимает ключ запуска в Redis (SET NX), остальные
+    с тем же ключом ничего не делают, пока запуск не завершится. Ключ
+    снимается в конце цепочки; если воркер пропал, он истекает по TTL.
+    """
+
+    KEY_PREFIX = "analysis:run"
+
+    def __init__(self, cache: RedisCache = redis_cache, ttl: int = ANALYSIS_RUN_CLAIM_TTL):
+        self.cache = cache
+        self.ttl = ttl
+
+    def _key(self, run_key: str) -> str:
+        return f"{self.KEY_PREFIX}:{run_key}"
+
+    def claim(self, run_key: str, owner: str) -> bool:
+        """
+        True, если запуск занят этим вызовом (такого запуска еще нет).
+        Без Redis дубли не отсекаются: анализ выполняется, а не пропускается
+        """
+        if not self.cache.is_connected():
+            return True
+        return bool(self.cache.set_nx(self._key(run_key), owner, expire=self.ttl))
+
+    def owner(self, run_key: str) -> Any:
+        """Кто выполняет запуск (id задачи) или None"""
+        return self.cache.get(self._key(run_key))
+
+    def release(self, run_key: str):
+        """Запуск завершен: следующая постановка выполнит анализ заново"""
+        if run_key and self.cache.delete(self._key(run_key)):
+            logger.info(f"[ANALYSIS] Released run {run_key[:12]}")
+
+
+# Global analysis run registry
+analysis_runs = AnalysisRunRegistry()
@@ -0,0 +1,90 @@
+"""
+Token-budgeted chunking of long CV texts for map-reduce analysis
+"""
+import re
+from typing import List, Optional, Tuple
+
+from .token_budget import estimate_tokens
+
+# Худший случай оценки (не-латинский текст) - ~2 символа на токен
+MIN_CHARS_PER_TOKEN = 2
+
+# Заголовок файла, который analyze_cv_background ставит перед текстом каждого файла
+_FILE_HEADER = re.compile(r"^--- .+ ---$", re.MULTILINE)
+
+
+def _split_files(text: str) -> List[Tuple[Optional[str], str]]:
+    """Делит объединенный текст на (заголовок файла, текст файла)"""
+    headers = list(_FILE_HEADER.finditer(text))
+    if not headers:
+        return [(None, text)]
+
+    files = []
+    preamble = text[:headers[0].start()].strip()
+    if preamble:
+        files.append((None, preamble))
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        files.append((match.group(0), text[match.end():end].strip()))
+    return files
+
+
+def _split_units(body: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """
+    Делит текст на куски не больше max_tokens: по абзацам, затем по строкам,
+    и только если строка слишком длинная - по символам.
+    Возвращает (кусок, оценка токенов).
+    """
+    max_chars = max(max_tokens * MIN_CHARS_PER_TOKEN, 1)
+    units = []
+    for paragraph in body.split("\n\n"):
+        tokens = estimate_tokens(paragraph)
+        if tokens <= max_tokens:
+            units.append((paragraph, tokens))
+            continue
+        for line in paragraph.split("\n"):
+            while estimate_tokens(line) > max_tokens:
+                piece = line[:max_chars]
+                while len(piece) > 1 and estimate_tokens(piece) > max_tokens:
+                    piece = piece[:len(piece) // 2]
+                units.append((piece, estimate_tokens(piece)))
+                line = line[len(piece):]
+            units.append((line, estimate_tokens(line)))
+    return [(unit, tokens) for unit, tokens in units if unit.strip()]
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Делит текст CV на части не больше max_tokens (по оценке).
+
+    Границы частей проходят по файлам, абзацам и строкам. Часть, которая
+    начинается внутри файла, снова получает строку "--- filename ---",
+    чтобы модель знала, откуда текст.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    current_header: Optional[str] = None
+
+    def flush():
+        nonlocal current, current_tokens, current_header
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens, current_header = [], 0, None
+
+    for header, body in _split_files(text):
+        header_tokens = estimate_tokens(header) if header else 0
+        for unit, unit_tokens in _split_units(body, max(max_tokens - header_tokens, 1)):
+            needs_header = header is not None and header != current_header
+            added = unit_tokens + (header_tokens if needs_header else 0)
+            if current and current_tokens + added > max_tokens:
+                flush()
+                needs_header = header is not None
+                added = unit_tokens + (header_tokens if needs_header else 0)
+            if needs_header:
+                current.append(header)
+                current_header = header
+            current.append(unit)
+            current_tokens += added
+    flush()
+    return chunks
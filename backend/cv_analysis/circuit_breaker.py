@@ -0,0 +1,116 @@
+"""
+Circuit breaker for the Mistral AI backend with state shared through Redis
+"""
+import logging
+
+from cache.redis_client import RedisCache, redis_cache
+from config import (
+    MISTRAL_CIRCUIT_FAILURE_THRESHOLD,
+    MISTRAL_CIRCUIT_RESET_TIMEOUT,
+    MISTRAL_CIRCUIT_PROBE_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Mistral AI временно недоступен, запросы отклоняются без обращения к API"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Mistral AI is temporarily unavailable, retry in {int(retry_after)}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker, общий для всех API и Celery воркеров.
+
+    closed    - запросы проходят, подряд идущие ошибки считаются в Redis;
+    open      - после failure_threshold ошибок подряд все запросы сразу
+                получают CircuitOpenError на reset_timeout секунд;
+    half_open - после reset_timeout пропускается ровно один пробный запрос:
+                успех закрывает breaker, ошибка снова открывает его.
+
+    Без Redis breaker не применяется.
+    """
+
+    KEY_PREFIX = "llm:circuit"
+
+    def __init__(
+        self,
+        name: str = "mistral",
+        cache: RedisCache = redis_cache,
+        failure_threshold: int = MISTRAL_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: int = MISTRAL_CIRCUIT_RESET_TIMEOUT,
+        probe_timeout: int = MISTRAL_CIRCUIT_PROBE_TIMEOUT
+    ):
+        self.name = name
+        self.cache = cache
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+
+    @property
+    def _failures_key(self) -> str:
+        return f"{self.KEY_PREFIX}:{self.name}:failures"
+
+    @property
+    def _open_key(self) -> str:
+        return f"{self.KEY_PREFIX}:{self.name}:open"
+
+    @property
+    def _probe_key(self) -> str:
+        return f"{self.KEY_PREFIX}:{self.name}:probe"
+
+    def _failures(self) -> int:
+        return int(self.cache.get(self._failures_key, 0) or 0)
+
+    def state(self) -> str:
+        """Текущее состояние: closed, open или half_open"""
+        if self.cache.exists(self._open_key):
+            return "open"
+        if self._failures() >= self.failure_threshold:
+            return "half_open"
+        return "closed"
+
+    def check(self):
+        """Бросает CircuitOpenError, если breaker открыт (не занимает пробный запрос)"""
+        if self.cache.exists(self._open_key):
+            raise CircuitOpenError(max(1, self.cache.ttl(self._open_key)))
+
+    def before_call(self):
+        """
+        Разрешение на вызов API. В состоянии half_open только один процесс
+        получает право на пробный запрос, остальные получают отказ
+        """
+        self.check()
+        if self._failures() >= self.failure_threshold:
+            if not self.cache.set_nx(self._probe_key, 1, expire=self.probe_timeout):
+                raise CircuitOpenError(max(1, self.cache.ttl(self._probe_key)))
+            logger.info(f"[CIRCUIT] {self.name}: half-open, sending probe request")
+
+    def record_success(self):
+        """Успешный ответ закрывает breaker"""
+        if self._failures():
+            logger.info(f"[CIRCUIT] {self.name}: closed after successful request")
+            self.cache.delete(self._failures_key)
+        self.cache.delete(self._probe_key)
+
+    def record_failure(self):
+        """Ошибка upstream; после порога ошибок подряд breaker открывается"""
+        failures = self.cache.incr(self._failures_key)
+        if failures is None:
+            return
+        # Старые одиночные ошибки не должны копиться бесконечно
+        self.cache.expire(self._failures_key, self.reset_timeout * 10)
+        if failures >= self.failure_threshold:
+            self.cache.set(self._open_key, 1, expire=self.reset_timeout)
+            self.cache.delete(self._probe_key)
+            logger.warning(
+                f"[CIRCUIT] {self.name}: opened after {failures} consecutive failures "
+                f"for {self.reset_timeout}s"
+            )
+
+
+# Global circuit breaker for the Mistral backend
+mistral_circuit_breaker = CircuitBreaker()
@@ -17,8 +17,11 @@ Features:
 import os
 import json
 import logging
+import requests
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from .circuit_breaker import CircuitOpenError
+from .rate_limiter import RateLimitTimeoutError
 from .cv_analyzer import CVAnalyzer
 
 logger = logging.getLogger(__name__)
@@ -124,6 +127,9 @@ class CandidateComparisonMatrix:
             
             return comparison_result
             
+        except (CircuitOpenError, RateLimitTimeoutError, requests.exceptions.RequestException):
+            # Сбой связи с моделью - решение о повторе принимает вызывающий (задача Celery)
+            raise
         except Exception as e:
             logger.error(f"Error generating comparison matrix: {e}")
             return {
@@ -203,6 +209,103 @@ class CandidateComparisonMatrix:
                 "candidates_data": candidates_data
             }
     
+    async def generate_comparison_matrix_async(self, candidates_data: List[Dict[str, Any]], top_n: int = 3) -> Dict[str, Any]:
+        """
+        Асинхронная версия generate_comparison_matrix для FastAPI эндпоинтов
+        """
+        try:
+            top_candidates = self.select_top_candidates(candidates_data, top_n)
+            
+            if not top_candidates:
+                return {
+                    "error": "No candidates available for comparison",
+                    "comparison_summary": {
+                        "total_candidates": 0,
+                        "analysis_date": datetime.now().isoformat(),
+                        "comparison_focus": "No candidates to compare"
+                    }
+                }
+            
+            comparison_result = await self.analyzer.generate_comparison_matrix_async(top_candidates)
+            
+            comparison_result["metadata"] = {
+                "generated_at": datetime.now().isoformat(),
+                "total_candidates_analyzed": len(candidates_data),
+                "top_candidates_selected": len(top_candidates),
+                "selection_criteria": "achiever_score"
+            }
+            
+            return comparison_result
+            
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Error generating comparison matrix: {e}")
+            return {
+                "error": f"Failed to generate comparison matrix: {str(e)}",
+                "candidates_data": candidates_data
+            }
+    
+    async def analyze_candidates_together_async(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Асинхронная версия analyze_candidates_together
+        """
+        try:
+            if not candidates_data:
+                return {
+                    "error": "No candidates data provided",
+                    "analysis_summary": "No candidates to analyze"
+                }
+            
+            analysis_result = await self.analyzer.analyze_multiple_candidates_async(candidates_data)
+            
+            analysis_result["metadata"] = {
+                "generated_at": datetime.now().isoformat(),
+                "total_candidates": len(candidates_data),
+                "analysis_type": "comprehensive_group_analysis"
+            }
+            
+            return analysis_result
+            
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Error analyzing candidates together: {e}")
+            return {
+                "error": f"Failed to analyze candidates together: {str(e)}",
+                "candidates_data": candidates_data
+            }
+    
+    async def get_hiring_recommendations_async(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Асинхронная версия get_hiring_recommendations
+        """
+        try:
+            if not candidates_data:
+                return {
+                    "error": "No candidates data provided",
+                    "recommendations": []
+                }
+            
+            recommendations = await self.analyzer.get_hiring_recommendations_async(candidates_data)
+            
+            recommendations["metadata"] = {
+                "generated_at": datetime.now().isoformat(),
+                "total_candidates": len(candidates_data),
+                "analysis_type": "hiring_recommendations"
+            }
+            
+            return recommendations
+            
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"Error getting hiring recommendations: {e}")
+            return {
+                "error": f"Failed to get hiring recommendations: {str(e)}",
+                "candidates_data": candidates_data
+            }
+    
     def create_summary_report(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Создает сводный отчет по всем кандидатам
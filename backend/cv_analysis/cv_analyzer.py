@@ -3,23 +3,54 @@ CV Analyzer - основной модуль для анализа резюме 
 """
 import os
 import json
+import asyncio
+import httpx
 import requests
 import time
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Any
 from dotenv import load_dotenv
-from config import MISTRAL_API_URL, MISTRAL_MODEL, get_mistral_api_key
+from config import (
+    MISTRAL_API_URL,
+    MISTRAL_MODEL,
+    MISTRAL_STREAMING_ENABLED,
+    CV_INPUT_TOKEN_BUDGET,
+    CV_MAX_INPUT_TOKENS,
+    CV_CHUNK_TOKENS,
+    CV_MAP_CONCURRENCY,
+    EXTRACTION_MAX_PAGES,
+    EXTRACTION_MAX_CHARS,
+    get_mistral_api_key
+)
 from .prompts import (
     ANALYZE_CV_PROMPT, 
     ANALYZE_CV_WITH_JOB_DESCRIPTION_PROMPT,
     SIMPLE_CV_ANALYSIS_PROMPT,
     CANDIDATE_COMPARISON_MATRIX_PROMPT,
     COMBINE_AND_ANALYZE_CANDIDATES_PROMPT,
-    WHICH_CANDIDATE_TO_HIRE_PROMPT
+    WHICH_CANDIDATE_TO_HIRE_PROMPT,
+    CV_SECTION_SUMMARY_PROMPT
 )
+from .mistral_client import mistral_client
+from .response_cache import llm_response_cache
+from .single_flight import llm_single_flight
+from .rate_limiter import RateLimitTimeoutError, mistral_rate_limiter
+from .circuit_breaker import CircuitOpenError, mistral_circuit_breaker
+from .json_repair import parse_llm_json, record_outcome
+from .incremental_json import IncrementalJSONParser
+from .chunking import split_into_chunks
+from .token_budget import estimate_tokens, prompt_budget, truncate_to_tokens
+from .text_extraction import PAGE_BREAK, Source, collect_text, iter_doc_text, iter_docx_text, iter_pdf_text
 
 # Загружаем .env файл
 load_dotenv()
 
+# Callback для готовой секции ответа: (ключ верхнего уровня, значение)
+SectionCallback = Callable[[str, Any], None]
+
+# Сколько раз подряд сжимать сводки, прежде чем просто обрезать текст
+MAX_REDUCE_ROUNDS = 3
+
 class CVAnalyzer:
     """
     Анализатор резюме с использованием Mistral AI
@@ -30,14 +61,18 @@ class CVAnalyzer:
         self.api_url = MISTRAL_API_URL
         self.model = MISTRAL_MODEL
         self.api_key = get_mistral_api_key()
+        self.client = mistral_client
+        self.response_cache = llm_response_cache
+        self.single_flight = llm_single_flight
+        self.rate_limiter = mistral_rate_limiter
+        self.circuit_breaker = mistral_circuit_breaker
+        self.budget = prompt_budget
     
-    def _make_mistral_request(self, prompt: str, max_retries: int = 3) -> str:
+    def _build_request(self, prompt: str, prompt_type: str = "default") -> tuple:
         """
-        Выполняет запрос к Mistral AI API с повторными попытками
+        Формирует заголовки и тело запроса к Mistral AI API.
+        max_tokens зависит от типа промпта и места, оставшегося в окне модели.
         """
-        import logging
-        logger = logging.getLogger(__name__)
-        
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -48,147 +83,458 @@ class CVAnalyzer:
             "messages": [
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 4000,
+            "max_tokens": self.budget.max_tokens_for(prompt, prompt_type),
             "temperature": 0.1
         }
+        return headers, data
+    
+    def _extract_content(self, result: Dict[str, Any]) -> str:
+        """
+        Извлекает и очищает текст ответа из JSON Mistral AI API
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if "choices" in result and len(result["choices"]) > 0:
+            content = result["choices"][0]["message"]["content"]
+            logger.info(f"[MISTRAL_API] Successfully received response (length: {len(content)})")
+            
+            # Clean up the response - remove markdown code blocks if present
+            return self._clean_ai_response(content)
+        
+        logger.error(f"[MISTRAL_API] Unexpected response format: {result}")
+        raise ValueError("Unexpected response format")
+    
+    def _cached_response_key(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Ключ кэша ответа для запроса или None, если запрос не кэшируется
+        """
+        if not self.response_cache.is_cacheable(data):
+            return None
+        return self.response_cache.make_key(data)
+    
+    def _make_mistral_request(
+        self, prompt: str, max_retries: int = 3, on_section: Optional[SectionCallback] = None,
+        prompt_type: str = "default"
+    ) -> str:
+        """
+        Выполняет запрос к Mistral AI API с повторными попытками.
+        
+        Если передан on_section, ответ запрашивается потоком и каждая секция
+        JSON верхнего уровня передается в callback, как только она закрылась.
+        """
+        headers, data = self._build_request(prompt, prompt_type)
+        if not MISTRAL_STREAMING_ENABLED:
+            on_section = None
+        
+        cache_key = self._cached_response_key(data)
+        if not cache_key:
+            return self._send_with_retries(headers, data, max_retries, on_section)
+        
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Кэш отдается и при открытом breaker, а новый запрос - нет
+        self.circuit_breaker.check()
+        
+        # Одинаковые промпты из разных воркеров отправляются в Mistral один раз
+        return self.single_flight.run(
+            cache_key,
+            lambda: self._send_and_cache(cache_key, headers, data, max_retries, on_section)
+        )
+
+    def _send_and_cache(
+        self, cache_key: str, headers: Dict[str, str], data: Dict[str, Any], max_retries: int,
+        on_section: Optional[SectionCallback] = None
+    ) -> str:
+        content = self._send_with_retries(headers, data, max_retries, on_section)
+        self.response_cache.set(cache_key, content)
+        return content
+
+    def _send_with_retries(
+        self, headers: Dict[str, str], data: Dict[str, Any], max_retries: int,
+        on_section: Optional[SectionCallback] = None
+    ) -> str:
+        """
+        Отправляет запрос в Mistral AI API с экспоненциальной задержкой между попытками
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        cost = self.rate_limiter.estimate_cost(data)
         
         for attempt in range(max_retries):
             try:
+                # При открытом circuit breaker падаем сразу, не тратя попытки
+                self.circuit_breaker.before_call()
+                # Квота общая для всех воркеров: ждем, пока она освободится
+                self.rate_limiter.acquire(cost)
                 logger.info(f"[MISTRAL_API] Making request to {self.api_url} (attempt {attempt + 1})")
-                response = requests.post(self.api_url, headers=headers, json=data, timeout=60)
+                if on_section is not None:
+                    return self._stream_completion(headers, data, cost, on_section)
+                response = self.client.post(self.api_url, headers, data)
+                self._record_upstream_status(response.status_code)
                 response.raise_for_status()
                 
                 result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    content = result["choices"][0]["message"]["content"]
-                    logger.info(f"[MISTRAL_API] Successfully received response (length: {len(content)})")
-                    
-                    # Clean up the response - remove markdown code blocks if present
-                    cleaned_content = self._clean_ai_response(content)
-                    
-                    return cleaned_content
-                else:
-                    logger.error(f"[MISTRAL_API] Unexpected response format: {result}")
-                    raise ValueError("Unexpected response format")
+                self.rate_limiter.record_usage(cost, result.get("usage"))
+                return self._extract_content(result)
                     
             except requests.exceptions.RequestException as e:
                 logger.error(f"[MISTRAL_API] Request failed (attempt {attempt + 1}): {e}")
+                if e.response is None:
+                    self.circuit_breaker.record_failure()
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+                
+        raise Exception("All retry attempts failed")
+
+    def _stream_completion(
+        self, headers: Dict[str, str], data: Dict[str, Any], cost: int, on_section: SectionCallback
+    ) -> str:
+        """
+        Получает ответ потоком (SSE) и отдает секции JSON по мере готовности
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        parser = IncrementalJSONParser()
+        usage = None
+        try:
+            for event in self.client.post_stream(self.api_url, headers, {**data, "stream": True}):
+                choices = event.get("choices") or []
+                if choices:
+                    delta = choices[0].get("delta", {}).get("content") or ""
+                    for key, value in parser.feed(delta):
+                        on_section(key, value)
+                if event.get("usage"):
+                    usage = event["usage"]
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None:
+                self._record_upstream_status(e.response.status_code)
+            raise
+        
+        self.circuit_breaker.record_success()
+        self.rate_limiter.record_usage(cost, usage)
+        if not parser.text:
+            logger.error("[MISTRAL_API] Empty streamed response")
+            raise ValueError("Unexpected response format")
+        logger.info(f"[MISTRAL_API] Successfully received streamed response (length: {len(parser.text)})")
+        return self._clean_ai_response(parser.text)
+
+    def _record_upstream_status(self, status_code: int):
+        """
+        Сообщает circuit breaker о здоровье Mistral: 5xx - сбой upstream,
+        любой другой ответ (включая 4xx и 429) означает, что сервис отвечает
+        """
+        if status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Задержка перед повтором: 429 с Retry-After ставит общую паузу через
+        rate limiter, остальные ошибки - экспоненциальная задержка с jitter
+        """
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+        retry_after = self.rate_limiter.parse_retry_after(getattr(response, "headers", None))
+        return self.rate_limiter.backoff(attempt, status_code, retry_after)
+
+    async def _make_mistral_request_async(self, prompt: str, max_retries: int = 3, prompt_type: str = "default") -> str:
+        """
+        Асинхронный запрос к Mistral AI API через общий пул соединений.
+        Клиент Redis (кэш, circuit breaker, rate limiter) синхронный, поэтому
+        обращения к нему выполняются в потоке, не блокируя event loop
+        """
+        headers, data = self._build_request(prompt, prompt_type)
+        
+        cache_key = self._cached_response_key(data)
+        if not cache_key:
+            return await self._send_with_retries_async(headers, data, max_retries)
+        
+        cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+        if cached is not None:
+            return cached
+        
+        await asyncio.to_thread(self.circuit_breaker.check)
+        
+        async def send_and_cache() -> str:
+            content = await self._send_with_retries_async(headers, data, max_retries)
+            await asyncio.to_thread(self.response_cache.set, cache_key, content)
+            return content
+        
+        return await self.single_flight.arun(cache_key, send_and_cache)
+
+    async def _send_with_retries_async(self, headers: Dict[str, str], data: Dict[str, Any], max_retries: int) -> str:
+        """
+        Асинхронная отправка запроса в Mistral AI API с повторными попытками
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        cost = self.rate_limiter.estimate_cost(data)
+        
+        for attempt in range(max_retries):
+            try:
+                await asyncio.to_thread(self.circuit_breaker.before_call)
+                await self.rate_limiter.acquire_async(cost)
+                logger.info(f"[MISTRAL_API] Making async request to {self.api_url} (attempt {attempt + 1})")
+                response = await self.client.apost(self.api_url, headers, data)
+                await asyncio.to_thread(self._record_upstream_status, response.status_code)
+                response.raise_for_status()
+                
+                result = response.json()
+                await asyncio.to_thread(self.rate_limiter.record_usage, cost, result.get("usage"))
+                # Разбор ответа учитывается в счетчиках Redis (record_outcome)
+                return await asyncio.to_thread(self._extract_content, result)
+                
+            except httpx.HTTPError as e:
+                logger.error(f"[MISTRAL_API] Async request failed (attempt {attempt + 1}): {e}")
+                if not isinstance(e, httpx.HTTPStatusError):
+                    await asyncio.to_thread(self.circuit_breaker.record_failure)
                 if attempt == max_retries - 1:
                     raise
-                time.sleep(2 ** attempt)  # Exponential backoff
+                await asyncio.sleep(await asyncio.to_thread(self._retry_delay, e, attempt))
                 
         raise Exception("All retry attempts failed")
 
     def _clean_ai_response(self, response: str) -> str:
         """
-        Очищает ответ AI от markdown блоков и лишнего текста
-        """
-        # Remove markdown code blocks
-        if "```json" in response:
-            # Extract JSON from markdown code block
-            start_idx = response.find("```json")
-            if start_idx != -1:
-                start_idx = response.find("\n", start_idx) + 1
-                end_idx = response.find("```", start_idx)
-                if end_idx != -1:
-                    return response[start_idx:end_idx].strip()
-        
-        # Remove other markdown code blocks
-        if "```" in response:
-            # Extract content between code blocks
-            start_idx = response.find("```")
-            if start_idx != -1:
-                start_idx = response.find("\n", start_idx) + 1
-                end_idx = response.find("```", start_idx)
-                if end_idx != -1:
-                    return response[start_idx:end_idx].strip()
-        
-        # Remove common prefixes
-        prefixes_to_remove = [
-            "Here is the JSON response analyzing the CV against the job requirements:",
-            "Here is the analysis result:",
-            "Here is the comparison matrix:",
-            "Here is the hiring recommendation:",
-            "Here is the summary:"
-        ]
-        
-        cleaned_response = response.strip()
-        for prefix in prefixes_to_remove:
-            if cleaned_response.startswith(prefix):
-                cleaned_response = cleaned_response[len(prefix):].strip()
-        
-        return cleaned_response
-
-    def extract_text_from_pdf(self, pdf_bytes: bytes) -> str:
-        """
-        Извлекает текст из PDF файла
+        Извлекает JSON из ответа AI (markdown блоки, пояснения модели) и
+        локально исправляет типичные дефекты: обрезанный ответ, висячие
+        запятые, неэкранированные кавычки. Если JSON восстановить не удалось,
+        возвращается исходный текст - вызывающий код уйдет в fallback
         """
         try:
-            import PyPDF2
-            import io
-            
-            pdf_file = io.BytesIO(pdf_bytes)
-            reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text.strip()
+            parsed, outcome = parse_llm_json(response)
+        except json.JSONDecodeError:
+            record_outcome("failed")
+            return response.strip()
+        
+        record_outcome(outcome)
+        if outcome == "clean":
+            return response.strip()
+        return json.dumps(parsed, ensure_ascii=False)
+
+    def extract_text_from_pdf(
+        self,
+        pdf_bytes: Source,
+        max_pages: Optional[int] = EXTRACTION_MAX_PAGES,
+        max_chars: Optional[int] = EXTRACTION_MAX_CHARS
+    ) -> str:
+        """
+        Извлекает текст из PDF файла (bytes или файловый объект).
+        Страницы читаются по одной, чтение останавливается на лимите страниц/символов.
+        """
+        try:
+            return collect_text(iter_pdf_text(pdf_bytes, max_pages), max_chars, PAGE_BREAK)
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Error extracting text from PDF: {e}")
             return ""
 
-    def extract_text_from_docx(self, docx_bytes: bytes) -> str:
+    def extract_text_from_docx(self, docx_bytes: Source, max_chars: Optional[int] = EXTRACTION_MAX_CHARS) -> str:
         """
-        Извлекает текст из DOCX файла
+        Извлекает текст из DOCX файла (bytes или файловый объект) по абзацам
         """
         try:
-            import docx
-            import io
-            
-            docx_file = io.BytesIO(docx_bytes)
-            doc = docx.Document(docx_file)
-            
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            return text.strip()
+            return collect_text(iter_docx_text(docx_bytes), max_chars)
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Error extracting text from DOCX: {e}")
             return ""
 
-    def analyze_cv_detailed(self, cv_text: str, job_description: str = "") -> Dict[str, Any]:
+    def extract_text_from_doc(self, doc_bytes: Source, max_chars: Optional[int] = EXTRACTION_MAX_CHARS) -> str:
         """
-        Детальный анализ CV с полной структурой achievers_rating
+        Извлекает текст из DOC файла (Word 97-2003) по абзацам
+        """
+        try:
+            return collect_text(iter_doc_text(doc_bytes), max_chars)
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Error extracting text from DOC: {e}")
+            return ""
+
+    def condense_cv_text(self, cv_text: str, token_budget: int = CV_INPUT_TOKEN_BUDGET) -> str:
+        """
+        Map-reduce для длинных CV: если текст не помещается в бюджет токенов,
+        он делится на части, части параллельно сжимаются в сводки, и сводки
+        заменяют исходный текст в промпте анализа.
+        
+        Вход ограничен CV_MAX_INPUT_TOKENS, а число раундов - MAX_REDUCE_ROUNDS,
+        поэтому время не растет неограниченно с размером портфолио.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if estimate_tokens(cv_text) <= token_budget:
+            return cv_text
+        
+        logger.info(f"[CHUNKING] CV text is ~{estimate_tokens(cv_text)} tokens, budget {token_budget}: condensing")
+        text = truncate_to_tokens(cv_text, CV_MAX_INPUT_TOKENS)
+        for _ in range(MAX_REDUCE_ROUNDS):
+            chunks = split_into_chunks(text, CV_CHUNK_TOKENS)
+            with ThreadPoolExecutor(max_workers=min(CV_MAP_CONCURRENCY, len(chunks))) as pool:
+                summaries = list(pool.map(
+                    lambda args: self._summarize_chunk(*args),
+                    [(i + 1, len(chunks), chunk) for i, chunk in enumerate(chunks)]
+                ))
+            text = self._join_summaries(summaries)
+            logger.info(f"[CHUNKING] Reduced {len(chunks)} chunks to ~{estimate_tokens(text)} tokens")
+            if estimate_tokens(text) <= token_budget:
+                return text
+        
+        return truncate_to_tokens(text, token_budget)
+
+    async def condense_cv_text_async(self, cv_text: str, token_budget: int = CV_INPUT_TOKEN_BUDGET) -> str:
+        """
+        Асинхронный вариант condense_cv_text
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        if estimate_tokens(cv_text) <= token_budget:
+            return cv_text
+        
+        logger.info(f"[CHUNKING] CV text is ~{estimate_tokens(cv_text)} tokens, budget {token_budget}: condensing")
+        semaphore = asyncio.Semaphore(CV_MAP_CONCURRENCY)
+        
+        async def summarize(part: int, total: int, chunk: str) -> str:
+            async with semaphore:
+                return await self._summarize_chunk_async(part, total, chunk)
+        
+        text = truncate_to_tokens(cv_text, CV_MAX_INPUT_TOKENS)
+        for _ in range(MAX_REDUCE_ROUNDS):
+            chunks = split_into_chunks(text, CV_CHUNK_TOKENS)
+            summaries = await asyncio.gather(*[
+                summarize(i + 1, len(chunks), chunk) for i, chunk in enumerate(chunks)
+            ])
+            text = self._join_summaries(summaries)
+            logger.info(f"[CHUNKING] Reduced {len(chunks)} chunks to ~{estimate_tokens(text)} tokens")
+            if estimate_tokens(text) <= token_budget:
+                return text
+        
+        return truncate_to_tokens(text, token_budget)
+
+    def _summarize_chunk(self, part: int, total: int, chunk: str) -> str:
+        """
+        Сжимает одну часть CV; при ошибке вместо сводки берется начало части
         """
         import logging
         logger = logging.getLogger(__name__)
         
         try:
-            if job_description:
-                prompt = ANALYZE_CV_WITH_JOB_DESCRIPTION_PROMPT.format(
-                    cv_text=cv_text,
-                    job_description=job_description
-                )
-            else:
-                prompt = ANALYZE_CV_PROMPT.format(
-                    cv_text=cv_text,
-                    requirements_text="General software development position"
-                )
+            response = self._make_mistral_request(
+                self._build_summary_prompt(part, total, chunk),
+                prompt_type="summary"
+            )
+            return self._parse_summary(response)
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.warning(f"[CHUNKING] Failed to summarize part {part}/{total}: {e}")
+            return truncate_to_tokens(chunk, self.budget.output_limit("summary"))
+
+    async def _summarize_chunk_async(self, part: int, total: int, chunk: str) -> str:
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        try:
+            response = await self._make_mistral_request_async(
+                self._build_summary_prompt(part, total, chunk),
+                prompt_type="summary"
+            )
+            return self._parse_summary(response)
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.warning(f"[CHUNKING] Failed to summarize part {part}/{total}: {e}")
+            return truncate_to_tokens(chunk, self.budget.output_limit("summary"))
+
+    def _build_summary_prompt(self, part: int, total: int, chunk: str) -> str:
+        return CV_SECTION_SUMMARY_PROMPT.format(
+            part=part,
+            total_parts=total,
+            cv_text=chunk,
+            # ~0.75 слова на токен, с запасом на JSON-обертку
+            max_words=int(self.budget.output_limit("summary") * 0.6)
+        )
+
+    def _parse_summary(self, response: str) -> str:
+        summary = json.loads(response.strip()).get("section_summary")
+        if not isinstance(summary, str) or not summary.strip():
+            raise ValueError("Summary is missing in AI response")
+        return truncate_to_tokens(summary.strip(), self.budget.output_limit("summary"))
+
+    def _join_summaries(self, summaries: List[str]) -> str:
+        total = len(summaries)
+        return "\n\n".join(
+            f"--- Summary of part {i + 1}/{total} ---\n{summary}" for i, summary in enumerate(summaries)
+        )
+
+    def _fit_prompt(self, build_prompt: Callable[[str], str], cv_text: str, prompt_type: str) -> str:
+        """
+        Собирает промпт так, чтобы он вместе с ответом поместился в окно модели:
+        длинный CV сначала сжимается (map-reduce), остаток обрезается
+        """
+        limit = self.budget.text_budget(build_prompt(""), prompt_type)
+        cv_text = self.condense_cv_text(cv_text, min(CV_INPUT_TOKEN_BUDGET, limit))
+        return build_prompt(truncate_to_tokens(cv_text, limit))
+
+    async def _fit_prompt_async(self, build_prompt: Callable[[str], str], cv_text: str, prompt_type: str) -> str:
+        limit = self.budget.text_budget(build_prompt(""), prompt_type)
+        cv_text = await self.condense_cv_text_async(cv_text, min(CV_INPUT_TOKEN_BUDGET, limit))
+        return build_prompt(truncate_to_tokens(cv_text, limit))
+
+    def _build_detailed_prompt(self, cv_text: str, job_description: str = "") -> str:
+        """
+        Формирует промпт детального анализа CV
+        """
+        if job_description:
+            return ANALYZE_CV_WITH_JOB_DESCRIPTION_PROMPT.format(
+                cv_text=cv_text,
+                job_description=job_description
+            )
+        return ANALYZE_CV_PROMPT.format(
+            cv_text=cv_text,
+            requirements_text="General software development position"
+        )
+
+    def analyze_cv_detailed(
+        self, cv_text: str, job_description: str = "", on_section: Optional[SectionCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Детальный анализ CV с полной структурой achievers_rating.
+        
+        on_section получает секции анализа (experience_summary, achievers_rating, ...)
+        по мере их генерации моделью.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        try:
+            prompt = self._fit_prompt(
+                lambda text: self._build_detailed_prompt(text, job_description), cv_text, "detailed"
+            )
             
             logger.info(f"[MISTRAL] About to call Mistral API with prompt length: {len(prompt)}")
-            response = self._make_mistral_request(prompt)
+            response = self._make_mistral_request(prompt, on_section=on_section, prompt_type="detailed")
             
             # Try to parse as JSON first
             try:
                 result = json.loads(response.strip())
                 logger.info(f"[MISTRAL] Successfully parsed detailed analysis JSON")
+                # Ответ из кэша или от другого воркера пришел целиком - отдаем все секции
+                if on_section is not None and isinstance(result, dict):
+                    for key, value in result.items():
+                        on_section(key, value)
                 return result
             except json.JSONDecodeError as e:
                 logger.warning(f"[MISTRAL] Failed to parse JSON response: {e}")
@@ -197,6 +543,10 @@ class CVAnalyzer:
                 # Fallback to simple analysis
                 return self.analyze_cv_simple(cv_text, job_description)
                 
+        except (CircuitOpenError, RateLimitTimeoutError):
+            # Mistral недоступен или квота не получена: простой анализ снова ждал бы
+            # того же, отдаем ошибку сразу (повтор - в задаче Celery)
+            raise
         except Exception as e:
             logger.error(f"[MISTRAL] Error in detailed analysis: {e}")
             # Fallback to simple analysis
@@ -210,10 +560,12 @@ class CVAnalyzer:
         logger = logging.getLogger(__name__)
         
         try:
-            prompt = SIMPLE_CV_ANALYSIS_PROMPT.format(cv_text=cv_text)
+            prompt = self._fit_prompt(
+                lambda text: SIMPLE_CV_ANALYSIS_PROMPT.format(cv_text=text), cv_text, "simple"
+            )
             
             logger.info(f"[MISTRAL] About to call Mistral API with simple prompt length: {len(prompt)}")
-            response = self._make_mistral_request(prompt)
+            response = self._make_mistral_request(prompt, prompt_type="simple")
             
             # Try to parse as JSON first
             try:
@@ -225,88 +577,115 @@ class CVAnalyzer:
                 logger.warning(f"[MISTRAL] Response preview: {response[:500]}")
                 
                 # Fallback to basic response
-                return {
-                    "full_name": "Unknown",
-                    "summary": "Analysis failed",
-                    "overall_score": 50,
-                    "skills_score": 50,
-                    "experience_score": 50,
-                    "education_score": 50,
-                    "match_score": 50,
-                    "strengths": ["Analysis could not be completed"],
-                    "weaknesses": ["Technical issue with AI analysis"],
-                    "recommendations": ["Please try again or contact support"]
-                }
+                return self._simple_parse_failure_result()
                 
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"[MISTRAL] Error in simple analysis: {e}")
-            return {
-                "full_name": "Unknown",
-                "summary": "Analysis failed due to technical error",
-                "overall_score": 0,
-                "skills_score": 0,
-                "experience_score": 0,
-                "education_score": 0,
-                "match_score": 0,
-                "strengths": [],
-                "weaknesses": ["Technical error prevented analysis"],
-                "recommendations": ["Please check your API configuration"]
-            }
+            return self._simple_error_result()
 
-    def analyze_cv_with_score(self, cv_text: str, job_description: str = "") -> Dict[str, Any]:
+    def _simple_parse_failure_result(self) -> Dict[str, Any]:
+        """
+        Базовый ответ, когда AI вернул неразбираемый JSON
+        """
+        return {
+            "full_name": "Unknown",
+            "summary": "Analysis failed",
+            "overall_score": 50,
+            "skills_score": 50,
+            "experience_score": 50,
+            "education_score": 50,
+            "match_score": 50,
+            "strengths": ["Analysis could not be completed"],
+            "weaknesses": ["Technical issue with AI analysis"],
+            "recommendations": ["Please try again or contact support"]
+        }
+
+    def _simple_error_result(self) -> Dict[str, Any]:
+        """
+        Ответ при технической ошибке обращения к AI
+        """
+        return {
+            "full_name": "Unknown",
+            "summary": "Analysis failed due to technical error",
+            "overall_score": 0,
+            "skills_score": 0,
+            "experience_score": 0,
+            "education_score": 0,
+            "match_score": 0,
+            "strengths": [],
+            "weaknesses": ["Technical error prevented analysis"],
+            "recommendations": ["Please check your API configuration"]
+        }
+
+    def analyze_cv_with_score(
+        self, cv_text: str, job_description: str = "", on_section: Optional[SectionCallback] = None
+    ) -> Dict[str, Any]:
         """
         Анализ CV с оценками от 0 до 100 (совместимость с существующим API)
         """
         import logging
         logger = logging.getLogger(__name__)
         
+        # Длинный текст сжимается один раз - и для детального, и для простого анализа
+        cv_text = self.condense_cv_text(cv_text)
+        
         try:
             # Сначала пробуем детальный анализ
-            detailed_result = self.analyze_cv_detailed(cv_text, job_description)
+            detailed_result = self.analyze_cv_detailed(cv_text, job_description, on_section)
             
             # Если есть achievers_rating, конвертируем в формат оценок
             if "achievers_rating" in detailed_result:
-                achievers = detailed_result["achievers_rating"]
-                overall_score = achievers.get("overall_score", 0)
-                
-                # Конвертируем achievers_rating в формат оценок 0-100
-                return {
-                    "full_name": detailed_result.get("experience_summary", {}).get("full_name", "Unknown"),
-                    "summary": detailed_result.get("experience_summary", {}).get("summary", ""),
-                    "years_of_experience": detailed_result.get("experience_summary", {}).get("years_of_experience", ""),
-                    "key_skills": detailed_result.get("experience_summary", {}).get("skills_1_plus_years", ""),
-                    "technologies": detailed_result.get("experience_summary", {}).get("technologies", ""),
-                    "education": f"{detailed_result.get('experience_summary', {}).get('education_degree', '')} - {detailed_result.get('experience_summary', {}).get('education_major', '')}",
-                    "certifications": detailed_result.get("experience_summary", {}).get("certifications", ""),
-                    "overall_score": min(overall_score * 5, 100),  # Масштабируем до 100
-                    "skills_score": min(achievers.get("skills", {}).get("score", 0) * 10, 100),
-                    "experience_score": min(achievers.get("experience_bonus", {}).get("score", 0) * 20, 100),
-                    "education_score": 75,  # Базовая оценка для образования
-                    "match_score": int(detailed_result.get("overall_assessment", {}).get("match_score", 0.5) * 100),
-                    "strengths": detailed_result.get("overall_assessment", {}).get("strengths", []),
-                    "weaknesses": detailed_result.get("overall_assessment", {}).get("weaknesses", []),
-                    "recommendations": [rec.get("suggestion", "") for rec in detailed_result.get("recommendations", [])],
-                    "availability": "Available",
-                    "score_breakdown": {
-                        "skills_quality": min(achievers.get("skills", {}).get("score", 0) * 10, 100),
-                        "experience_depth": min(achievers.get("experience_bonus", {}).get("score", 0) * 20, 100),
-                        "education_quality": 75,
-                        "overall_impression": min(overall_score * 5, 100)
-                    },
-                    # Добавляем детальную структуру для совместимости
-                    "achievers_rating": achievers,
-                    "experience_summary": detailed_result.get("experience_summary", {}),
-                    "requirements_analysis": detailed_result.get("requirements_analysis", {}),
-                    "overall_assessment": detailed_result.get("overall_assessment", {})
-                }
+                return self._convert_to_score_format(detailed_result)
             else:
                 # Если нет achievers_rating, используем простой анализ
                 return self.analyze_cv_simple(cv_text, job_description)
                 
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"[MISTRAL] Error in analyze_cv_with_score: {e}")
             return self.analyze_cv_simple(cv_text, job_description)
 
+    def _convert_to_score_format(self, detailed_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Конвертирует детальный анализ (achievers_rating) в формат оценок 0-100
+        """
+        achievers = detailed_result["achievers_rating"]
+        overall_score = achievers.get("overall_score", 0)
+        
+        # Конвертируем achievers_rating в формат оценок 0-100
+        return {
+            "full_name": detailed_result.get("experience_summary", {}).get("full_name", "Unknown"),
+            "summary": detailed_result.get("experience_summary", {}).get("summary", ""),
+            "years_of_experience": detailed_result.get("experience_summary", {}).get("years_of_experience", ""),
+            "key_skills": detailed_result.get("experience_summary", {}).get("skills_1_plus_years", ""),
+            "technologies": detailed_result.get("experience_summary", {}).get("technologies", ""),
+            "education": f"{detailed_result.get('experience_summary', {}).get('education_degree', '')} - {detailed_result.get('experience_summary', {}).get('education_major', '')}",
+            "certifications": detailed_result.get("experience_summary", {}).get("certifications", ""),
+            "overall_score": min(overall_score * 5, 100),  # Масштабируем до 100
+            "skills_score": min(achievers.get("skills", {}).get("score", 0) * 10, 100),
+            "experience_score": min(achievers.get("experience_bonus", {}).get("score", 0) * 20, 100),
+            "education_score": 75,  # Базовая оценка для образования
+            "match_score": int(detailed_result.get("overall_assessment", {}).get("match_score", 0.5) * 100),
+            "strengths": detailed_result.get("overall_assessment", {}).get("strengths", []),
+            "weaknesses": detailed_result.get("overall_assessment", {}).get("weaknesses", []),
+            "recommendations": [rec.get("suggestion", "") for rec in detailed_result.get("recommendations", [])],
+            "availability": "Available",
+            "score_breakdown": {
+                "skills_quality": min(achievers.get("skills", {}).get("score", 0) * 10, 100),
+                "experience_depth": min(achievers.get("experience_bonus", {}).get("score", 0) * 20, 100),
+                "education_quality": 75,
+                "overall_impression": min(overall_score * 5, 100)
+            },
+            # Добавляем детальную структуру для совместимости
+            "achievers_rating": achievers,
+            "experience_summary": detailed_result.get("experience_summary", {}),
+            "requirements_analysis": detailed_result.get("requirements_analysis", {}),
+            "overall_assessment": detailed_result.get("overall_assessment", {})
+        }
+
     def generate_comparison_matrix(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Генерирует матрицу сравнения кандидатов
@@ -323,7 +702,7 @@ class CVAnalyzer:
             )
             
             logger.info(f"[MISTRAL] Generating comparison matrix for {len(candidates_data)} candidates")
-            response = self._make_mistral_request(prompt)
+            response = self._make_mistral_request(prompt, prompt_type="comparison")
             
             # Парсим JSON ответ
             try:
@@ -337,6 +716,9 @@ class CVAnalyzer:
                     "candidates_data": candidates_data
                 }
                 
+        except (CircuitOpenError, RateLimitTimeoutError, requests.exceptions.RequestException):
+            # Сбой связи с моделью или нет квоты - решение о повторе принимает вызывающий (задача Celery)
+            raise
         except Exception as e:
             logger.error(f"[MISTRAL] Error generating comparison matrix: {e}")
             return {
@@ -360,7 +742,7 @@ class CVAnalyzer:
             )
             
             logger.info(f"[MISTRAL] Analyzing {len(candidates_data)} candidates together")
-            response = self._make_mistral_request(prompt)
+            response = self._make_mistral_request(prompt, prompt_type="comparison")
             
             # Парсим JSON ответ
             try:
@@ -374,6 +756,8 @@ class CVAnalyzer:
                     "candidates_data": candidates_data
                 }
                 
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"[MISTRAL] Error analyzing multiple candidates: {e}")
             return {
@@ -397,7 +781,7 @@ class CVAnalyzer:
             )
             
             logger.info(f"[MISTRAL] Getting hiring recommendations for {len(candidates_data)} candidates")
-            response = self._make_mistral_request(prompt)
+            response = self._make_mistral_request(prompt, prompt_type="comparison")
             
             # Парсим JSON ответ
             try:
@@ -411,9 +795,161 @@ class CVAnalyzer:
                     "candidates_data": candidates_data
                 }
                 
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"[MISTRAL] Error getting hiring recommendations: {e}")
             return {
                 "error": f"Error getting hiring recommendations: {str(e)}",
                 "candidates_data": candidates_data
-            } 
\ No newline at end of file
+            } 
+    # ------------------------------------------------------------------
+    # Асинхронные варианты для FastAPI: не блокируют event loop и
+    # используют общий keep-alive пул соединений MistralClient
+    # ------------------------------------------------------------------
+
+    async def analyze_cv_detailed_async(self, cv_text: str, job_description: str = "") -> Dict[str, Any]:
+        """
+        Асинхронный детальный анализ CV (см. analyze_cv_detailed)
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        try:
+            prompt = await self._fit_prompt_async(
+                lambda text: self._build_detailed_prompt(text, job_description), cv_text, "detailed"
+            )
+            
+            logger.info(f"[MISTRAL] About to call Mistral API (async) with prompt length: {len(prompt)}")
+            response = await self._make_mistral_request_async(prompt, prompt_type="detailed")
+            
+            try:
+                result = json.loads(response.strip())
+                logger.info("[MISTRAL] Successfully parsed detailed analysis JSON")
+                return result
+            except json.JSONDecodeError as e:
+                logger.warning(f"[MISTRAL] Failed to parse JSON response: {e}")
+                logger.warning(f"[MISTRAL] Response preview: {response[:500]}")
+                return await self.analyze_cv_simple_async(cv_text, job_description)
+                
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"[MISTRAL] Error in detailed analysis: {e}")
+            return await self.analyze_cv_simple_async(cv_text, job_description)
+
+    async def analyze_cv_simple_async(self, cv_text: str, job_description: str = "") -> Dict[str, Any]:
+        """
+        Асинхронный простой анализ CV (см. analyze_cv_simple)
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        try:
+            prompt = await self._fit_prompt_async(
+                lambda text: SIMPLE_CV_ANALYSIS_PROMPT.format(cv_text=text), cv_text, "simple"
+            )
+            
+            logger.info(f"[MISTRAL] About to call Mistral API (async) with simple prompt length: {len(prompt)}")
+            response = await self._make_mistral_request_async(prompt, prompt_type="simple")
+            
+            try:
+                result = json.loads(response.strip())
+                logger.info("[MISTRAL] Successfully parsed simple analysis JSON")
+                return result
+            except json.JSONDecodeError as e:
+                logger.warning(f"[MISTRAL] Failed to parse JSON response: {e}")
+                logger.warning(f"[MISTRAL] Response preview: {response[:500]}")
+                return self._simple_parse_failure_result()
+                
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"[MISTRAL] Error in simple analysis: {e}")
+            return self._simple_error_result()
+
+    async def analyze_cv_with_score_async(self, cv_text: str, job_description: str = "") -> Dict[str, Any]:
+        """
+        Асинхронный анализ CV с оценками от 0 до 100 (см. analyze_cv_with_score)
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        cv_text = await self.condense_cv_text_async(cv_text)
+        
+        try:
+            detailed_result = await self.analyze_cv_detailed_async(cv_text, job_description)
+            
+            if "achievers_rating" in detailed_result:
+                return self._convert_to_score_format(detailed_result)
+            return await self.analyze_cv_simple_async(cv_text, job_description)
+                
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"[MISTRAL] Error in analyze_cv_with_score_async: {e}")
+            return await self.analyze_cv_simple_async(cv_text, job_description)
+
+    async def _run_candidates_prompt_async(
+        self,
+        prompt_template: str,
+        candidates_data: List[Dict[str, Any]],
+        operation: str
+    ) -> Dict[str, Any]:
+        """
+        Общий асинхронный путь для промптов по списку кандидатов.
+        operation - описание операции для логов и сообщений об ошибках
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        try:
+            candidates_json = json.dumps(candidates_data, indent=2, ensure_ascii=False)
+            prompt = prompt_template.format(candidates_data=candidates_json)
+            
+            logger.info(f"[MISTRAL] Running '{operation}' (async) for {len(candidates_data)} candidates")
+            response = await self._make_mistral_request_async(prompt, prompt_type="comparison")
+            
+            try:
+                result = json.loads(response.strip())
+                logger.info(f"[MISTRAL] Successfully completed '{operation}'")
+                return result
+            except json.JSONDecodeError as e:
+                logger.error(f"[MISTRAL] Failed to parse '{operation}' JSON: {e}")
+                return {
+                    "error": f"Failed to {operation}",
+                    "candidates_data": candidates_data
+                }
+                
+        except (CircuitOpenError, RateLimitTimeoutError):
+            raise
+        except Exception as e:
+            logger.error(f"[MISTRAL] Error in '{operation}': {e}")
+            return {
+                "error": f"Error in {operation}: {str(e)}",
+                "candidates_data": candidates_data
+            }
+
+    async def generate_comparison_matrix_async(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Асинхронно генерирует матрицу сравнения кандидатов
+        """
+        return await self._run_candidates_prompt_async(
+            CANDIDATE_COMPARISON_MATRIX_PROMPT, candidates_data, "generate comparison matrix"
+        )
+
+    async def analyze_multiple_candidates_async(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Асинхронно анализирует несколько кандидатов вместе
+        """
+        return await self._run_candidates_prompt_async(
+            COMBINE_AND_ANALYZE_CANDIDATES_PROMPT, candidates_data, "analyze multiple candidates"
+        )
+
+    async def get_hiring_recommendations_async(self, candidates_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Асинхронно получает рекомендации по найму для кандидатов
+        """
+        return await self._run_candidates_prompt_async(
+            WHICH_CANDIDATE_TO_HIRE_PROMPT, candidates_data, "generate hiring recommendations"
+        )
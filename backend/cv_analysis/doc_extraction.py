@@ -0,0 +1,241 @@
+"""
+Legacy Word 97-2003 (.doc) text extraction: OLE2 compound file + piece table
+"""
+import re
+import struct
+from typing import Dict, Iterator, List, Tuple
+
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+WORD_IDENT = 0xA5EC
+
+# Номера секторов выше этого - служебные (конец цепочки, свободный и т.п.)
+_MAX_REG_SECT = 0xFFFFFFFA
+
+_STREAM = 2
+_ROOT = 5
+
+# Флаги FIB (смещение 0x0A)
+_F_ENCRYPTED = 0x0100
+_F_WHICH_TBL_STM = 0x0200
+
+# Бит FcCompressed: текст куска хранится в 8-битной кодировке (cp1252)
+_FC_COMPRESSED = 0x40000000
+
+# Управляющие символы Word: абзац, ячейка таблицы, разрывы строки/страницы/раздела
+_PARAGRAPH_MARKS = "\r\x07\x0b\x0c\x0e"
+_FIELD_BEGIN, _FIELD_SEPARATOR, _FIELD_END = "\x13", "\x14", "\x15"
+_CONTROL = re.compile("([\r\x07\x0b\x0c\x0e\x13\x14\x15])")
+# Якоря картинок/объектов и мягкий перенос в текст не попадают
+_DROPPED = dict.fromkeys(map(ord, "\x01\x02\x03\x04\x05\x08\x1f"))
+_DROPPED[0x1E] = "-"  # неразрывный дефис
+
+
+class OLEFile:
+    """
+    Минимальный читатель OLE2 compound file (CFB): FAT, mini FAT и каталог.
+    Нужен только для чтения потоков WordDocument/1Table/0Table.
+    """
+
+    def __init__(self, data: bytes):
+        if len(data) < 512 or data[:8] != OLE_SIGNATURE:
+            raise ValueError("Not an OLE2 compound file")
+        self.data = data
+        self.sector_size = 1 << struct.unpack_from("<H", data, 0x1E)[0]
+        self.mini_sector_size = 1 << struct.unpack_from("<H", data, 0x20)[0]
+        (
+            fat_sectors, first_dir, _, self.mini_cutoff,
+            first_minifat, minifat_sectors, first_difat, difat_sectors
+        ) = struct.unpack_from("<IIIIIIII", data, 0x2C)
+
+        difat = list(struct.unpack_from("<109I", data, 0x4C))
+        sector = first_difat
+        per_sector = self.sector_size // 4 - 1
+        for _ in range(difat_sectors):
+            if sector > _MAX_REG_SECT:
+                break
+            entries = struct.unpack_from(f"<{per_sector + 1}I", data, self._offset(sector))
+            difat.extend(entries[:per_sector])
+            sector = entries[per_sector]
+
+        fat_bytes = b"".join(self._sector(s) for s in difat[:fat_sectors] if s <= _MAX_REG_SECT)
+        self.fat = struct.unpack(f"<{len(fat_bytes) // 4}I", fat_bytes)
+
+        minifat_bytes = self._read_chain(first_minifat) if minifat_sectors else b""
+        self.minifat = struct.unpack(f"<{len(minifat_bytes) // 4}I", minifat_bytes)
+
+        root, self.entries = self._read_directory(first_dir)
+        self.mini_stream = self._read_chain(root[0])[:root[1]] if root[1] else b""
+
+    def _offset(self, sector: int) -> int:
+        return (sector + 1) * self.sector_size
+
+    def _sector(self, sector: int) -> bytes:
+        offset = self._offset(sector)
+        return self.data[offset:offset + self.sector_size]
+
+    def _read_chain(self, start: int) -> bytes:
+        chunks = []
+        sector, seen = start, set()
+        while sector <= _MAX_REG_SECT:
+            if sector in seen or sector >= len(self.fat):
+                raise ValueError("Corrupted FAT chain")
+            seen.add(sector)
+            chunks.append(self._sector(sector))
+            sector = self.fat[sector]
+        return b"".join(chunks)
+
+    def _read_mini_chain(self, start: int) -> bytes:
+        chunks = []
+        sector, seen = start, set()
+        size = self.mini_sector_size
+        while sector <= _MAX_REG_SECT:
+            if sector in seen or sector >= len(self.minifat):
+                raise ValueError("Corrupted mini FAT chain")
+            seen.add(sector)
+            chunks.append(self.mini_stream[sector * size:(sector + 1) * size])
+            sector = self.minifat[sector]
+        return b"".join(chunks)
+
+    def _read_directory(self, first_dir: int) -> Tuple[Tuple[int, int], Dict[str, Tuple[int, int]]]:
+        """
+        Корневой элемент (первый сектор, размер mini stream) и потоки -
+        прямые потомки корня: имя -> (первый сектор, размер). Потомки
+        хранятся красно-черным деревом (левый/правый сосед), поэтому поток с
+        тем же именем во вложенном хранилище (например, во встроенном
+        объекте) не подменяет поток документа.
+        """
+        directory = self._read_chain(first_dir)
+        count = len(directory) // 128
+        if not count or directory[66] != _ROOT:
+            raise ValueError("OLE root entry not found")
+        root = struct.unpack_from("<II", directory, 116)
+
+        entries = {}
+        stack, seen = [struct.unpack_from("<I", directory, 76)[0]], set()
+        while stack:
+            index = stack.pop()
+            if index >= count:
+                continue
+            if index in seen:
+                raise ValueError("Corrupted OLE directory tree")
+            seen.add(index)
+            offset = index * 128
+            name_length, entry_type = struct.unpack_from("<HB", directory, offset + 64)
+            left, right = struct.unpack_from("<II", directory, offset + 68)
+            stack.extend((left, right))
+            if entry_type != _STREAM or not 2 <= name_length <= 64:
+                continue
+            name = directory[offset:offset + name_length - 2].decode("utf-16-le", errors="replace")
+            entries[name] = struct.unpack_from("<II", directory, offset + 116)
+        return root, entries
+
+    def open_stream(self, name: str) -> bytes:
+        if name not in self.entries:
+            raise ValueError(f"OLE stream not found: {name}")
+        start, size = self.entries[name]
+        if size < self.mini_cutoff:
+            return self._read_mini_chain(start)[:size]
+        return self._read_chain(start)[:size]
+
+
+def _piece_table(table: bytes, fc_clx: int, lcb_clx: int) -> List[Tuple[int, int, int]]:
+    """Куски текста из Clx: (начальный CP, конечный CP, fc)"""
+    position, end = fc_clx, fc_clx + lcb_clx
+    while position < end:
+        kind = table[position]
+        if kind == 0x01:
+            # Prc: форматирование кусков, пропускаем
+            position += 3 + struct.unpack_from("<h", table, position + 1)[0]
+        elif kind == 0x02:
+            lcb = struct.unpack_from("<I", table, position + 1)[0]
+            plc = table[position + 5:position + 5 + lcb]
+            count = (lcb - 4) // 12
+            cps = struct.unpack_from(f"<{count + 1}I", plc, 0)
+            return [
+                (cps[i], cps[i + 1], struct.unpack_from("<I", plc, (count + 1) * 4 + i * 8 + 2)[0])
+                for i in range(count)
+            ]
+        else:
+            break
+    raise ValueError("Piece table not found in .doc")
+
+
+def _iter_raw_text(word: bytes, table: bytes, fc_clx: int, lcb_clx: int, ccp_text: int) -> Iterator[str]:
+    """Текст основного документа (первые ccp_text символов) по кускам"""
+    for cp_start, cp_end, fc in _piece_table(table, fc_clx, lcb_clx):
+        if cp_start >= ccp_text:
+            break
+        length = min(cp_end, ccp_text) - cp_start
+        if fc & _FC_COMPRESSED:
+            offset = (fc & ~_FC_COMPRESSED) // 2
+            yield word[offset:offset + length].decode("cp1252", errors="replace")
+        else:
+            yield word[fc:fc + 2 * length].decode("utf-16-le", errors="replace")
+
+
+def _iter_paragraphs(pieces: Iterator[str]) -> Iterator[str]:
+    """
+    Делит текст на абзацы и убирает служебное: код полей (между \\x13 и
+    \\x14 остается только отображаемый результат) и якоря объектов.
+    Ячейки таблицы (\\x07) становятся отдельными строками.
+    """
+    buffer: List[str] = []
+    # Для каждого открытого поля: True, пока идет его код (до разделителя)
+    field_stack: List[bool] = []
+    in_code = False
+    for piece in pieces:
+        # Текст между управляющими символами обрабатывается целыми отрезками
+        for token in _CONTROL.split(piece):
+            if not token:
+                continue
+            if token == _FIELD_BEGIN:
+                field_stack.append(True)
+            elif token == _FIELD_SEPARATOR:
+                if field_stack:
+                    field_stack[-1] = False
+            elif token == _FIELD_END:
+                if field_stack:
+                    field_stack.pop()
+            elif in_code:
+                continue
+            elif token in _PARAGRAPH_MARKS:
+                yield "".join(buffer).translate(_DROPPED)
+                buffer = []
+            else:
+                buffer.append(token)
+            in_code = any(field_stack)
+    if buffer:
+        yield "".join(buffer).translate(_DROPPED)
+
+
+def iter_doc_parts_text(data: bytes) -> Iterator[str]:
+    """
+    Отдает текст .doc (Word 97-2003) по абзацам.
+    Зашифрованные документы и форматы старше Word 97 не поддерживаются (ValueError).
+    """
+    ole = OLEFile(data)
+    word = ole.open_stream("WordDocument")
+    if len(word) < 0x1AA:
+        raise ValueError("WordDocument stream is too short")
+    ident, _, _, _, flags = struct.unpack_from("<HHHHH", word, 0)
+    if ident != WORD_IDENT:
+        raise ValueError("Not a Word 97-2003 document")
+    if flags & _F_ENCRYPTED:
+        raise ValueError("Encrypted .doc is not supported")
+
+    # FIB: база 32 байта, затем rgW (csw слов), rgLw (cslw двойных слов), rgFcLcb
+    csw = struct.unpack_from("<H", word, 32)[0]
+    lw_offset = 34 + csw * 2
+    cslw = struct.unpack_from("<H", word, lw_offset)[0]
+    ccp_text = struct.unpack_from("<i", word, lw_offset + 2 + 3 * 4)[0]
+    fc_lcb_offset = lw_offset + 2 + cslw * 4 + 2
+    fc_clx, lcb_clx = struct.unpack_from("<II", word, fc_lcb_offset + 33 * 8)
+
+    if not lcb_clx:
+        # Документ без таблицы кусков: текст подряд в 8-битной кодировке
+        fc_min = struct.unpack_from("<I", word, 0x18)[0]
+        yield from _iter_paragraphs(iter([word[fc_min:fc_min + ccp_text].decode("cp1252", errors="replace")]))
+        return
+
+    table = ole.open_stream("1Table" if flags & _F_WHICH_TBL_STM else "0Table")
+    yield from _iter_paragraphs(_iter_raw_text(word, table, fc_clx, lcb_clx, ccp_text))
@@ -0,0 +1,132 @@
+"""
+Streaming DOCX text extractor (iterparse over the WordprocessingML zip parts)
+"""
+import re
+import zipfile
+from typing import BinaryIO, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_NS = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+_P = W_NS + "p"
+_T = W_NS + "t"
+_TAB = W_NS + "tab"
+_PTAB = W_NS + "ptab"
+_BR = W_NS + "br"
+_CR = W_NS + "cr"
+_NO_BREAK_HYPHEN = W_NS + "noBreakHyphen"
+_PPR = W_NS + "pPr"
+_TBL = W_NS + "tbl"
+_TR = W_NS + "tr"
+_TC = W_NS + "tc"
+_FALLBACK = MC_NS + "Fallback"
+
+_HEADER_PART = re.compile(r"^word/header\d*\.xml$")
+_FOOTER_PART = re.compile(r"^word/footer\d*\.xml$")
+_DOCUMENT_PART = "word/document.xml"
+
+# Разделитель ячеек строки таблицы в извлеченном тексте
+CELL_SEPARATOR = " | "
+
+
+class _Table:
+    """Состояние открытой таблицы: ячейки текущей строки (None - вне строки)"""
+
+    def __init__(self):
+        self.row: Optional[List[List[str]]] = None
+
+
+def iter_part_text(stream: BinaryIO) -> Iterator[str]:
+    """
+    Отдает текст одной XML-части DOCX: абзацы по одному, строки таблиц
+    целиком ("ячейка | ячейка"), абзацы надписей (text box) - отдельно.
+
+    Разбор потоковый: обработанные элементы сразу очищаются, поэтому
+    память не растет с размером документа. Содержимое mc:Fallback
+    пропускается - это дубликат надписи для старых версий Word.
+    """
+    paragraphs: List[List[str]] = []
+    tables: List[_Table] = []
+    fallback_depth = 0
+    properties_depth = 0
+
+    def route(text: str) -> Optional[str]:
+        """Текст в ячейку открытой строки таблицы; иначе возвращается для выдачи"""
+        for table in reversed(tables):
+            if table.row is not None:
+                if table.row:
+                    table.row[-1].append(text)
+                return None
+        return text
+
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _FALLBACK:
+                fallback_depth += 1
+            elif fallback_depth:
+                continue
+            elif tag == _P:
+                paragraphs.append([])
+            elif tag == _PPR:
+                properties_depth += 1
+            elif tag == _TBL:
+                tables.append(_Table())
+            elif tag == _TR and tables:
+                tables[-1].row = []
+            elif tag == _TC and tables and tables[-1].row is not None:
+                tables[-1].row.append([])
+            continue
+
+        if tag == _FALLBACK:
+            fallback_depth -= 1
+            elem.clear()
+            continue
+        if fallback_depth:
+            continue
+
+        if tag == _PPR:
+            properties_depth -= 1
+        elif not paragraphs or properties_depth:
+            pass
+        elif tag == _T:
+            paragraphs[-1].append(elem.text or "")
+        elif tag in (_TAB, _PTAB):
+            paragraphs[-1].append("\t")
+        elif tag in (_BR, _CR):
+            paragraphs[-1].append("\n")
+        elif tag == _NO_BREAK_HYPHEN:
+            paragraphs[-1].append("-")
+
+        if tag == _P:
+            text = route("".join(paragraphs.pop()))
+            if text is not None:
+                yield text
+        elif tag == _TR and tables:
+            row, tables[-1].row = tables[-1].row or [], None
+            cells = [" ".join(part for part in cell if part) for cell in row]
+            if any(cells):
+                text = route(CELL_SEPARATOR.join(cells))
+                if text is not None:
+                    yield text
+        elif tag == _TBL and tables:
+            tables.pop()
+
+        # Элементы верхнего уровня разобраны полностью - освобождаем память
+        if tag in (_P, _TBL) and not paragraphs and not tables:
+            elem.clear()
+
+
+def iter_docx_parts_text(source: BinaryIO) -> Iterator[str]:
+    """
+    Текст DOCX: колонтитулы (header), тело документа, затем нижние
+    колонтитулы (footer). В шапке резюме часто стоят имя и контакты.
+    """
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        headers = sorted(name for name in names if _HEADER_PART.match(name))
+        footers = sorted(name for name in names if _FOOTER_PART.match(name))
+        for name in headers + [_DOCUMENT_PART] + footers:
+            with archive.open(name) as part:
+                yield from iter_part_text(part)
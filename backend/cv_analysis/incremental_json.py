@@ -0,0 +1,84 @@
+"""
+Incremental parser for streamed JSON objects
+"""
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """
+    Разбирает JSON-объект, приходящий по частям, и отдает его элементы
+    верхнего уровня (experience_summary, achievers_rating, ...) сразу, как
+    только закрывается каждый из них.
+
+    Текст до первой "{" (markdown, пояснения модели) игнорируется.
+    Неразбираемые элементы пропускаются - полный ответ все равно проходит
+    через json_repair после окончания потока.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Весь полученный текст"""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Добавляет часть текста и возвращает завершенные пары (ключ, значение)"""
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self._text
+
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 2 and self._member_start is not None:
+                    # Закрылась секция-объект или массив верхнего уровня
+                    self._emit(text[self._member_start:self._pos + 1], completed)
+                    self._member_start = None
+                elif self._depth == 1:
+                    if self._member_start is not None:
+                        self._emit(text[self._member_start:self._pos], completed)
+                    self.done = True
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                if self._member_start is not None:
+                    self._emit(text[self._member_start:self._pos], completed)
+                self._member_start = self._pos + 1
+            self._pos += 1
+
+        return completed
+
+    def _emit(self, fragment: str, completed: List[Tuple[str, Any]]):
+        fragment = fragment.strip()
+        if not fragment:
+            return
+        try:
+            completed.extend(json.loads("{" + fragment + "}").items())
+        except json.JSONDecodeError:
+            logger.debug(f"[STREAM] Could not parse streamed member: {fragment[:100]}")
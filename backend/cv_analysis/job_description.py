@@ -0,0 +1,121 @@
+"""
+Job description loading: cached PDF extraction and a parsed requirements structure
+"""
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from .parallel_extraction import ExtractionPool, extraction_pool
+from .text_normalization import is_raw_pdf_garbage, normalize_text
+from .upload_index import UploadIndex, content_hash, upload_index
+
+logger = logging.getLogger(__name__)
+
+# Описание вакансии по умолчанию, если файл вакансии не удалось прочитать
+GENERIC_JOB_DESCRIPTION = "Software development position requiring technical skills and experience"
+
+# Заголовки разделов вакансии -> ключ в структуре требований
+_SECTION_HEADINGS = {
+    "requirements": r"requirements|qualifications|must[- ]haves?|what you (?:bring|need|have)|"
+                    r"skills(?: and experience)?|требования|обязательно|что мы ждем|мы ожидаем",
+    "nice_to_have": r"nice[- ]to[- ]haves?|preferred(?: qualifications)?|bonus(?: points)?|(?:will be )?a plus|"
+                    r"будет плюсом|желательно|преимуществом будет",
+    "responsibilities": r"responsibilities|what you(?:'ll| will) do|your role|duties|"
+                        r"обязанности|задачи|чем предстоит заниматься",
+}
+_HEADING = {
+    section: re.compile(rf"^(?:{pattern})\s*:?$", re.IGNORECASE)
+    for section, pattern in _SECTION_HEADINGS.items()
+}
+_BULLET = re.compile(r"^(?:[-•*–—▪●◦·]|\d{1,2}[.)])\s*")
+# Прочие заголовки ("About us:", "BENEFITS") закрывают текущий раздел
+_OTHER_HEADING = re.compile(r"^(?:[^\W\d_][^:]{0,40}:|[A-ZА-ЯЁ][A-ZА-ЯЁ &/-]{4,40})$")
+
+
+class JobDescriptionError(Exception):
+    """Файл вакансии не дал пригодного текста (пустой или сырой PDF)"""
+
+
+def parse_requirements(text: str) -> Dict[str, Any]:
+    """
+    Разбирает текст вакансии на название (первая строка) и списки:
+    requirements, nice_to_have, responsibilities. Разбор локальный, по
+    заголовкам разделов и маркерам списков, без обращения к модели.
+    """
+    structure: Dict[str, Any] = {"title": "", "requirements": [], "nice_to_have": [], "responsibilities": []}
+    current: Optional[List[str]] = None
+    for raw_line in text.split("\n"):
+        line = raw_line.strip()
+        if not line:
+            continue
+        if not structure["title"]:
+            structure["title"] = line
+            continue
+        heading = next((section for section, pattern in _HEADING.items() if pattern.match(line)), None)
+        if heading:
+            current = structure[heading]
+        elif _BULLET.match(line) and current is not None:
+            item = _BULLET.sub("", line)
+            if item:
+                current.append(item)
+        elif _OTHER_HEADING.match(line):
+            current = None
+        elif current is not None:
+            current.append(line)
+    return structure
+
+
+def storage_object_version(bucket: Any, file_path: str) -> Optional[str]:
+    """
+    Версия объекта в storage (eTag, иначе время изменения) без скачивания.
+    None, если объект не найден или storage не ответил
+    """
+    folder, _, name = file_path.rpartition("/")
+    try:
+        objects = bucket.list(folder, {"search": name}) or []
+    except Exception as e:
+        logger.warning(f"[ANALYSIS] Could not read storage metadata for {file_path}: {e}")
+        return None
+    for item in objects:
+        if item.get("name") == name:
+            metadata = item.get("metadata") or {}
+            return metadata.get("eTag") or item.get("updated_at")
+    return None
+
+
+def load_job_description(
+    file_path: str,
+    download: Callable[[str], bytes],
+    index: UploadIndex = upload_index,
+    pool: ExtractionPool = extraction_pool,
+    version: Optional[Callable[[str], Optional[str]]] = None
+) -> Dict[str, Any]:
+    """
+    Текст и структура требований PDF-вакансии.
+
+    Результат кэшируется по пути в storage вместе с версией объекта
+    (version(file_path) - eTag или время изменения): повторные анализы с той
+    же вакансией не скачивают файл, а файл, замененный по тому же пути,
+    разбирается заново. Без версии файл скачивается всегда. Кэш по SHA-256
+    содержимого избавляет от повторного разбора той же вакансии,
+    загруженной заново. Пустой текст и сырой PDF отклоняются с
+    JobDescriptionError и не кэшируются.
+    """
+    stamp = version(file_path) if version else None
+    cached = index.get_job_description(file_path, stamp) if stamp else None
+    if cached is not None:
+        logger.info(f"[ANALYSIS] Reusing cached job description for {file_path}")
+        return cached
+
+    data = download(file_path)
+    digest = content_hash(data)
+    entry = index.get_job_description_by_hash(digest)
+    if entry is None:
+        raw_text = pool.extract_text("pdf", data)
+        text = normalize_text(raw_text)
+        if not text or is_raw_pdf_garbage(raw_text):
+            raise JobDescriptionError(f"No readable text in job description {file_path}")
+        entry = {"text": text, "requirements": parse_requirements(text)}
+    else:
+        logger.info(f"[ANALYSIS] Reusing job description text by content hash for {file_path}")
+    return index.set_job_description(file_path, digest, entry, stamp)
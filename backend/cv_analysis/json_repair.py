@@ -0,0 +1,166 @@
+"""
+Tolerant extraction and repair of JSON returned by the LLM
+"""
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+from cache.redis_client import redis_cache
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "llm:json_repair"
+
+_CLOSERS = {"{": "}", "[": "]"}
+_STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def _next_significant_char(text: str, index: int) -> Optional[str]:
+    """Первый непробельный символ после позиции index (None - конец текста)"""
+    for ch in text[index + 1:]:
+        if not ch.isspace():
+            return ch
+    return None
+
+
+def _strip_trailing_comma(out: List[str]):
+    """Удаляет висячую запятую перед закрывающей скобкой"""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _close(out: List[str], stack: List[str]) -> str:
+    out = list(out)
+    _strip_trailing_comma(out)
+    while out and out[-1] == ":":
+        out.pop()
+    return "".join(out) + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Tuple[str, bool]:
+    """
+    Восстанавливает JSON-объект из ответа LLM за один проход.
+
+    - отбрасывает текст до первой { / [ и после закрытия верхнего уровня
+      (markdown-блоки, пояснения модели);
+    - экранирует кавычки внутри строк, если за кавычкой не следует , : } ]
+    - экранирует переводы строк внутри строк и убирает висячие запятые;
+    - для обрезанного ответа закрывает строку и скобки, при необходимости
+      откатываясь к последнему целому элементу.
+
+    Возвращает (текст JSON, был ли текст изменен). Бросает json.JSONDecodeError,
+    если восстановить JSON не удалось.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    start = min(starts)
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Точки, до которых ответ заведомо состоит из целых элементов
+    safe_points: List[Tuple[int, List[str]]] = []
+    in_string = False
+    modified = False
+    i = start
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                if i + 1 < n:
+                    out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == '"':
+                if _next_significant_char(text, i) in (None, ",", ":", "}", "]"):
+                    in_string = False
+                    out.append(ch)
+                else:
+                    out.append('\\"')
+                    modified = True
+            elif ch in _STRING_ESCAPES:
+                out.append(_STRING_ESCAPES[ch])
+                modified = True
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+            safe_points.append((len(out), list(stack)))
+        elif ch in "}]":
+            if not stack:
+                break
+            before = len(out)
+            _strip_trailing_comma(out)
+            closer = stack.pop()
+            modified = modified or len(out) != before or closer != ch
+            out.append(closer)
+            if not stack:
+                return "".join(out), modified
+        elif ch == ",":
+            safe_points.append((len(out), list(stack)))
+            out.append(ch)
+        else:
+            out.append(ch)
+        i += 1
+
+    # Ответ обрезан: закрываем строку и все открытые скобки
+    if in_string:
+        out.append('"')
+    candidates = [_close(out, stack)]
+    for length, snapshot in reversed(safe_points):
+        candidates.append(_close(out[:length], snapshot))
+
+    last_error: Optional[json.JSONDecodeError] = None
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate, True
+        except json.JSONDecodeError as e:
+            last_error = e
+    raise last_error or json.JSONDecodeError("Unrecoverable JSON", text, start)
+
+
+def parse_llm_json(text: str) -> Tuple[Any, str]:
+    """
+    Разбирает JSON из ответа LLM.
+
+    Возвращает (объект, outcome), где outcome:
+    clean - ответ уже был валидным JSON;
+    extracted - JSON вырезан из markdown/пояснений без изменений;
+    repaired - JSON пришлось исправить.
+    Бросает json.JSONDecodeError, если восстановить JSON не удалось.
+    """
+    stripped = text.strip()
+    try:
+        return json.loads(stripped), "clean"
+    except json.JSONDecodeError:
+        pass
+
+    repaired, modified = repair_json(stripped)
+    return json.loads(repaired), "repaired" if modified else "extracted"
+
+
+def record_outcome(outcome: str):
+    """Счетчик результатов разбора (clean/extracted/repaired/failed) в Redis"""
+    redis_cache.incr(f"{STATS_KEY}:{outcome}")
+    if outcome in ("repaired", "failed"):
+        logger.info(f"[JSON_REPAIR] LLM response {outcome}")
+
+
+def repair_stats() -> dict:
+    """Сколько ответов LLM разобрано каждым способом"""
+    return {
+        outcome: int(redis_cache.get(f"{STATS_KEY}:{outcome}", 0) or 0)
+        for outcome in ("clean", "extracted", "repaired", "failed")
+    }
@@ -0,0 +1,147 @@
+"""
+Mistral AI HTTP client with persistent keep-alive connection pools
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    MISTRAL_REQUEST_TIMEOUT,
+    MISTRAL_MAX_CONNECTIONS,
+    MISTRAL_MAX_KEEPALIVE_CONNECTIONS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MistralClient:
+    """
+    HTTP-клиент Mistral AI с пулом keep-alive соединений.
+
+    Синхронный путь (Celery) использует requests.Session, асинхронный
+    (FastAPI) - httpx.AsyncClient. Оба переиспользуют TCP/TLS соединения
+    между запросами, поэтому рукопожатие оплачивается один раз на соединение.
+    """
+
+    def __init__(
+        self,
+        timeout: float = MISTRAL_REQUEST_TIMEOUT,
+        max_connections: int = MISTRAL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = MISTRAL_MAX_KEEPALIVE_CONNECTIONS
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def session(self) -> requests.Session:
+        """Синхронная сессия с пулом соединений (создается лениво)"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """
+        Асинхронный клиент, привязанный к текущему event loop.
+
+        httpx.AsyncClient нельзя разделять между разными event loop, поэтому
+        при смене loop (например, в тестах с asyncio.run) создается новый клиент.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=60.0
+                )
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
+        """Синхронный POST через общий пул соединений"""
+        return self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+
+    async def apost(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> httpx.Response:
+        """Асинхронный POST через общий пул соединений"""
+        client = self.get_async_client()
+        return await client.post(url, headers=headers, json=payload)
+
+    def post_stream(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Синхронный POST с stream=true: возвращает события SSE (разобранные
+        JSON-чанки) по мере их поступления
+        """
+        with self.session.post(url, headers=headers, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                event = self._parse_sse_line(line)
+                if event is None:
+                    continue
+                if event == "[DONE]":
+                    return
+                yield event
+
+    async def apost_stream(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Асинхронный вариант post_stream"""
+        client = self.get_async_client()
+        async with client.stream("POST", url, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                event = self._parse_sse_line(line)
+                if event is None:
+                    continue
+                if event == "[DONE]":
+                    return
+                yield event
+
+    @staticmethod
+    def _parse_sse_line(line: Optional[str]) -> Any:
+        """Разбирает строку Server-Sent Events; None - строка без данных"""
+        if not line or not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return data
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning(f"[MISTRAL_API] Skipping malformed stream chunk: {data[:200]}")
+            return None
+
+    def close(self):
+        """Закрывает синхронную сессию"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self):
+        """Закрывает асинхронный клиент и синхронную сессию"""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_loop = None
+        self.close()
+        logger.info("Mistral client connections closed")
+
+
+# Global Mistral client instance
+mistral_client = MistralClient()
@@ -0,0 +1,293 @@
+"""
+Process-pool text extraction for multi-file analyses
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from typing import List, Optional, Tuple
+
+from config import (
+    EXTRACTION_WORKERS,
+    EXTRACTION_PDF_PAGES_PER_TASK,
+    EXTRACTION_MAX_PAGES,
+    EXTRACTION_MAX_CHARS,
+    EXTRACTION_SANDBOX_ENABLED
+)
+from .sandbox import SandboxLimits, run_sandboxed, sandbox_available
+from .text_extraction import PAGE_BREAK, collect_text, iter_doc_text, iter_docx_text, iter_pdf_text, open_pdf
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExtractionJob:
+    """Файл анализа: имя (для заголовка "--- filename ---"), тип и содержимое"""
+    filename: str
+    file_type: str
+    data: Optional[bytes] = None
+    # Ошибка скачивания: файл попадает в результат с сообщением вместо текста
+    error: Optional[str] = None
+    # Уже извлеченный текст (сохраненный ранее); заполняется и после извлечения
+    text: Optional[str] = None
+    # Незавершенное скачивание: содержимое (data) появится, когда future выполнится
+    download: Optional[Future] = None
+
+
+def extract_file(file_type: str, data: bytes, max_chars: Optional[int] = EXTRACTION_MAX_CHARS) -> str:
+    """
+    Текст одного файла по его типу. Выполняется в процессе пула, поэтому
+    функция модульного уровня (должна сериализоваться pickle).
+    """
+    file_type = file_type.lower()
+    if file_type == "pdf":
+        return _extract_pdf_range(data, 0, EXTRACTION_MAX_PAGES, max_chars)
+    if file_type == "docx":
+        try:
+            return collect_text(iter_docx_text(data), max_chars)
+        except MemoryError:
+            raise
+        except Exception as e:
+            logger.error(f"Error extracting text from DOCX: {e}")
+            return ""
+    if file_type == "doc":
+        try:
+            return collect_text(iter_doc_text(data), max_chars)
+        except MemoryError:
+            raise
+        except Exception as e:
+            logger.error(f"Error extracting text from DOC: {e}")
+            return ""
+    return f"[Unsupported file type: {file_type}]"
+
+
+def _extract_pdf_range(data: bytes, start: int, max_pages: Optional[int], max_chars: Optional[int]) -> str:
+    try:
+        return collect_text(iter_pdf_text(data, max_pages, start), max_chars, PAGE_BREAK)
+    except MemoryError:
+        # Нехватку памяти не глотаем: песочница сообщит о превышении лимита
+        raise
+    except Exception as e:
+        logger.error(f"Error extracting text from PDF: {e}")
+        return ""
+
+
+def _extract_pdf_head(data: bytes, max_pages: Optional[int], max_chars: Optional[int]) -> Tuple[int, str]:
+    """
+    Число страниц PDF и текст первых max_pages страниц: файл открывается
+    один раз, в том же процессе, что и извлекает текст
+    """
+    try:
+        reader = open_pdf(data)
+        return len(reader.pages), collect_text(iter_pdf_text(reader, max_pages), max_chars, PAGE_BREAK)
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.error(f"Error extracting text from PDF: {e}")
+        return 0, ""
+
+
+class _ImmediateFuture(Future):
+    """Результат, посчитанный в текущем процессе (когда пул недоступен)"""
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        try:
+            self.set_result(fn(*args))
+        except Exception as e:
+            self.set_exception(e)
+
+
+class ExtractionPool:
+    """
+    Параллельное извлечение текста в пуле процессов.
+
+    Разбор PDF нагружает CPU и держит GIL, поэтому файлы - и диапазоны
+    страниц больших PDF - разбираются в отдельных процессах. Результат
+    собирается в исходном порядке файлов.
+
+    Если пул создать нельзя (например, в daemon-процессе Celery prefork,
+    где запрещены дочерние процессы) или workers=1, извлечение идет
+    последовательно в текущем процессе.
+
+    В режиме песочницы (sandbox=True) каждая задача выполняется в отдельном
+    процессе с лимитами CPU, памяти и времени (процессы порождает fork
+    server, см. sandbox.run_sandboxed), а параллельность дают потоки,
+    ожидающие эти процессы. Так работает и в
+    daemon-процессах Celery; файл, вышедший за лимит, получает ошибку, а
+    остальные файлы пакета извлекаются как обычно.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        pages_per_task: int = EXTRACTION_PDF_PAGES_PER_TASK,
+        max_pages: Optional[int] = EXTRACTION_MAX_PAGES,
+        max_chars: Optional[int] = EXTRACTION_MAX_CHARS,
+        sandbox: bool = EXTRACTION_SANDBOX_ENABLED,
+        limits: Optional[SandboxLimits] = None
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.sandbox = sandbox and sandbox_available()
+        self.limits = limits or SandboxLimits()
+        self._executor: Optional[Executor] = None
+        self._pool_unavailable = self.workers <= 1
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._pool_unavailable:
+            return None
+        with self._lock:
+            if self._executor is None and self.sandbox:
+                # Процессы создает сама песочница, пулу нужны только потоки
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="extract")
+            elif self._executor is None:
+                if multiprocessing.current_process().daemon:
+                    logger.info("[EXTRACT] Daemon process: extracting without a process pool")
+                    self._pool_unavailable = True
+                    return None
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        if self.sandbox:
+            fn = partial(run_sandboxed, fn, limits=self.limits)
+        executor = self._get_executor()
+        if executor is not None:
+            try:
+                return executor.submit(fn, *args)
+            except Exception as e:
+                # Пул сломан (упал процесс и т.п.) - дальше работаем без него
+                logger.warning(f"[EXTRACT] Process pool unavailable, extracting in-process: {e}")
+                self._pool_unavailable = True
+        return _ImmediateFuture(fn, *args)
+
+    def _submit_job(self, job: ExtractionJob) -> List[Future]:
+        """
+        Ставит файл в пул. Для PDF ставится только первый диапазон страниц:
+        эта же задача возвращает (число страниц, текст), остальные диапазоны
+        большого PDF ставит _submit_pdf_rest по ее завершении
+        """
+        if self._is_pdf(job):
+            return [self._submit(_extract_pdf_head, job.data, self._head_pages(), self.max_chars)]
+        return [self._submit(extract_file, job.file_type, job.data, self.max_chars)]
+
+    @staticmethod
+    def _is_pdf(job: ExtractionJob) -> bool:
+        return job.file_type.lower() == "pdf"
+
+    def _head_pages(self) -> int:
+        return self.pages_per_task if self.max_pages is None else min(self.pages_per_task, self.max_pages)
+
+    def _submit_pdf_rest(self, job: ExtractionJob, head: Future) -> List[Future]:
+        """Части PDF после первой задачи: ее текст и остальные диапазоны страниц"""
+        try:
+            total, text = head.result()
+        except Exception:
+            # Файл не открылся в пределах лимитов - остальные страницы не разбираем
+            return [head]
+        pages = total if self.max_pages is None else min(total, self.max_pages)
+        if pages < total:
+            logger.warning(f"[EXTRACT] {job.filename} has {total} pages, extracting the first {pages}")
+        first = Future()
+        first.set_result(text)
+        return [first] + [
+            self._submit(_extract_pdf_range, job.data, start, min(self.pages_per_task, pages - start), self.max_chars)
+            for start in range(self._head_pages(), pages, self.pages_per_task)
+        ]
+
+    def _call(self, fn, *args):
+        """Синхронный вызов в текущем потоке (в песочнице, если она включена)"""
+        if self.sandbox:
+            return run_sandboxed(fn, *args, limits=self.limits)
+        return fn(*args)
+
+    def extract_text(self, file_type: str, data: bytes) -> str:
+        """
+        Текст одного файла без заголовка "--- filename ---".
+        Выход за лимиты песочницы - ExtractionLimitError.
+        """
+        return self._call(extract_file, file_type, data, self.max_chars)
+
+    def extract_files(self, jobs: List[ExtractionJob]) -> List[str]:
+        """
+        Извлекает текст всех файлов параллельно.
+        Возвращает блоки "--- filename ---\\n<текст>" в порядке jobs.
+        Файлы с заданным job.text не разбираются; для остальных job.text
+        заполняется извлеченным текстом, а при ошибке - job.error.
+
+        Файлы, которые еще скачиваются (job.download), ставятся в извлечение
+        по мере завершения скачивания, так что загрузка остальных файлов идет
+        параллельно с разбором уже полученных.
+        """
+        submitted = [
+            None if job.error or job.text is not None or job.download is not None else self._submit_job(job)
+            for job in jobs
+        ]
+        # Незавершенные скачивания и первые задачи PDF: по их завершении
+        # ставится следующая работа по файлу
+        pending = {job.download: index for index, job in enumerate(jobs) if job.download is not None}
+        pending.update({
+            futures[0]: index for index, futures in enumerate(submitted)
+            if futures is not None and self._is_pdf(jobs[index])
+        })
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                job = jobs[index]
+                if submitted[index] is not None:
+                    submitted[index] = self._submit_pdf_rest(job, future)
+                    continue
+                job.download = None
+                try:
+                    job.data = future.result()
+                except Exception as e:
+                    logger.error(f"Error downloading file {job.filename}: {e}")
+                    job.error = str(e)
+                    continue
+                submitted[index] = self._submit_job(job)
+                if self._is_pdf(job):
+                    pending[submitted[index][0]] = index
+
+        texts = []
+        for job, futures in zip(jobs, submitted):
+            if job.error:
+                texts.append(f"--- {job.filename} ---\n[Error extracting text: {job.error}]")
+                continue
+            if futures is None:
+                texts.append(f"--- {job.filename} ---\n{job.text}")
+                continue
+            try:
+                # Несколько частей бывает только у PDF: это диапазоны страниц
+                job.text = collect_text((future.result() for future in futures), self.max_chars, PAGE_BREAK)
+                logger.info(f"[ANALYSIS] File: {job.filename} | First 200 chars: {job.text[:200]}")
+                texts.append(f"--- {job.filename} ---\n{job.text}")
+            except Exception as e:
+                logger.error(f"Error processing file {job.filename}: {e}")
+                job.error = str(e)
+                if isinstance(e, BrokenProcessPool):
+                    # Процесс пула упал (например, OOM) - следующий вызов создаст новый пул
+                    self.shutdown()
+                texts.append(f"--- {job.filename} ---\n[Error extracting text: {e}]")
+        return texts
+
+    def shutdown(self):
+        """Останавливает процессы пула"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Global extraction pool (процессы создаются при первом использовании)
+extraction_pool = ExtractionPool()
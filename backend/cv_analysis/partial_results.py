@@ -0,0 +1,47 @@
+"""
+Partial analysis results published while the LLM response is still streaming
+"""
+import logging
+from typing import Any, Dict
+
+from cache.redis_client import RedisCache, redis_cache
+from config import PARTIAL_RESULTS_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class PartialResultStore:
+    """
+    Секции анализа, уже полученные из потокового ответа Mistral.
+
+    Celery-задача пишет каждую закрывшуюся секцию в Redis hash по
+    analysis_id, API отдает их, пока анализ в статусе processing.
+    """
+
+    KEY_PREFIX = "analysis:partial"
+
+    def __init__(self, cache: RedisCache = redis_cache, ttl: int = PARTIAL_RESULTS_TTL):
+        self.cache = cache
+        self.ttl = ttl
+
+    def _key(self, analysis_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{analysis_id}"
+
+    def publish(self, analysis_id: str, section: str, value: Any):
+        """Сохраняет готовую секцию анализа"""
+        key = self._key(analysis_id)
+        if self.cache.hset(key, section, value):
+            logger.info(f"[PARTIAL] Published section '{section}' for analysis {analysis_id}")
+        self.cache.expire(key, self.ttl)
+
+    def get(self, analysis_id: str) -> Dict[str, Any]:
+        """Все секции, опубликованные для анализа"""
+        return self.cache.hgetall(self._key(analysis_id))
+
+    def clear(self, analysis_id: str):
+        """Удаляет частичные результаты (анализ завершен или перезапущен)"""
+        self.cache.delete(self._key(analysis_id))
+
+
+# Global partial results store
+partial_results = PartialResultStore()
@@ -20,6 +20,10 @@ Dependencies:
 - Used by export_for_frontend.py for data export
 """
 
+# Version of the prompt templates below. Bump it whenever any prompt text changes:
+# it is part of the LLM response cache key, so old cached answers stop matching.
+PROMPT_TEMPLATE_VERSION = "2"
+
 # =============================================================================
 # SECTION 1: CV ANALYSIS PROMPT
 # =============================================================================
@@ -664,4 +668,30 @@ Please ensure:
 3. Role fit suggestions are specific and actionable
 4. Key differentiators highlight what makes each candidate special
 5. The comparison summary provides clear guidance for hiring decisions
-""" 
\ No newline at end of file
+""" 
+# =============================================================================
+# SECTION 7: CV SECTION SUMMARY PROMPT
+# =============================================================================
+# Map step for oversized inputs: each chunk of CV text is condensed separately
+# and the summaries replace the raw text in the analysis prompts above
+
+CV_SECTION_SUMMARY_PROMPT = """
+Below is part {part} of {total_parts} of the text extracted from a candidate's CV file.
+The parts follow the order of the document, so this part may start or end mid-section.
+
+{cv_text}
+
+Condense this part into a factual summary for a recruiter. Keep everything that matters for
+evaluating the candidate and drop boilerplate:
+1. Full name and contact details, if present
+2. Every job: title, company, dates, key responsibilities and measurable achievements
+3. Skills and technologies with years of usage
+4. Education, certifications, languages
+
+Do not invent anything that is not in the text. Use at most {max_words} words.
+
+Please provide a response in the following JSON format:
+{{
+    "section_summary": "Condensed text of this part"
+}}
+"""
@@ -0,0 +1,191 @@
+"""
+Global Mistral AI quota scheduler shared by all API and Celery workers
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+from cache.redis_client import RedisCache, redis_cache
+from config import (
+    MISTRAL_REQUESTS_PER_SECOND,
+    MISTRAL_TOKENS_PER_MINUTE,
+    MISTRAL_RATE_LIMIT_MAX_WAIT,
+    MISTRAL_BACKOFF_BASE,
+    MISTRAL_BACKOFF_MAX
+)
+
+from .token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitTimeoutError(Exception):
+    """Не удалось получить квоту Mistral за отведенное время"""
+
+
+# Два token bucket (запросы/сек и токены/мин) в одном hash, обновляются атомарно.
+# Время берется с Redis-сервера, чтобы часы воркеров не влияли на расчет.
+# Возвращает время ожидания в секундах (строкой), "0" - квота выдана.
+_ACQUIRE_SCRIPT = """
+local key = KEYS[1]
+local rps = tonumber(ARGV[1])
+local req_cap = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local cost = math.min(tonumber(ARGV[4]), tpm)
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', key, 'req', 'tok', 'ts', 'cooldown_until')
+local req = tonumber(state[1]) or req_cap
+local tok = tonumber(state[2]) or tpm
+local ts = tonumber(state[3]) or now
+local cooldown_until = tonumber(state[4]) or 0
+local elapsed = math.max(0, now - ts)
+req = math.min(req_cap, req + elapsed * rps)
+tok = math.min(tpm, tok + elapsed * tpm / 60)
+local wait = 0
+if cooldown_until > now then
+    wait = cooldown_until - now
+else
+    if req < 1 then wait = math.max(wait, (1 - req) / rps) end
+    if tok < cost then wait = math.max(wait, (cost - tok) / (tpm / 60)) end
+    if wait == 0 then
+        req = req - 1
+        tok = tok - cost
+    end
+end
+redis.call('HSET', key, 'req', req, 'tok', tok, 'ts', now)
+redis.call('EXPIRE', key, 3600)
+return tostring(wait)
+"""
+
+# Глобальная пауза после 429: все воркеры ждут до cooldown_until
+_PENALIZE_SCRIPT = """
+local key = KEYS[1]
+local delay = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local current = tonumber(redis.call('HGET', key, 'cooldown_until')) or 0
+local target = math.max(current, now + delay)
+redis.call('HSET', key, 'cooldown_until', target)
+redis.call('EXPIRE', key, 3600)
+return tostring(target - now)
+"""
+
+# Корректировка токенов по фактическому usage из ответа
+_ADJUST_TOKENS_SCRIPT = """
+local key = KEYS[1]
+local delta = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local tok = tonumber(redis.call('HGET', key, 'tok'))
+if tok == nil then return 0 end
+redis.call('HSET', key, 'tok', math.min(tpm, tok + delta))
+return 1
+"""
+
+
+class MistralRateLimiter:
+    """
+    Планировщик квоты Mistral AI, общий для всех процессов.
+
+    Перед каждым запросом вызывающий код резервирует 1 запрос и оценку
+    токенов (промпт + max_tokens). При 429 выставляется общая для всех
+    воркеров пауза по Retry-After, чтобы не устраивать шторм повторов.
+    Если Redis недоступен, ограничение не применяется.
+    """
+
+    KEY = "llm:ratelimit:mistral"
+
+    def __init__(
+        self,
+        cache: RedisCache = redis_cache,
+        requests_per_second: float = MISTRAL_REQUESTS_PER_SECOND,
+        tokens_per_minute: int = MISTRAL_TOKENS_PER_MINUTE,
+        max_wait: float = MISTRAL_RATE_LIMIT_MAX_WAIT,
+        backoff_base: float = MISTRAL_BACKOFF_BASE,
+        backoff_max: float = MISTRAL_BACKOFF_MAX
+    ):
+        self.cache = cache
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def estimate_cost(self, payload: Dict[str, Any]) -> int:
+        """Оценка токенов запроса: токены промпта плюс max_tokens ответа"""
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in payload.get("messages", []))
+        return prompt_tokens + int(payload.get("max_tokens", 0))
+
+    def _reserve(self, cost: int) -> float:
+        """Одна попытка резервирования; возвращает время ожидания"""
+        wait = self.cache.eval_script(
+            _ACQUIRE_SCRIPT,
+            [self.KEY],
+            [self.requests_per_second, max(1.0, self.requests_per_second), self.tokens_per_minute, cost]
+        )
+        return float(wait) if wait is not None else 0.0
+
+    def acquire(self, cost: int):
+        """Блокирует до получения квоты на запрос стоимостью cost токенов"""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._reserve(cost)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeoutError(f"Mistral quota not available within {self.max_wait}s")
+            logger.info(f"[RATE_LIMIT] Waiting {wait:.2f}s for Mistral quota")
+            time.sleep(wait)
+
+    async def acquire_async(self, cost: int):
+        """Асинхронный вариант acquire"""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            # Скрипт Redis выполняется синхронным клиентом - в потоке, не в event loop
+            wait = await asyncio.to_thread(self._reserve, cost)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeoutError(f"Mistral quota not available within {self.max_wait}s")
+            logger.info(f"[RATE_LIMIT] Waiting {wait:.2f}s for Mistral quota")
+            await asyncio.sleep(wait)
+
+    def record_usage(self, reserved: int, usage: Optional[Dict[str, Any]]):
+        """Возвращает в bucket разницу между оценкой и фактическим usage"""
+        if not usage or "total_tokens" not in usage:
+            return
+        delta = reserved - int(usage["total_tokens"])
+        if delta:
+            self.cache.eval_script(_ADJUST_TOKENS_SCRIPT, [self.KEY], [delta, self.tokens_per_minute])
+
+    def backoff(self, attempt: int, status_code: Optional[int] = None, retry_after: Optional[float] = None) -> float:
+        """
+        Задержка перед повтором. Для 429 учитывается Retry-After и выставляется
+        общая пауза для всех воркеров; иначе - экспоненциальная задержка с jitter
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+        if status_code == 429:
+            if retry_after is not None:
+                delay = retry_after
+            shared = self.cache.eval_script(_PENALIZE_SCRIPT, [self.KEY], [delay])
+            logger.warning(f"[RATE_LIMIT] Mistral returned 429, pausing all workers for {delay:.2f}s")
+            # Дальше ждем в acquire, который учитывает общую паузу
+            return 0.0 if shared is not None else delay
+        return delay
+
+    @staticmethod
+    def parse_retry_after(headers: Any) -> Optional[float]:
+        """Значение заголовка Retry-After в секундах (поддерживается только числовой формат)"""
+        if headers is None:
+            return None
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        try:
+            return max(0.0, float(value)) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+
+# Global Mistral quota scheduler
+mistral_rate_limiter = MistralRateLimiter()
@@ -0,0 +1,121 @@
+"""
+Content-addressed cache for Mistral AI responses
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from cache.redis_client import RedisCache, redis_cache
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MAX_ENTRY_BYTES,
+    LLM_CACHE_MAX_TEMPERATURE
+)
+from .prompts import PROMPT_TEMPLATE_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    Кэш ответов LLM в Redis.
+
+    Ключ - SHA-256 от модели, версии шаблонов промптов и параметров запроса
+    (текст промпта уже содержит cv_text и job_description). Повторный анализ
+    того же CV с тем же JD (/retry, /run, повторы Celery) отдается из кэша
+    без обращения к Mistral. Размер кэша ограничен: ключи хранятся в
+    отсортированном по времени записи индексе, самые старые вытесняются.
+    """
+
+    KEY_PREFIX = "llm:response"
+    INDEX_KEY = "llm:response:index"
+    STATS_KEY = "llm:response:stats"
+
+    def __init__(
+        self,
+        cache: RedisCache = redis_cache,
+        ttl: int = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_entry_bytes: int = LLM_CACHE_MAX_ENTRY_BYTES,
+        max_temperature: float = LLM_CACHE_MAX_TEMPERATURE,
+        enabled: bool = LLM_CACHE_ENABLED
+    ):
+        self.cache = cache
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+
+    def make_key(self, payload: Dict[str, Any]) -> str:
+        """Стабильный ключ кэша для тела запроса к Mistral"""
+        material = json.dumps({
+            "model": payload.get("model"),
+            "prompt_version": PROMPT_TEMPLATE_VERSION,
+            "messages": payload.get("messages"),
+            "max_tokens": payload.get("max_tokens"),
+            "temperature": payload.get("temperature"),
+        }, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    def is_cacheable(self, payload: Dict[str, Any]) -> bool:
+        """Кэшируем только почти детерминированные запросы"""
+        return self.enabled and payload.get("temperature", 1.0) <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает закэшированный ответ или None"""
+        if not self.enabled:
+            return None
+        value = self.cache.get(key)
+        self.cache.incr(f"{self.STATS_KEY}:{'hits' if value is not None else 'misses'}")
+        if value is not None:
+            logger.info(f"[LLM_CACHE] Hit for {key}")
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        return None
+
+    def set(self, key: str, content: str) -> bool:
+        """
+        Сохраняет ответ в кэш. Ответы, которые не являются валидным JSON или
+        превышают лимит размера, не кэшируются
+        """
+        if not self.enabled:
+            return False
+        if len(content.encode("utf-8")) > self.max_entry_bytes:
+            logger.info(f"[LLM_CACHE] Response too large to cache ({len(content)} chars)")
+            return False
+        try:
+            json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            return False
+
+        if not self.cache.set(key, content, expire=self.ttl):
+            return False
+        self.cache.zadd(self.INDEX_KEY, {key: time.time()})
+        self._evict_overflow()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов кэша"""
+        return {
+            "hits": int(self.cache.get(f"{self.STATS_KEY}:hits", 0) or 0),
+            "misses": int(self.cache.get(f"{self.STATS_KEY}:misses", 0) or 0),
+            "entries": self.cache.zcard(self.INDEX_KEY)
+        }
+
+    def _evict_overflow(self):
+        """Удаляет самые старые записи, если кэш превысил max_entries"""
+        overflow = self.cache.zcard(self.INDEX_KEY) - self.max_entries
+        if overflow <= 0:
+            return
+        for key in self.cache.zpopmin(self.INDEX_KEY, overflow):
+            self.cache.delete(key)
+        logger.info(f"[LLM_CACHE] Evicted {overflow} oldest entries")
+
+
+# Global LLM response cache instance
+llm_response_cache = LLMResponseCache()
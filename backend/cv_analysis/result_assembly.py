@@ -0,0 +1,69 @@
+"""
+Assembly of per-file CV analyses into the result of one analysis
+"""
+from typing import Any, Dict, List, Optional
+
+
+def file_section(filename: str, section: str, multiple_files: bool) -> str:
+    """
+    Имя частичной секции: при нескольких файлах секции разных файлов
+    публикуются параллельно и различаются префиксом "filename:"
+    """
+    return f"{filename}:{section}" if multiple_files else section
+
+
+def is_complete_result(results: Optional[Dict[str, Any]]) -> bool:
+    """Полноценный анализ, а не ответ-заглушка при ошибке модели"""
+    return isinstance(results, dict) and "achievers_rating" in results
+
+
+def is_complete_assembly(results: Optional[Dict[str, Any]]) -> bool:
+    """
+    Все файлы анализа проанализированы полноценно: нет ошибок файлов и
+    ответов-заглушек. Результат без "candidates" проверяется целиком
+    """
+    if not isinstance(results, dict):
+        return False
+    candidates = results.get("candidates")
+    if candidates is None:
+        return is_complete_result(results)
+    return bool(candidates) and all(
+        candidate.get("status") == "completed" and is_complete_result(candidate.get("results"))
+        for candidate in candidates
+    )
+
+
+def assemble_file_results(file_results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Собирает результаты подзадач по файлам в результат анализа.
+
+    Каждый элемент file_results: {"filename", "file_path", "results"} или
+    {"filename", "file_path", "error"}. Верхний уровень результата - анализ
+    файла с наибольшим overall_score (полноценные анализы важнее заглушек),
+    поэтому формат для одного файла не меняется. В "candidates" - анализы
+    всех файлов в исходном порядке, в "best_file" - имя выбранного файла.
+    Возвращает None, если ни один файл не проанализирован.
+    """
+    candidates = []
+    best = None
+    best_key = None
+    for item in file_results:
+        entry = {"filename": item["filename"], "file_path": item.get("file_path")}
+        results = item.get("results")
+        if not isinstance(results, dict):
+            candidates.append({**entry, "status": "failed", "error": item.get("error") or "No analysis result"})
+            continue
+        candidates.append({**entry, "status": "completed", "results": results})
+        key = (is_complete_result(results), results.get("overall_score") or 0)
+        # При равенстве остается первый файл
+        if best_key is None or key > best_key:
+            best, best_key = (entry, results), key
+
+    if best is None:
+        return None
+
+    entry, results = best
+    assembled = dict(results)
+    assembled["best_file"] = entry["filename"]
+    assembled["candidates"] = candidates
+    return assembled
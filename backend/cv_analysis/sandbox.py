@@ -0,0 +1,170 @@
+"""
+Supervised extraction subprocess with CPU, memory and wall-clock limits
+"""
+import os
+import pickle
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from config import EXTRACTION_CPU_SECONDS, EXTRACTION_MEMORY_LIMIT_MB, EXTRACTION_TIMEOUT_SECONDS
+
+# Модули, которые fork server загружает один раз: дочерние процессы получают
+# их готовыми и не импортируют разбор PDF/DOCX заново
+_PRELOAD = ["cv_analysis.parallel_extraction", "PyPDF2"]
+
+_context = None
+_context_lock = threading.Lock()
+
+
+class ExtractionLimitError(Exception):
+    """Извлечение файла остановлено песочницей: превышен лимит или процесс упал"""
+
+
+@dataclass
+class SandboxLimits:
+    """Лимиты одного запуска: CPU-время (с), прирост памяти (МБ), общее время (с)"""
+    cpu_seconds: int = EXTRACTION_CPU_SECONDS
+    memory_mb: int = EXTRACTION_MEMORY_LIMIT_MB
+    timeout: float = EXTRACTION_TIMEOUT_SECONDS
+
+
+def sandbox_available() -> bool:
+    """Песочница требует resource (Linux/macOS)"""
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _get_context():
+    """
+    Контекст процессов песочницы. Воркер многопоточный (потоки пула
+    извлечения, клиенты Redis), и fork из него может унаследовать чужую
+    захваченную блокировку. Поэтому дочерние процессы порождает fork server -
+    отдельный однопоточный процесс (spawn, если forkserver недоступен).
+    Используется billiard (multiprocessing из Celery): он разрешает дочерние
+    процессы и в daemon-процессах Celery prefork
+    """
+    global _context
+    with _context_lock:
+        if _context is None:
+            import billiard
+
+            if "forkserver" in billiard.get_all_start_methods():
+                _context = billiard.get_context("forkserver")
+                _context.set_forkserver_preload(_PRELOAD)
+            else:
+                _context = billiard.get_context("spawn")
+        return _context
+
+
+def _address_space() -> int:
+    """Текущий размер адресного пространства процесса в байтах"""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _apply_limits(limits: SandboxLimits):
+    import resource
+
+    resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 1))
+    try:
+        # RSS в Linux через rlimit не ограничивается, поэтому ограничиваем рост
+        # адресного пространства относительно унаследованного от воркера
+        memory = _address_space() + limits.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    except (OSError, ValueError):
+        pass
+
+
+class _CpuLimitExceeded(BaseException):
+    """Поднимается в дочернем процессе по SIGXCPU (мягкий лимит CPU)"""
+
+
+def _on_cpu_limit(signum, frame):
+    raise _CpuLimitExceeded()
+
+
+def _run_child(conn, fn: Callable, args: tuple, limits: SandboxLimits):
+    """
+    Тело дочернего процесса: результат fn(*args) или причина остановки уходит
+    в pipe. Fork server не передает родителю сигнал, которым убит процесс,
+    поэтому выход за лимиты CPU и памяти сообщается явно
+    """
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    try:
+        _apply_limits(limits)
+        payload = pickle.dumps(("ok", fn(*args)))
+    except _CpuLimitExceeded:
+        payload = pickle.dumps(("cpu", None))
+    except MemoryError:
+        payload = pickle.dumps(("memory", None))
+    except BaseException as e:
+        payload = pickle.dumps(("error", f"{type(e).__name__}: {e}"))
+    conn.send_bytes(payload)
+    conn.close()
+
+
+def _kill(pid: int):
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_sandboxed(fn: Callable, *args, limits: SandboxLimits = None) -> Any:
+    """
+    Выполняет fn(*args) в дочернем процессе и возвращает результат.
+
+    Процесс порождает fork server (см. _get_context), поэтому запуск дешевый,
+    безопасен из многопоточного воркера и работает в daemon-процессах Celery
+    prefork. fn и args передаются через pickle: fn - функция модульного
+    уровня. Лимит CPU и памяти ставит ядро (setrlimit), общее время
+    отслеживает родитель - по истечении процесс убивается. Любой выход за
+    лимит или падение процесса дает ExtractionLimitError с понятным
+    сообщением; воркер при этом не страдает.
+    """
+    limits = limits or SandboxLimits()
+    context = _get_context()
+    reader, writer = context.Pipe(duplex=False)
+    process = context.Process(target=_run_child, args=(writer, fn, args, limits), daemon=True)
+    try:
+        process.start()
+    finally:
+        writer.close()
+
+    payload = None
+    try:
+        if not reader.poll(limits.timeout):
+            _kill(process.pid)
+            process.join()
+            raise ExtractionLimitError(f"extraction exceeded the wall-clock limit ({limits.timeout:g}s)")
+        try:
+            payload = reader.recv_bytes()
+        except (EOFError, OSError):
+            # Процесс завершился, не отправив результат
+            pass
+    finally:
+        reader.close()
+
+    deadline = time.monotonic() + limits.timeout
+    process.join(max(deadline - time.monotonic(), 0))
+    if process.exitcode is None:
+        _kill(process.pid)
+        process.join()
+    if payload is None:
+        # Жесткий лимит CPU (SIGKILL), нехватка памяти вне Python или падение
+        raise ExtractionLimitError(f"extraction process was killed or crashed (exit code {process.exitcode})")
+
+    status, value = pickle.loads(payload)
+    if status == "cpu":
+        raise ExtractionLimitError(f"extraction exceeded the CPU time limit ({limits.cpu_seconds}s)")
+    if status == "memory":
+        raise ExtractionLimitError(f"extraction exceeded the memory limit ({limits.memory_mb} MB)")
+    if status == "error":
+        raise ExtractionLimitError(f"extraction failed: {value}")
+    return value
@@ -0,0 +1,192 @@
+"""
+Cross-worker coalescing (single-flight) of identical Mistral AI requests
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cache.redis_client import RedisCache, redis_cache
+from config import LLM_SINGLE_FLIGHT_LOCK_TTL, LLM_SINGLE_FLIGHT_WAIT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescedRequestError(Exception):
+    """Запрос-лидер, которого ждал текущий вызов, завершился ошибкой"""
+
+
+class SingleFlight:
+    """
+    Дедупликация одинаковых одновременных запросов между процессами.
+
+    Первый вызов с данным ключом берет Redis-lock и выполняет запрос к Mistral
+    (лидер). Остальные вызовы с тем же ключом ждут результат лидера: он
+    публикуется в канал Redis и дублируется в короткоживущий ключ, чтобы его
+    увидели и те, кто подписался уже после публикации. Если Redis недоступен,
+    лидер пропал (lock истек) или ожидание превысило таймаут, вызов
+    выполняется самостоятельно.
+    """
+
+    KEY_PREFIX = "llm:inflight"
+    RESULT_TTL = 60
+    _PENDING = object()
+
+    def __init__(
+        self,
+        cache: RedisCache = redis_cache,
+        lock_ttl: int = LLM_SINGLE_FLIGHT_LOCK_TTL,
+        wait_timeout: int = LLM_SINGLE_FLIGHT_WAIT_TIMEOUT,
+        poll_interval: float = 0.25
+    ):
+        self.cache = cache
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}:lock"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}:result"
+
+    def _acquire(self, key: str) -> Optional[str]:
+        """Пытается стать лидером; возвращает токен блокировки или None"""
+        token = uuid.uuid4().hex
+        if self.cache.set_nx(self._lock_key(key), token, expire=self.lock_ttl):
+            # Результат прошлого лидера не должен достаться ждущим этого
+            self.cache.delete(self._result_key(key))
+            return token
+        return None
+
+    def _finish(self, key: str, token: str, result: Any = None, error: Optional[Exception] = None):
+        """Публикует результат (или ошибку) лидера и снимает блокировку"""
+        if error is not None:
+            outcome = {"status": "error", "error": str(error), "token": token}
+        else:
+            outcome = {"status": "ok", "result": result, "token": token}
+        self.cache.set(self._result_key(key), outcome, expire=self.RESULT_TTL)
+        receivers = self.cache.publish(self._result_key(key), outcome)
+        self.cache.delete_if_equals(self._lock_key(key), token)
+        if receivers:
+            logger.info(f"[SINGLE_FLIGHT] Delivered result for {key} to {receivers} waiting callers")
+
+    def _resolve(self, key: str, outcome: Dict[str, Any]) -> Any:
+        if outcome.get("status") == "ok":
+            logger.info(f"[SINGLE_FLIGHT] Reused in-flight result for {key}")
+            return outcome["result"]
+        raise CoalescedRequestError(outcome.get("error", "Coalesced request failed"))
+
+    def _poll(self, key: str) -> Any:
+        """
+        Проверяет состояние лидера: результат, None (лидер пропал без
+        результата) или _PENDING. Лидер пишет результат до снятия lock,
+        поэтому lock проверяется первым. Пока lock держит лидер, годится только
+        его результат (с его токеном), а не оставшийся от предыдущего
+        """
+        leader = self.cache.get(self._lock_key(key))
+        outcome = self.cache.get(self._result_key(key))
+        if isinstance(outcome, dict) and (leader is None or outcome.get("token") == leader):
+            return outcome
+        return None if leader is None else self._PENDING
+
+    def run(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Выполняет fn один раз на ключ среди всех процессов"""
+        if not self.cache.is_connected():
+            return fn()
+
+        token = self._acquire(key)
+        if token:
+            return self._run_as_leader(key, token, fn)
+
+        outcome = self._wait(key)
+        if outcome is None:
+            return fn()
+        return self._resolve(key, outcome)
+
+    async def arun(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Асинхронный вариант run для FastAPI. Клиент Redis синхронный, поэтому
+        обращения к нему выполняются в потоке, не блокируя event loop
+        """
+        if not await asyncio.to_thread(self.cache.is_connected):
+            return await fn()
+
+        token = await asyncio.to_thread(self._acquire, key)
+        if token:
+            return await self._arun_as_leader(key, token, fn)
+
+        outcome = await self._wait_async(key)
+        if outcome is None:
+            return await fn()
+        return self._resolve(key, outcome)
+
+    def _run_as_leader(self, key: str, token: str, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(key, token, error=e)
+            raise
+        self._finish(key, token, result=result)
+        return result
+
+    async def _arun_as_leader(self, key: str, token: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await fn()
+        except Exception as e:
+            await asyncio.to_thread(self._finish, key, token, error=e)
+            raise
+        await asyncio.to_thread(self._finish, key, token, result=result)
+        return result
+
+    def _wait(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Ждет результат лидера через pub/sub. None - ждать больше нечего
+        """
+        logger.info(f"[SINGLE_FLIGHT] Waiting for in-flight request {key}")
+        pubsub = self.cache.pubsub()
+        if pubsub is None:
+            return None
+        try:
+            pubsub.subscribe(self._result_key(key))
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                # Результат мог быть опубликован до подписки
+                outcome = self._poll(key)
+                if outcome is not self._PENDING:
+                    return outcome
+                message = pubsub.get_message(timeout=self.poll_interval * 4)
+                if message and message.get("type") == "message":
+                    outcome = json.loads(message["data"])
+                    if isinstance(outcome, dict):
+                        return outcome
+            logger.warning(f"[SINGLE_FLIGHT] Timed out waiting for {key}")
+            return None
+        except Exception as e:
+            logger.error(f"[SINGLE_FLIGHT] Error waiting for {key}: {e}")
+            return None
+        finally:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+    async def _wait_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Ждет результат лидера, не блокируя event loop (опрос ключа результата)
+        """
+        logger.info(f"[SINGLE_FLIGHT] Waiting (async) for in-flight request {key}")
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            outcome = await asyncio.to_thread(self._poll, key)
+            if outcome is not self._PENDING:
+                return outcome
+            await asyncio.sleep(self.poll_interval)
+        logger.warning(f"[SINGLE_FLIGHT] Timed out waiting for {key}")
+        return None
+
+
+# Global single-flight coordinator
+llm_single_flight = SingleFlight()
@@ -0,0 +1,95 @@
+"""
+Streaming text extraction from PDF, DOCX and legacy DOC files
+"""
+import io
+import logging
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from config import EXTRACTION_MAX_PAGES, EXTRACTION_MAX_CHARS
+
+logger = logging.getLogger(__name__)
+
+# Версия извлечения текста. Увеличивайте при любом изменении результата
+# извлечения: сохраненный в uploaded_files.extracted_text текст другой
+# версии считается устаревшим и извлекается заново.
+EXTRACTOR_VERSION = "5"
+
+# Разделитель страниц PDF в извлеченном тексте (form feed): по нему нормализация
+# находит колонтитулы и номера страниц
+PAGE_BREAK = "\f"
+
+Source = Union[bytes, BinaryIO]
+
+
+def _as_stream(source: Source) -> BinaryIO:
+    """bytes оборачиваются в BytesIO, файловые объекты (в т.ч. файлы на диске) передаются как есть"""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def open_pdf(source: Source):
+    """PdfReader для PDF; читается только структура, текст страниц не извлекается"""
+    import PyPDF2
+
+    return PyPDF2.PdfReader(_as_stream(source))
+
+
+def iter_pdf_text(source: Source, max_pages: Optional[int] = EXTRACTION_MAX_PAGES, start: int = 0) -> Iterator[str]:
+    """
+    Отдает текст PDF постранично, начиная со страницы start (с нуля).
+
+    Страницы разбираются по одной и не накапливаются, поэтому память не
+    растет с числом страниц. Нечитаемая страница пропускается, а не обрывает
+    весь документ. max_pages=None - без ограничения. Вместо source можно
+    передать уже открытый open_pdf reader.
+    """
+    import PyPDF2
+
+    reader = source if isinstance(source, PyPDF2.PdfReader) else open_pdf(source)
+    total = len(reader.pages)
+    limit = total if max_pages is None else min(total, start + max_pages)
+
+    for index in range(start, limit):
+        try:
+            yield reader.pages[index].extract_text() or ""
+        except Exception as e:
+            logger.warning(f"[EXTRACT] Skipping unreadable PDF page {index + 1}: {e}")
+
+
+def iter_docx_text(source: Source) -> Iterator[str]:
+    """
+    Отдает текст DOCX по абзацам: колонтитулы, тело документа, таблицы
+    (строка таблицы - одна строка текста) и надписи.
+    XML читается потоково, объектная модель python-docx не строится.
+    """
+    from .docx_extraction import iter_docx_parts_text
+
+    yield from iter_docx_parts_text(_as_stream(source))
+
+
+def iter_doc_text(source: Source) -> Iterator[str]:
+    """
+    Отдает текст .doc (Word 97-2003) по абзацам, без внешних сервисов:
+    OLE2-контейнер и таблица кусков разбираются в процессе.
+    """
+    from .doc_extraction import iter_doc_parts_text
+
+    data = source if isinstance(source, (bytes, bytearray)) else source.read()
+    yield from iter_doc_parts_text(bytes(data))
+
+
+def collect_text(pieces: Iterable[str], max_chars: Optional[int] = EXTRACTION_MAX_CHARS, separator: str = "\n") -> str:
+    """
+    Собирает части текста за линейное время (join вместо += в цикле) и
+    прекращает чтение, как только набрано max_chars символов.
+    Страницы PDF собираются с separator=PAGE_BREAK
+    """
+    parts = []
+    size = 0
+    for piece in pieces:
+        if max_chars is not None and size + len(piece) > max_chars:
+            parts.append(piece[:max(max_chars - size, 0)])
+            logger.warning(f"[EXTRACT] Text truncated at {max_chars} characters")
+            break
+        parts.append(piece)
+        size += len(piece) + 1
+    return separator.join(parts).strip()
@@ -0,0 +1,170 @@
+"""
+Pre-prompt normalization of extracted CV text
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set, Tuple
+
+from .text_extraction import PAGE_BREAK
+from .token_budget import estimate_tokens
+
+# Колонтитулы ищутся только среди первых и последних EDGE_LINES непустых строк страницы
+EDGE_LINES = 3
+# Строка у края стольких страниц (или всех, если страниц меньше) - колонтитул,
+# она остается один раз
+MIN_REPEATS = 3
+
+# Невидимые символы PDF/Word: мягкий перенос, zero-width, BOM, NUL
+_INVISIBLE = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff\x00"))
+# Перенос слова по слогам: "разра-\nботка", "develop-\nment"
+_HYPHEN_BREAK = re.compile(r"(\w)-\n[ \t]*([a-zа-яё])")
+_INLINE_SPACE = re.compile("[ \t\f\v\u00a0\u2000-\u200a\u202f\u3000]+")
+
+# Контакты: повтор блока контактов (в шапке и в конце) не нужен модели
+_CONTACT = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|https?://|www\.|\+?\d[\d ()-]{7,}\d")
+
+# Номер страницы убирается только у края страницы: в тексте одиночное число -
+# это, например, число лет опыта. Просто число ("- 2 -") - только в первой или
+# последней строке страницы, "Page 2 of 3" - среди EDGE_LINES строк у края
+_PAGE_NUMBER = re.compile(
+    r"^(?:page|стр\.?|страница)?\s*[-–—]?\s*\d{1,3}\s*(?:(?:/|of|из)\s*\d{1,3})?\s*[-–—]?$", re.IGNORECASE
+)
+_BARE_NUMBER = re.compile(r"^[-–—]?\s*\d{1,3}\s*[-–—]?$")
+# Известный шум: разделители, служебные подписи генераторов
+_NOISE = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"^[\W_]+$",
+    r"^references (?:are )?available (?:up)?on request\.?$",
+    r"^рекомендации (?:предоставляются )?по запросу\.?$",
+    r"^(?:created|generated|made|powered) (?:with|by) [\w .-]{1,40}$",
+)]
+
+
+# Сырые байты PDF вместо текста: заголовок и служебные объекты PDF
+_RAW_PDF_MARKERS = re.compile(r"%PDF-\d|\bendobj\b|\bendstream\b|\bxref\b|/Type\s*/(?:Page|Catalog|XObject)|/FlateDecode")
+# Доля непечатаемых символов, при которой текст считается мусором
+GARBAGE_MAX_CONTROL_RATIO = 0.1
+
+
+@dataclass
+class NormalizationReport:
+    """Сколько токенов сэкономила нормализация одного документа"""
+    tokens_before: int
+    tokens_after: int
+    chars_before: int
+    chars_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "chars_before": self.chars_before,
+            "chars_after": self.chars_after,
+        }
+
+
+def _line_key(line: str) -> str:
+    """
+    Ключ для поиска повторов. Цифры значимы: строки "2018-2020 | Developer"
+    и "2016-2018 | Developer" разные (номера страниц убираются отдельно, как шум)
+    """
+    return line.casefold()
+
+
+def _is_noise(line: str) -> bool:
+    return any(pattern.match(line) for pattern in _NOISE)
+
+
+def is_raw_pdf_garbage(text: str, sample_chars: int = 4000) -> bool:
+    """
+    True, если "текст" - на самом деле сырое содержимое PDF (заголовок %PDF,
+    obj/stream/xref) или бинарный мусор. Такой текст нельзя отправлять в промпт.
+    """
+    sample = text[:sample_chars]
+    if not sample.strip():
+        return False
+    if sample.lstrip().startswith("%PDF") or len(_RAW_PDF_MARKERS.findall(sample)) >= 3:
+        return True
+    control = sum(1 for char in sample if (ord(char) < 32 and char not in "\n\r\t") or char == "\ufffd")
+    return control / len(sample) > GARBAGE_MAX_CONTROL_RATIO
+
+
+def _edges(lines: List[str]) -> Dict[str, Set[int]]:
+    """Номера первых ("top") и последних ("bottom") EDGE_LINES непустых строк страницы"""
+    filled = [index for index, line in enumerate(lines) if line]
+    return {"top": set(filled[:EDGE_LINES]), "bottom": set(filled[-EDGE_LINES:])}
+
+
+def _split_pages(text: str) -> List[Tuple[List[str], Dict[str, Set[int]]]]:
+    """Страницы (по PAGE_BREAK): очищенные строки и номера строк у краев страницы"""
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [_INLINE_SPACE.sub(" ", line).strip() for line in page.split("\n")]
+        lines = ["" if line and _is_noise(line) else line for line in lines]
+        filled = [index for index, line in enumerate(lines) if line]
+        outer = {filled[0], filled[-1]} if filled else set()
+        edges = set().union(*_edges(lines).values())
+        lines = [
+            "" if index in edges and _PAGE_NUMBER.match(line) and (index in outer or not _BARE_NUMBER.match(line))
+            else line
+            for index, line in enumerate(lines)
+        ]
+        pages.append((lines, _edges(lines)))
+    return pages
+
+
+def normalize_text(text: str) -> str:
+    """
+    Убирает из извлеченного текста то, что тратит токены промпта и не несет
+    информации: переносы слов, лишние пробелы и пустые строки, разделители,
+    номера страниц и колонтитулы - строки, повторяющиеся у верхнего (или
+    нижнего) края нескольких страниц, - и повторные строки с контактами у края
+    страницы. Первое вхождение строки сохраняется; текст внутри страницы не
+    сокращается, даже если строки в нем повторяются.
+    """
+    text = text.translate(_INVISIBLE).replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHEN_BREAK.sub(r"\1\2", text)
+    pages = _split_pages(text)
+
+    # На скольких страницах строка стоит у того же края
+    edge_pages = Counter()
+    for lines, edges in pages:
+        edge_pages.update({(edge, _line_key(lines[index])) for edge, indexes in edges.items() for index in indexes})
+    min_pages = max(2, min(MIN_REPEATS, len(pages)))
+    seen = set()
+    kept: List[str] = []
+    for lines, edges in pages:
+        # На месте разрыва страницы - пустая строка
+        if kept and kept[-1]:
+            kept.append("")
+        for index, line in enumerate(lines):
+            if not line:
+                # Не больше одной пустой строки подряд (и ни одной в начале)
+                if kept and kept[-1]:
+                    kept.append("")
+                continue
+            key = _line_key(line)
+            at_edges = [edge for edge, indexes in edges.items() if index in indexes]
+            if key in seen and at_edges and (
+                any(edge_pages[edge, key] >= min_pages for edge in at_edges) or _CONTACT.search(line)
+            ):
+                continue
+            seen.add(key)
+            kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def normalize_document(text: str) -> Tuple[str, NormalizationReport]:
+    """Нормализованный текст и отчет о сэкономленных токенах"""
+    normalized = normalize_text(text)
+    return normalized, NormalizationReport(
+        tokens_before=estimate_tokens(text),
+        tokens_after=estimate_tokens(normalized),
+        chars_before=len(text),
+        chars_after=len(normalized),
+    )
@@ -0,0 +1,49 @@
+"""
+Compressed, versioned storage format for uploaded_files.extracted_text
+"""
+import base64
+import logging
+import zlib
+from typing import Optional
+
+from config import EXTRACTION_MAX_PAGES, EXTRACTION_MAX_CHARS
+from .text_extraction import EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Формат значения: "cvtext:<тег извлечения>:<base64(zlib(utf-8 текст))>"
+PREFIX = "cvtext"
+
+
+def extractor_tag() -> str:
+    """
+    Тег извлечения: версия кода и лимиты, от которых зависит результат.
+    Текст с другим тегом не переиспользуется.
+    """
+    return f"v{EXTRACTOR_VERSION}-p{EXTRACTION_MAX_PAGES}-c{EXTRACTION_MAX_CHARS}"
+
+
+def encode_extracted_text(text: str) -> str:
+    """Сжимает текст для колонки extracted_text (TEXT)"""
+    compressed = zlib.compress(text.encode("utf-8"), 6)
+    return f"{PREFIX}:{extractor_tag()}:{base64.b64encode(compressed).decode('ascii')}"
+
+
+def decode_extracted_text(value: Optional[str]) -> Optional[str]:
+    """
+    Текст из extracted_text или None, если его нет, он извлечен другой
+    версией экстрактора или поврежден
+    """
+    if not value:
+        return None
+    try:
+        prefix, tag, payload = value.split(":", 2)
+    except ValueError:
+        return None
+    if prefix != PREFIX or tag != extractor_tag():
+        return None
+    try:
+        return zlib.decompress(base64.b64decode(payload)).decode("utf-8")
+    except (ValueError, zlib.error, UnicodeDecodeError) as e:
+        logger.warning(f"[EXTRACT] Corrupted stored text ignored: {e}")
+        return None
@@ -0,0 +1,68 @@
+"""
+Per-stage timing of CV analyses and latency percentiles
+"""
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+# Отметки времени запуска анализа по порядку; стадия - интервал между соседними
+# отметками, поэтому сумма стадий равна общему времени обработки
+MARKS = ("enqueued", "started", "downloaded", "extracted", "analyzed", "persisted")
+STAGES = ("queue_wait", "download", "extraction", "llm", "persist")
+
+
+def stage_durations(marks: Dict[str, float]) -> Dict[str, float]:
+    """
+    Длительности стадий (с) по отметкам времени:
+    queue_wait - ожидание в очереди extract, download - описание вакансии и
+    скачивание файлов (до последнего скачанного), extraction - разбор,
+    оставшийся после скачивания, и нормализация, llm - анализ файлов
+    (с ожиданием в очереди llm), persist - сборка и ожидание записи.
+    Стадии без обеих отметок пропускаются.
+    """
+    durations = {}
+    for stage, start, end in zip(STAGES, MARKS, MARKS[1:]):
+        if marks.get(start) is not None and marks.get(end) is not None:
+            durations[stage] = round(max(marks[end] - marks[start], 0.0), 3)
+    return durations
+
+
+def processing_time(marks: Dict[str, float]) -> Optional[float]:
+    """Общее время от постановки анализа до записи результата (с)"""
+    present = [marks[name] for name in MARKS if marks.get(name) is not None]
+    if len(present) < 2:
+        return None
+    return round(max(present[-1] - present[0], 0.0), 3)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Перцентиль q (0-100) с линейной интерполяцией между соседними значениями"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    value = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    return round(value, 3)
+
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    return {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95)}
+
+
+def summarize_latency(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    p50/p95 общего времени и каждой стадии по строкам analyses
+    (processing_time, stage_timings)
+    """
+    totals: List[float] = []
+    stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for row in rows:
+        if isinstance(row.get("processing_time"), (int, float)) and row["processing_time"] > 0:
+            totals.append(float(row["processing_time"]))
+        for stage, value in (row.get("stage_timings") or {}).items():
+            if stage in stages and isinstance(value, (int, float)):
+                stages[stage].append(float(value))
+    return {
+        "processing_time": _summary(totals),
+        "stages": {stage: _summary(values) for stage, values in stages.items()},
+    }
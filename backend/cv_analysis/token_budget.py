@@ -0,0 +1,125 @@
+"""
+Prompt token estimation and per-prompt output budgets for Mistral requests
+"""
+import logging
+import re
+
+from config import (
+    MISTRAL_CONTEXT_WINDOW,
+    LLM_MAX_TOKENS_DETAILED,
+    LLM_MAX_TOKENS_SIMPLE,
+    LLM_MAX_TOKENS_COMPARISON,
+    LLM_MAX_TOKENS_DEFAULT,
+    CV_CHUNK_SUMMARY_TOKENS
+)
+
+logger = logging.getLogger(__name__)
+
+# Слово, число или отдельный знак: BPE-токенизатор Mistral режет текст примерно так же
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\W\d_A-Za-z]+|\S", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Приближенное число токенов Mistral для текста.
+
+    Латинские слова - ~4 символа на токен, числа - ~3 цифры, не-латинские
+    слова (кириллица и т.п.) - ~2 символа, каждый знак препинания - отдельный
+    токен. Ошибка обычно в пределах 10-15%, поэтому в бюджете есть запас.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        first = piece[0]
+        if first.isascii() and first.isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif first.isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif first.isalpha():
+            tokens += (len(piece) + 1) // 2
+        else:
+            tokens += 1
+    return tokens
+
+
+_TRUNCATION_MARKER = "\n[...truncated]"
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Обрезает текст до max_tokens (по оценке), стараясь не резать строку посередине"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    target = max(max_tokens - estimate_tokens(_TRUNCATION_MARKER), 0)
+    max_chars = int(len(text) * target / tokens)
+    # Плотность токенов в тексте неравномерна: укорачиваем, пока не поместится
+    while True:
+        cut = text.rfind("\n", 0, max_chars)
+        if cut < max_chars // 2:
+            cut = max_chars
+        truncated = text[:cut].rstrip()
+        if not truncated or estimate_tokens(truncated) <= target:
+            return truncated + _TRUNCATION_MARKER
+        max_chars = int(cut * 0.9)
+
+
+class PromptBudget:
+    """
+    Бюджет токенов запроса: окно модели = промпт + max_tokens ответа.
+
+    max_tokens задается по типу промпта (простой анализ отвечает коротким
+    JSON, детальный и сравнение - длинным), а не одним значением на все
+    запросы: лишний резерв замедляет ответ и расходует квоту rate limiter.
+    """
+
+    OUTPUT_LIMITS = {
+        "detailed": LLM_MAX_TOKENS_DETAILED,
+        "simple": LLM_MAX_TOKENS_SIMPLE,
+        "comparison": LLM_MAX_TOKENS_COMPARISON,
+        "summary": CV_CHUNK_SUMMARY_TOKENS,
+        "default": LLM_MAX_TOKENS_DEFAULT,
+    }
+
+    # Запас на погрешность оценки токенов и служебные токены чата
+    SAFETY_MARGIN = 0.1
+    # Меньше этого ответ не поместит даже короткий JSON
+    MIN_OUTPUT_TOKENS = 256
+
+    def __init__(self, context_window: int = MISTRAL_CONTEXT_WINDOW):
+        self.context_window = context_window
+
+    def _usable_window(self) -> int:
+        return int(self.context_window * (1 - self.SAFETY_MARGIN))
+
+    def output_limit(self, prompt_type: str) -> int:
+        """Максимальный размер ответа для типа промпта"""
+        return self.OUTPUT_LIMITS.get(prompt_type, self.OUTPUT_LIMITS["default"])
+
+    def max_tokens_for(self, prompt: str, prompt_type: str = "default") -> int:
+        """
+        max_tokens для запроса: лимит типа промпта, но не больше, чем
+        осталось в окне модели после промпта.
+
+        Бросает ValueError, если промпт не оставляет места для ответа -
+        такой запрос Mistral все равно отклонит.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        available = self._usable_window() - prompt_tokens
+        if available < self.MIN_OUTPUT_TOKENS:
+            raise ValueError(
+                f"Prompt (~{prompt_tokens} tokens) exceeds the model context window ({self.context_window})"
+            )
+        max_tokens = min(self.output_limit(prompt_type), available)
+        logger.debug(f"[BUDGET] {prompt_type} prompt ~{prompt_tokens} tokens, max_tokens={max_tokens}")
+        return max_tokens
+
+    def text_budget(self, fixed_prompt: str, prompt_type: str = "default") -> int:
+        """
+        Сколько токенов можно отдать под вставляемый текст (CV), если остальная
+        часть промпта - fixed_prompt, а ответу нужен полный лимит типа промпта
+        """
+        budget = self._usable_window() - estimate_tokens(fixed_prompt) - self.output_limit(prompt_type)
+        return max(budget, 0)
+
+
+# Global prompt budget
+prompt_budget = PromptBudget()
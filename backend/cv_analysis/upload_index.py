@@ -0,0 +1,127 @@
+"""
+Content-hash index of uploaded files: storage object, extracted text and results
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from cache.redis_client import RedisCache, redis_cache
+from config import UPLOAD_INDEX_TTL
+from .prompts import PROMPT_TEMPLATE_VERSION
+from .text_store import decode_extracted_text, encode_extracted_text, extractor_tag
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 содержимого файла"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class UploadIndex:
+    """
+    Индекс загрузок по SHA-256 содержимого.
+
+    Одно и то же резюме часто загружают в разные анализы. Повторная загрузка
+    того же файла тем же пользователем переиспользует объект в storage, а
+    дальше по пути объекта находятся уже извлеченный текст и результат
+    анализа с тем же описанием вакансии.
+
+    Индекс разделен по пользователям (путь объекта начинается с user_id) и
+    хранится в Redis: его потеря означает только повторную работу.
+    """
+
+    HASH_PREFIX = "upload:sha256"
+    OBJECT_PREFIX = "upload:object"
+    RESULT_PREFIX = "upload:result"
+    JOB_DESCRIPTION_PREFIX = "upload:jd"
+
+    def __init__(self, cache: RedisCache = redis_cache, ttl: int = UPLOAD_INDEX_TTL):
+        self.cache = cache
+        self.ttl = ttl
+
+    def _hash_key(self, user_id: str, digest: str) -> str:
+        return f"{self.HASH_PREFIX}:{user_id}:{digest}"
+
+    def _object_key(self, file_path: str) -> str:
+        return f"{self.OBJECT_PREFIX}:{file_path}"
+
+    def _result_key(self, file_paths: List[str], job_description: str) -> str:
+        # Результат зависит и от текста файла (версия экстрактора), и от промптов
+        material = json.dumps({
+            "files": file_paths,
+            "job_description": job_description,
+            "extractor": extractor_tag(),
+            "prompt_version": PROMPT_TEMPLATE_VERSION,
+        }, ensure_ascii=False, sort_keys=True)
+        return f"{self.RESULT_PREFIX}:{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+
+    def find_object(self, user_id: str, digest: str) -> Optional[str]:
+        """Путь в storage, под которым уже лежит файл с таким содержимым"""
+        return self.cache.get(self._hash_key(user_id, digest))
+
+    def register_object(self, user_id: str, digest: str, file_path: str):
+        """Запоминает, что содержимое digest загружено по пути file_path"""
+        self.cache.set(self._hash_key(user_id, digest), file_path, expire=self.ttl)
+
+    def get_text(self, file_path: str) -> Optional[str]:
+        """Извлеченный текст объекта (той же версии экстрактора) или None"""
+        return decode_extracted_text(self.cache.get(self._object_key(file_path)))
+
+    def get_encoded_text(self, file_path: str) -> Optional[str]:
+        """
+        Извлеченный текст объекта в формате колонки extracted_text (для записи
+        в строку файла-дубликата) или None
+        """
+        value = self.cache.get(self._object_key(file_path))
+        return value if decode_extracted_text(value) is not None else None
+
+    def set_text(self, file_path: str, text: str):
+        self.cache.set(self._object_key(file_path), encode_extracted_text(text), expire=self.ttl)
+
+    def _job_description_key(self, kind: str, value: str) -> str:
+        return f"{self.JOB_DESCRIPTION_PREFIX}:{kind}:{value}"
+
+    def _get_job_description(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.cache.get(key)
+        # Запись другой версии экстрактора считается устаревшей
+        if isinstance(entry, dict) and entry.get("extractor") == extractor_tag():
+            return entry
+        return None
+
+    def get_job_description(self, file_path: str, version: str) -> Optional[Dict[str, Any]]:
+        """
+        Разобранное описание вакансии по пути в storage и версии объекта
+        (eTag/время изменения): файл, замененный по тому же пути, не совпадет
+        """
+        return self._get_job_description(self._job_description_key("path", f"{file_path}@{version}"))
+
+    def get_job_description_by_hash(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Разобранное описание вакансии по SHA-256 содержимого файла"""
+        return self._get_job_description(self._job_description_key("sha256", digest))
+
+    def set_job_description(
+        self, file_path: str, digest: str, entry: Dict[str, Any], version: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Запоминает разобранное описание вакансии по содержимому и, если версия
+        объекта известна, по пути с версией
+        """
+        entry = {**entry, "extractor": extractor_tag(), "sha256": digest}
+        if version:
+            self.cache.set(self._job_description_key("path", f"{file_path}@{version}"), entry, expire=self.ttl)
+        self.cache.set(self._job_description_key("sha256", digest), entry, expire=self.ttl)
+        return entry
+
+    def get_result(self, file_paths: List[str], job_description: str) -> Optional[Dict[str, Any]]:
+        """Результат анализа тех же файлов с тем же описанием вакансии"""
+        result = self.cache.get(self._result_key(file_paths, job_description))
+        return result if isinstance(result, dict) else None
+
+    def set_result(self, file_paths: List[str], job_description: str, result: Dict[str, Any]):
+        self.cache.set(self._result_key(file_paths, job_description), result, expire=self.ttl)
+
+
+# Global upload index
+upload_index = UploadIndex()
@@ -30,6 +30,7 @@ class Analysis(BaseModel):
     results: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
     processing_time: Optional[float] = None  # in seconds
+    stage_timings: Optional[Dict[str, float]] = None  # seconds per stage, see cv_analysis.timing
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -42,7 +43,9 @@ class UploadedFile(BaseModel):
     file_type: str
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
-    extracted_text: Optional[str] = None
+    extracted_text: Optional[str] = None  # сжатый текст с тегом версии, см. cv_analysis.text_store
+    analysis_checkpoint: Optional[Dict[str, Any]] = None  # ответ модели по файлу (контрольная точка)
+    analysis_checkpoint_key: Optional[str] = None  # ключ идемпотентности ответа, см. cv_analysis.checkpoints
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class RateLimit(BaseModel):
@@ -146,6 +146,12 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 app.include_router(v1_router, prefix="/api")
 
+@app.on_event("shutdown")
+async def close_mistral_client():
+    """Закрывает пул соединений к Mistral AI при остановке приложения"""
+    from cv_analysis.mistral_client import mistral_client
+    await mistral_client.aclose()
+
 # --- Pydantic модели ---
 class UserCreate(BaseModel):
     email: str
@@ -0,0 +1,8 @@
+-- Migration: Add per-file analysis checkpoints to uploaded_files
+-- Date: 2026-10-17
+
+-- Model output for each file, reused when an analysis task is retried or re-enqueued.
+-- Internal to the pipeline: the assembled result lives in analyses.results
+ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS analysis_checkpoint JSONB;
+-- Idempotency key of the stored output (file, job description text, extractor version)
+ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS analysis_checkpoint_key VARCHAR(64);
@@ -0,0 +1,8 @@
+-- Migration: Add per-stage timings to analyses
+-- Date: 2026-10-17
+
+-- Seconds per stage: queue_wait, download, extraction, llm, persist (sum = processing_time)
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+
+-- Latency reports read recent completed analyses
+CREATE INDEX IF NOT EXISTS idx_analyses_status_created_at ON analyses(status, created_at);
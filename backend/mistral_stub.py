@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Local Mistral-compatible stub server
+====================================
+
+Stand-in for MISTRAL_API_URL for offline benchmarks and load tests of
+CVAnalyzer and the Celery pipeline. Speaks the /v1/chat/completions protocol,
+including stream=true (SSE), usage and Retry-After on 429.
+
+Modes:
+    replay  - answer from recorded responses; unknown requests get a canned
+              analysis JSON (or 404 with --strict)
+    record  - proxy to the real Mistral API and save every response
+
+Latency, 5xx and 429 are drawn from a seeded RNG per request content, so the
+same workload produces the same faults and timings on every run, regardless
+of concurrency.
+
+Usage:
+    python mistral_stub.py --mode record --recordings ./stub_recordings
+    python mistral_stub.py --latency-ms 800 --jitter-ms 200 --error-rate 0.05 --rate-limit-rate 0.02
+    MISTRAL_API_URL=http://127.0.0.1:8089/v1/chat/completions celery -A tasks.celery_app worker
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cv_analysis.token_budget import estimate_tokens
+
+UPSTREAM_URL = "https://api.mistral.ai/v1/chat/completions"
+
+# Ответ для незаписанных запросов: валидный детальный анализ, чтобы пайплайн
+# проходил до конца (включая конвертацию в оценки)
+CANNED_ANALYSIS = {
+    "experience_summary": {
+        "full_name": "Stub Candidate",
+        "summary": "Synthetic response from the local Mistral stub",
+        "years_of_experience": "5",
+        "skills_1_plus_years": "Python, SQL",
+        "technologies": "FastAPI, PostgreSQL, Redis",
+        "education_degree": "BSc",
+        "education_major": "Computer Science",
+        "certifications": ""
+    },
+    "achievers_rating": {
+        "overall_score": 12,
+        "skills": {"score": 6},
+        "experience_bonus": {"score": 3}
+    },
+    "requirements_analysis": {},
+    "overall_assessment": {
+        "match_score": 0.7,
+        "strengths": ["Synthetic strength"],
+        "weaknesses": ["Synthetic weakness"]
+    },
+    "recommendations": [{"suggestion": "Synthetic recommendation"}],
+    "section_summary": "Synthetic section summary"
+}
+
+
+@dataclass
+class StubConfig:
+    """Параметры поведения заглушки"""
+    mode: str = "replay"
+    recordings_dir: str = "stub_recordings"
+    strict: bool = False
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    stream_chunk_chars: int = 40
+    stream_chunk_delay_ms: float = 0.0
+    seed: int = 0
+    upstream_url: str = UPSTREAM_URL
+    api_key: Optional[str] = None
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Ключ записи: содержимое запроса без служебных полей (stream и т.п.)"""
+    material = json.dumps({
+        "model": payload.get("model"),
+        "messages": payload.get("messages"),
+        "max_tokens": payload.get("max_tokens"),
+        "temperature": payload.get("temperature"),
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class RecordingStore:
+    """Записанные ответы Mistral: по одному JSON-файлу на запрос"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["response"]
+
+    def save(self, key: str, payload: Dict[str, Any], response: Dict[str, Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump({"request": payload, "response": response}, f, ensure_ascii=False, indent=2)
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    """FastAPI-приложение заглушки (отдельная функция - для тестов)"""
+    app = FastAPI(title="Mistral stub")
+    store = RecordingStore(config.recordings_dir)
+    occurrences: Dict[str, int] = {}
+    stats = {"requests": 0, "replayed": 0, "recorded": 0, "synthesized": 0, "errors": 0, "rate_limited": 0}
+    lock = threading.Lock()
+
+    def draw(key: str) -> random.Random:
+        # n-й повтор одного и того же запроса всегда получает одну и ту же судьбу
+        with lock:
+            n = occurrences.get(key, 0)
+            occurrences[key] = n + 1
+        return random.Random(f"{config.seed}:{key}:{n}")
+
+    def count(name: str):
+        # resolve выполняется в потоках (asyncio.to_thread), остальное - в event loop
+        with lock:
+            stats[name] += 1
+
+    def completion(payload: Dict[str, Any], content: str) -> Dict[str, Any]:
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in payload.get("messages", []))
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": f"stub-{request_key(payload)[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def resolve(key: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if config.mode == "record":
+            response = requests.post(
+                config.upstream_url,
+                headers={"Authorization": f"Bearer {config.api_key}", "Content-Type": "application/json"},
+                json={k: v for k, v in payload.items() if k != "stream"},
+                timeout=120
+            )
+            response.raise_for_status()
+            body = response.json()
+            store.save(key, payload, body)
+            count("recorded")
+            return body
+
+        body = store.load(key)
+        if body is not None:
+            count("replayed")
+            return body
+        if config.strict:
+            return None
+        count("synthesized")
+        return completion(payload, json.dumps(CANNED_ANALYSIS, ensure_ascii=False))
+
+    async def stream(body: Dict[str, Any], delay: float):
+        content = body["choices"][0]["message"]["content"]
+        size = max(config.stream_chunk_chars, 1)
+        for i in range(0, len(content), size):
+            chunk = {
+                "id": body.get("id"),
+                "object": "chat.completion.chunk",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"content": content[i:i + size]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            if delay:
+                await asyncio.sleep(delay)
+        final = {"id": body.get("id"), "choices": [], "usage": body.get("usage")}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        key = request_key(payload)
+        rng = draw(key)
+        count("requests")
+
+        latency = max(rng.gauss(config.latency_ms, config.jitter_ms), 0.0) / 1000
+        if latency:
+            await asyncio.sleep(latency)
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            count("rate_limited")
+            return JSONResponse(
+                status_code=429,
+                content={"message": "Requests rate limit exceeded"},
+                headers={"Retry-After": str(config.retry_after)}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            count("errors")
+            return JSONResponse(status_code=500, content={"message": "Injected upstream error"})
+
+        body = await asyncio.to_thread(resolve, key, payload)
+        if body is None:
+            return JSONResponse(status_code=404, content={"message": f"No recording for request {key}"})
+
+        if payload.get("stream"):
+            return StreamingResponse(
+                stream(body, config.stream_chunk_delay_ms / 1000),
+                media_type="text/event-stream"
+            )
+        return body
+
+    @app.get("/stats")
+    async def get_stats():
+        with lock:
+            return dict(stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Mistral-compatible stub server")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--recordings", default="stub_recordings", help="Directory with recorded responses")
+    parser.add_argument("--strict", action="store_true", help="Return 404 for requests without a recording")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standard deviation of latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429")
+    parser.add_argument("--stream-chunk-chars", type=int, default=40)
+    parser.add_argument("--stream-chunk-delay-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        mode=args.mode,
+        recordings_dir=args.recordings,
+        strict=args.strict,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        stream_chunk_chars=args.stream_chunk_chars,
+        stream_chunk_delay_ms=args.stream_chunk_delay_ms,
+        seed=args.seed,
+        api_key=os.getenv("MISTRAL_API_KEY") if args.mode == "record" else None
+    )
+    if config.mode == "record" and not config.api_key:
+        parser.error("record mode needs MISTRAL_API_KEY")
+
+    print(f"Mistral stub ({config.mode}) on http://{args.host}:{args.port}/v1/chat/completions")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,28 @@
 Background tasks for CV analysis using Celery
 """
 import os
+import time
 import logging
-from celery import Celery
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from celery import Celery, chain, chord
 from supabase import create_client, Client
 from cv_analysis.cv_analyzer import CVAnalyzer
-from config import BUCKET_NAME, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
+from cv_analysis.candidates import load_candidates
+from cv_analysis.checkpoints import analysis_run_key, analysis_runs, completed_run_key, file_checkpoint_key
+from cv_analysis.comparison_matrix import CandidateComparisonMatrix
+from cv_analysis.circuit_breaker import CircuitOpenError
+from cv_analysis.rate_limiter import RateLimitTimeoutError
+from cv_analysis.job_description import GENERIC_JOB_DESCRIPTION, load_job_description, storage_object_version
+from cv_analysis.partial_results import partial_results
+from cv_analysis.result_assembly import assemble_file_results, file_section, is_complete_assembly, is_complete_result
+from cv_analysis.parallel_extraction import ExtractionJob, extraction_pool
+from cv_analysis.text_normalization import is_raw_pdf_garbage, normalize_document
+from cv_analysis.text_store import decode_extracted_text, encode_extracted_text
+from cv_analysis.timing import processing_time, stage_durations
+from cv_analysis.upload_index import upload_index
+from config import BUCKET_NAME, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, STORAGE_DOWNLOAD_CONCURRENCY
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -20,43 +37,151 @@ if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment variables")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
+def _mark_failed(analysis_id: str, error: str):
+    """Переводит анализ в статус "failed" с сообщением об ошибке"""
+    try:
+        supabase.table("analyses").update({
+            "status": "failed",
+            "error_message": error
+        }).eq("id", analysis_id).execute()
+    except Exception as update_error:
+        logger.error(f"Failed to update analysis status: {update_error}")
+
+
+def _retry_countdown(task, error: Exception) -> int:
+    """Задержка перед повтором задачи"""
+    countdown = 60 * (task.request.retries + 1)  # Экспоненциальная задержка
+    if isinstance(error, CircuitOpenError):
+        # Не занимаем воркер, пока Mistral недоступен
+        countdown = max(countdown, int(error.retry_after))
+    return countdown
+
+
+def _retry_stage(task, analysis_id: str, error: Exception, stage: str, run_key: str = None):
+    """
+    Ошибка стадии: статус "failed" и повтор только этой стадии
+    (завершенные стадии цепочки не перезапускаются). После последней
+    попытки запуск освобождается - его можно поставить заново
+    """
+    logger.error(f"Error in CV analysis ({stage} stage) for {analysis_id}: {error}")
+    _mark_failed(analysis_id, str(error))
+    
+    # Повторная попытка, если это не последняя
+    if task.request.retries < task.max_retries:
+        logger.info(f"Retrying {stage} stage for {analysis_id} (attempt {task.request.retries + 1})")
+        raise task.retry(countdown=_retry_countdown(task, error))
+    logger.error(f"Max retries reached for analysis {analysis_id}")
+    analysis_runs.release(run_key)
+    raise error
+
+
+def _load_file_checkpoint(file_id: str, checkpoint_key: str):
+    """Сохраненный ответ модели для файла, если он получен с теми же входными данными"""
+    try:
+        resp = supabase.table("uploaded_files").select("analysis_checkpoint, analysis_checkpoint_key").eq("id", file_id).single().execute()
+    except Exception as e:
+        logger.warning(f"[ANALYSIS] Failed to load checkpoint for file {file_id}: {e}")
+        return None
+    row = resp.data or {}
+    if row.get("analysis_checkpoint_key") == checkpoint_key and isinstance(row.get("analysis_checkpoint"), dict):
+        return row["analysis_checkpoint"]
+    return None
+
+
+def _save_file_checkpoint(file_id: str, checkpoint_key: str, results: dict):
+    """Сохраняет ответ модели для файла: повтор задачи не вызовет модель снова"""
+    try:
+        supabase.table("uploaded_files").update({
+            "analysis_checkpoint": results,
+            "analysis_checkpoint_key": checkpoint_key
+        }).eq("id", file_id).execute()
+    except Exception as e:
+        logger.warning(f"[ANALYSIS] Failed to store checkpoint for file {file_id}: {e}")
+
+
+@celery_app.task(bind=True, max_retries=3)
+def analyze_cv_background(self, analysis_id: str, enqueued_at: float = None):
+    """
+    Фоновая задача для анализа CV с оценками от 0 до 100.
+
+    Запускает стадии анализа цепочкой, каждую на своей очереди:
+    extract (скачивание и извлечение текста, CPU) -> llm (ожидание модели,
+    отдельная подзадача на каждый файл) -> persist (сборка и запись
+    результата). Пулы воркеров стадий масштабируются независимо,
+    см. STAGE_WORKER_SETTINGS в tasks/celery_app.py
+
+    Постановка идемпотентна: ключ запуска - анализ, вакансия и набор файлов.
+    Если такой запуск уже идет или уже завершен, задача ничего не делает.
+    Ответы модели сохраняются по файлам (контрольные точки), поэтому
+    повторный запуск не вызывает модель для уже проанализированных файлов.
+
+    enqueued_at - время постановки (time.time()) для учета ожидания в очереди;
+    по умолчанию - начало этой задачи
+    """
+    enqueued_at = enqueued_at or time.time()
+    logger.info(f"Starting CV analysis pipeline for analysis_id: {analysis_id}")
+    resp = supabase.table("analyses").select("job_description, status, results").eq("id", analysis_id).single().execute()
+    if not resp.data:
+        raise ValueError(f"Analysis not found: {analysis_id}")
+    analysis = resp.data
+    files = supabase.table("uploaded_files").select("id, file_path").eq("analysis_id", analysis_id).execute().data or []
+    run_key = analysis_run_key(analysis_id, analysis.get("job_description", ""), files)
+    
+    if completed_run_key(analysis) == run_key:
+        logger.info(f"[ANALYSIS] Analysis {analysis_id} is already completed for the same input, skipping")
+        if analysis.get("status") != "completed":
+            # Статус сброшен постановкой, но результат для этих входных данных уже есть
+            supabase.table("analyses").update({"status": "completed"}).eq("id", analysis_id).execute()
+        return {"status": "skipped", "reason": "completed", "analysis_id": analysis_id}
+    if not analysis_runs.claim(run_key, self.request.id or analysis_id):
+        logger.info(f"[ANALYSIS] Analysis {analysis_id} is already running (run {run_key[:12]}), skipping duplicate")
+        return {"status": "skipped", "reason": "in_progress", "analysis_id": analysis_id}
+    
+    pipeline = chain(
+        extract_analysis_stage.s(analysis_id, run_key, {"enqueued": enqueued_at}),
+        persist_analysis_stage.s()
+    ).apply_async()
+    return {"status": "queued", "analysis_id": analysis_id, "pipeline_id": pipeline.id, "run_key": run_key}
+
+
 @celery_app.task(bind=True, max_retries=3)
-def analyze_cv_background(self, analysis_id: str):
+def extract_analysis_stage(self, analysis_id: str, run_key: str = None, marks: dict = None):
     """
-    Фоновая задача для анализа CV с оценками от 0 до 100
+    Стадия extract: описание вакансии, скачивание и извлечение текста файлов,
+    нормализация. Затем задача заменяется аккордом: анализ каждого файла
+    на очереди llm и сборка результата (assemble_analysis_stage).
+    marks - отметки времени стадий (см. cv_analysis.timing)
     """
+    marks = {**(marks or {}), "started": time.time()}
     try:
         logger.info(f"Starting CV analysis for analysis_id: {analysis_id}")
         
-        # Инициализируем анализатор в самом начале
-        analyzer = CVAnalyzer()
-        
         # Получаем анализ из базы данных
         resp = supabase.table("analyses").select("*").eq("id", analysis_id).single().execute()
         if not resp.data:
             raise ValueError(f"Analysis not found: {analysis_id}")
         
         analysis = resp.data
-        user_id = analysis["user_id"]
         job_description = analysis.get("job_description", "")
         job_description_text = ""
+        job_requirements = None
 
         # Если job_description выглядит как путь к PDF-файлу
         if isinstance(job_description, str) and job_description.lower().endswith(".pdf"):
             try:
-                file_bytes = supabase.storage.from_(BUCKET_NAME).download(job_description)
-                temp_analyzer = CVAnalyzer()
-                job_description_text = temp_analyzer.extract_text_from_pdf(file_bytes)
+                # Текст вакансии кэшируется по пути (с версией объекта) и по содержимому: одна вакансия
+                # на много кандидатов разбирается один раз (в песочнице)
+                parsed_job = load_job_description(
+                    job_description,
+                    download=lambda path: supabase.storage.from_(BUCKET_NAME).download(path),
+                    version=lambda path: storage_object_version(supabase.storage.from_(BUCKET_NAME), path)
+                )
+                job_description_text = parsed_job["text"]
+                job_requirements = parsed_job["requirements"]
                 logger.info(f"[ANALYSIS] Extracted job description from PDF: {job_description_text[:200]}")
-                
-                # Check if extraction failed (raw PDF content)
-                if not job_description_text.strip() or job_description_text.startswith('%PDF'):
-                    logger.warning("[ANALYSIS] Job description PDF extraction failed, using generic description")
-                    job_description_text = "Software development position requiring technical skills and experience"
-                    
             except Exception as e:
                 logger.error(f"Error extracting text from job_description PDF: {e}")
-                job_description_text = "Software development position requiring technical skills and experience"
+                job_description_text = GENERIC_JOB_DESCRIPTION
         else:
             job_description_text = job_description
 
@@ -71,67 +196,247 @@ def analyze_cv_background(self, analysis_id: str):
         if not files:
             raise ValueError("No files uploaded for this analysis")
             
-        # Скачиваем и извлекаем текст из всех файлов
-        texts = []
-        for f in files:
+        # Текст, извлеченный при прошлых запусках, берем из БД; остальные файлы
+        # скачиваем параллельно (не больше STORAGE_DOWNLOAD_CONCURRENCY одновременно)
+        # Время завершения каждого скачивания: конец стадии download - последнее из них
+        downloaded_at = [time.time()]
+        with ThreadPoolExecutor(max_workers=STORAGE_DOWNLOAD_CONCURRENCY, thread_name_prefix="download") as downloads:
+            jobs = []
+            for f in files:
+                stored_text = decode_extracted_text(f.get("extracted_text"))
+                if stored_text is None:
+                    # Дубликат ранее загруженного файла: текст уже извлечен в другом анализе
+                    stored_text = upload_index.get_text(f["file_path"])
+                if stored_text is not None:
+                    logger.info(f"[ANALYSIS] Reusing stored text for {f['filename']}")
+                    jobs.append(ExtractionJob(f["filename"], f["file_type"], text=stored_text))
+                    continue
+                download = downloads.submit(supabase.storage.from_(BUCKET_NAME).download, f["file_path"])
+                download.add_done_callback(lambda _: downloaded_at.append(time.time()))
+                jobs.append(ExtractionJob(f["filename"], f["file_type"], download=download))
+            
+            # Извлекаем текст параллельно; каждый файл уходит в разбор, как только
+            # скачан. Текст (или ошибка) каждого файла - в job.text / job.error
+            extraction_pool.extract_files(jobs)
+        marks["downloaded"] = max(downloaded_at)
+        
+        # Сохраняем новый текст (сжатым), чтобы retry и повторные запуски не разбирали файлы снова
+        for f, job in zip(files, jobs):
+            if job.data is None or job.text is None or is_raw_pdf_garbage(job.text):
+                continue
+            upload_index.set_text(f["file_path"], job.text)
             try:
-                # Скачиваем файл из Supabase Storage
-                file_bytes = supabase.storage.from_(BUCKET_NAME).download(f["file_path"])
-                file_type = f["file_type"].lower()
-                
-                # Извлекаем текст в зависимости от типа файла
-                if file_type == "pdf":
-                    text = analyzer.extract_text_from_pdf(file_bytes)
-                elif file_type == "docx":
-                    text = analyzer.extract_text_from_docx(file_bytes)
-                elif file_type == "doc":
-                    text = "[DOC file: manual review required]"
-                else:
-                    text = f"[Unsupported file type: {file_type}]"
-                
-                logger.info(f"[ANALYSIS] File: {f['filename']} | First 200 chars: {text[:200]}")
-                texts.append(f"--- {f['filename']} ---\n{text}")
-                logger.info(f"Successfully extracted text from {f['filename']}")
-                
+                supabase.table("uploaded_files").update({
+                    "extracted_text": encode_extracted_text(job.text)
+                }).eq("id", f["id"]).execute()
             except Exception as e:
-                logger.error(f"Error processing file {f['filename']}: {e}")
-                texts.append(f"--- {f['filename']} ---\n[Error extracting text: {e}]")
+                logger.warning(f"[ANALYSIS] Failed to store extracted text for {f['filename']}: {e}")
         
-        # Объединяем все тексты
-        all_text = "\n\n".join(texts)
+        # Нормализация перед промптом: колонтитулы, переносы, пробелы, повторы контактов.
+        # В БД остается исходный текст, нормализуется только то, что уходит в модель
+        documents = []
+        file_errors = []
+        text_normalization = []
+        for index, (f, job) in enumerate(zip(files, jobs)):
+            entry = {"index": index, "file_id": f["id"], "filename": job.filename, "file_path": f["file_path"]}
+            if job.text is None:
+                file_errors.append({**entry, "error": f"Error extracting text: {job.error or 'no text'}"})
+                continue
+            if is_raw_pdf_garbage(job.text):
+                # Сырые байты PDF вместо текста в промпт не попадают
+                logger.warning(f"[ANALYSIS] Raw PDF content instead of text in {job.filename}, skipping")
+                file_errors.append({**entry, "error": "Error extracting text: unreadable PDF content"})
+                continue
+            normalized, report = normalize_document(job.text)
+            if not normalized:
+                file_errors.append({**entry, "error": "No text extracted from file"})
+                continue
+            documents.append({**entry, "text": normalized})
+            text_normalization.append({"filename": job.filename, **report.as_dict()})
+            logger.info(
+                f"[ANALYSIS] Normalized {job.filename}: {report.tokens_before} -> "
+                f"{report.tokens_after} tokens (saved {report.tokens_saved})"
+            )
         
         logger.info(f"[ANALYSIS] Job description text (first 200 chars): {job_description_text[:200]}")
-        logger.info(f"[ANALYSIS] All CV text (first 200 chars): {all_text[:200]}")
         
         # If job description extraction failed, use a generic one
         if not job_description_text.strip():
             logger.warning("[ANALYSIS] Job description extraction failed, using generic description")
-            job_description_text = "Software development position requiring technical skills and experience"
+            job_description_text = GENERIC_JOB_DESCRIPTION
         
-        if not all_text.strip():
+        if not documents:
             error_msg = "No text extracted from uploaded files. PDF/DOCX may be empty or not parsable."
             logger.error(error_msg)
-            supabase.table("analyses").update({
-                "status": "failed",
-                "error_message": error_msg
-            }).eq("id", analysis_id).execute()
-            return {"status": "failed", "analysis_id": analysis_id, "error": error_msg}
+            _mark_failed(analysis_id, error_msg)
+            return {"status": "failed", "analysis_id": analysis_id, "run_key": run_key, "error": error_msg}
         
-        # Выполняем AI-анализ с оценками
-        logger.info("Starting AI analysis with scoring...")
-        logger.info(f"[TASK] About to call analyze_cv_with_score with text length: {len(all_text)}")
-        logger.info(f"[TASK] Job description length: {len(job_description_text)}")
-        results = analyzer.analyze_cv_with_score(all_text, job_description_text)
-        logger.info(f"[TASK] analyze_cv_with_score completed, results keys: {list(results.keys()) if results else 'None'}")
-        
-        # Добавляем метаданные анализа
-        results["analysis_metadata"] = {
+        marks["extracted"] = time.time()
+        metadata = {
+            "run_key": run_key,
+            "stage_marks": marks,
             "total_files": len(files),
             "file_types": list(set([f["file_type"] for f in files])),
-                "analysis_id": analysis_id,
-            "job_description_provided": bool(job_description_text.strip())
+            "analysis_id": analysis_id,
+            "job_description_provided": bool(job_description_text.strip()),
+            "text_normalization": text_normalization,
+            "job_requirements": job_requirements
         }
         
+        # Каждый файл - отдельная подзадача на очереди llm, все выполняются
+        # параллельно; результат собирает callback аккорда (chord). Время
+        # анализа определяется самым долгим файлом, а не суммой всех файлов
+        partial_results.clear(analysis_id)
+        multiple_files = len(documents) > 1
+        fan_out = chord(
+            [
+                llm_file_analysis_stage.s(analysis_id, document, job_description_text, multiple_files)
+                for document in documents
+            ],
+            assemble_analysis_stage.s(analysis_id, file_errors, metadata)
+        )
+        # Аккорд не дошел до persist (упала подзадача или сборка) - запуск
+        # все равно должен быть освобожден, а анализ помечен как failed
+        fan_out.link_error(analysis_chord_failed.s(analysis_id, run_key))
+        logger.info(f"[ANALYSIS] Analyzing {len(documents)} files in parallel for analysis_id={analysis_id}")
+        
+    except Exception as e:
+        _retry_stage(self, analysis_id, e, "extract", run_key)
+    
+    # Замена задачи аккордом - вне try: replace() завершает задачу исключением Ignore.
+    # Следующие стадии цепочки (persist) получат результат callback аккорда
+    return self.replace(fan_out)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def llm_file_analysis_stage(self, analysis_id: str, document: dict, job_description_text: str, multiple_files: bool):
+    """
+    Стадия llm для одного файла: AI-анализ с оценками (или готовый результат
+    анализа того же файла с тем же описанием вакансии). Полноценный ответ
+    сохраняется в uploaded_files как контрольная точка.
+
+    Ошибка повторяется только для этого файла; после последней попытки
+    возвращается ошибка файла, чтобы аккорд завершился и остальные файлы
+    попали в результат
+    """
+    filename = document["filename"]
+    file_path = document["file_path"]
+    file_id = document.get("file_id")
+    entry = {"index": document["index"], "filename": filename, "file_path": file_path}
+    try:
+        logger.info(f"[TASK] Analyzing {filename} for {analysis_id}, text length: {len(document['text'])}")
+        # Контрольная точка: ответ модели для этого файла уже сохранен прошлой попыткой
+        checkpoint_key = file_checkpoint_key(file_path, job_description_text)
+        results = _load_file_checkpoint(file_id, checkpoint_key) if file_id else None
+        if results is not None:
+            logger.info(f"[ANALYSIS] Resuming from the stored analysis of {filename}")
+            return {**entry, "results": results}
+        
+        # Файл уже анализировался с тем же описанием вакансии - LLM не вызываем
+        results = upload_index.get_result([file_path], job_description_text)
+        if results is not None:
+            logger.info(f"[ANALYSIS] Reusing results of an earlier analysis of {filename}")
+        else:
+            # Секции анализа публикуются по мере генерации, пока задача еще работает
+            results = CVAnalyzer().analyze_cv_with_score(
+                document["text"],
+                job_description_text,
+                on_section=lambda section, value: partial_results.publish(
+                    analysis_id, file_section(filename, section, multiple_files), value
+                )
+            )
+            # Кэшируем только полноценный анализ, а не ответы-заглушки при ошибках
+            if is_complete_result(results):
+                upload_index.set_result([file_path], job_description_text, results)
+        if file_id and is_complete_result(results):
+            _save_file_checkpoint(file_id, checkpoint_key, results)
+        logger.info(f"[TASK] Analysis of {filename} completed, results keys: {list(results.keys()) if results else 'None'}")
+        return {**entry, "results": results}
+        
+    except Exception as e:
+        logger.error(f"Error analyzing {filename} for {analysis_id}: {e}")
+        if self.request.retries < self.max_retries:
+            logger.info(f"Retrying analysis of {filename} (attempt {self.request.retries + 1})")
+            raise self.retry(countdown=_retry_countdown(self, e))
+        logger.error(f"Max retries reached for {filename} in analysis {analysis_id}")
+        return {**entry, "error": str(e)}
+
+
+@celery_app.task(bind=True, max_retries=3)
+def assemble_analysis_stage(self, file_results: list, analysis_id: str, file_errors: list, metadata: dict):
+    """
+    Callback аккорда: собирает анализы файлов (и ошибки извлечения)
+    в результат анализа для стадии persist
+    """
+    run_key = metadata.get("run_key")
+    try:
+        metadata = {**metadata, "stage_marks": {**(metadata.get("stage_marks") or {}), "analyzed": time.time()}}
+        ordered = sorted(list(file_results) + list(file_errors), key=lambda item: item["index"])
+        results = assemble_file_results(ordered)
+        if results is None:
+            errors = "; ".join(f"{item['filename']}: {item.get('error')}" for item in ordered)
+            error_msg = f"Analysis failed for all files ({errors})"
+            logger.error(f"[ANALYSIS] {error_msg}")
+            _mark_failed(analysis_id, error_msg)
+            return {"status": "failed", "analysis_id": analysis_id, "run_key": run_key, "error": error_msg}
+        
+        logger.info(f"[ANALYSIS] Assembled {len(ordered)} file analyses for {analysis_id}, best: {results['best_file']}")
+        # Текст дальше не нужен - не гоняем его через брокер
+        return {
+            "status": "analyzed",
+            "analysis_id": analysis_id,
+            "results": results,
+            "metadata": metadata
+        }
+        
+    except Exception as e:
+        _retry_stage(self, analysis_id, e, "assemble", run_key)
+
+
+@celery_app.task
+def analysis_chord_failed(request, exc, traceback, analysis_id: str, run_key: str = None):
+    """
+    Errback аккорда анализа: подзадача или сборка завершились ошибкой,
+    и persist не выполнится. Анализ помечается как failed, запуск
+    освобождается - его можно поставить заново
+    """
+    logger.error(f"[ANALYSIS] Analysis {analysis_id} failed in task {request.id}: {exc}")
+    _mark_failed(analysis_id, str(exc))
+    analysis_runs.release(run_key)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def persist_analysis_stage(self, payload: dict):
+    """
+    Стадия persist: сохранение результата анализа в базу данных.
+    Последняя стадия цепочки: здесь запуск освобождается (и при ошибке
+    предыдущих стадий)
+    """
+    run_key = payload.get("run_key") or (payload.get("metadata") or {}).get("run_key")
+    if payload.get("status") == "failed":
+        analysis_runs.release(run_key)
+        return payload
+    analysis_id = payload["analysis_id"]
+    try:
+        results = payload["results"]
+        metadata = dict(payload["metadata"])
+        
+        # Время стадий: ожидание в очереди, скачивание, извлечение, LLM, запись
+        marks = {**(metadata.pop("stage_marks", None) or {}), "persisted": time.time()}
+        stage_timings = stage_durations(marks)
+        total_time = processing_time(marks)
+        metadata["stage_timings"] = stage_timings
+        metadata["processing_time"] = total_time
+        logger.info(f"[ANALYSIS] Stage timings for {analysis_id}: {stage_timings}, total {total_time}s")
+        
+        # Ключ запуска сохраняется только у полноценного результата: анализ
+        # с ошибками файлов или заглушками должен выполняться повторно
+        if not is_complete_assembly(results):
+            metadata.pop("run_key", None)
+        
+        # Добавляем метаданные анализа
+        results["analysis_metadata"] = metadata
+        
         # Сохраняем результат в базу данных
         logger.info(f"[ANALYSIS] Saving results to database for analysis_id: {analysis_id}")
         logger.info(f"[ANALYSIS] Results keys: {list(results.keys())}")
@@ -140,7 +445,8 @@ def analyze_cv_background(self, analysis_id: str):
             update_data = {
                 "results": results,
                 "status": "completed",
-                "processing_time": 0  # Можно добавить реальное время обработки
+                "processing_time": total_time,
+                "stage_timings": stage_timings
             }
             logger.info(f"[ANALYSIS] Update data: {update_data}")
             
@@ -153,7 +459,7 @@ def analyze_cv_background(self, analysis_id: str):
                 
         except Exception as db_error:
             logger.error(f"[ANALYSIS] Database update error: {db_error}")
-            # Try without processing_time if it fails
+            # Try without processing_time/stage_timings if it fails (время остается в analysis_metadata)
             try:
                 update_data = {
                     "results": results,
@@ -172,76 +478,75 @@ def analyze_cv_background(self, analysis_id: str):
                 logger.error(f"[ANALYSIS] Retry database update also failed: {retry_error}")
                 raise
         
+        partial_results.clear(analysis_id)
+        analysis_runs.release(run_key)
         logger.info(f"[ANALYSIS] CV analysis completed successfully for analysis_id: {analysis_id}")
         logger.info(f"[ANALYSIS] About to return result: {{'status': 'completed', 'analysis_id': '{analysis_id}'}}")
         return {"status": "completed", "analysis_id": analysis_id}
         
     except Exception as e:
-        logger.error(f"Error in CV analysis for {analysis_id}: {e}")
-        
-        # Обновляем статус на "failed" и сохраняем ошибку
-        try:
-            supabase.table("analyses").update({
-                "status": "failed",
-                "error_message": str(e)
-            }).eq("id", analysis_id).execute()
-        except Exception as update_error:
-            logger.error(f"Failed to update analysis status: {update_error}")
-        
-        # Повторная попытка, если это не последняя
-        if self.request.retries < self.max_retries:
-            logger.info(f"Retrying analysis for {analysis_id} (attempt {self.request.retries + 1})")
-            raise self.retry(countdown=60 * (self.request.retries + 1))  # Экспоненциальная задержка
-        else:
-            logger.error(f"Max retries reached for analysis {analysis_id}")
-            raise
+        _retry_stage(self, analysis_id, e, "persist", run_key)
+
 
 @celery_app.task(bind=True, max_retries=3)
-def compare_candidates_background(self, analysis_id: str, candidates_data: list, job_description: str):
+def compare_candidates_background(self, user_id: str, candidate_ids: list, top_n: int = 3):
     """
-    Фоновая задача для сравнения кандидатов с оценками от 0 до 100
+    Фоновое сравнение кандидатов: матрица сравнения топ-N кандидатов.
+
+    Кандидаты - id загруженных файлов завершенных анализов пользователя;
+    их результаты загружаются в задаче, а не передаются через брокер.
+    Ход выполнения публикуется состоянием PROGRESS (stage, step, total_steps),
+    результат доступен по id задачи (см. GET /analysis/compare-candidates/{job_id})
     """
+    def progress(stage: str, step: int, **details):
+        self.update_state(state="PROGRESS", meta={
+            "user_id": user_id,
+            "stage": stage,
+            "step": step,
+            "total_steps": 2,
+            **details
+        })
+    
     try:
-        logger.info(f"Starting candidate comparison for analysis_id: {analysis_id}")
-        
-        # Инициализируем анализатор
-        analyzer = CVAnalyzer()
+        logger.info(f"Starting candidate comparison for user {user_id}: {len(candidate_ids)} candidates")
+        progress("loading_candidates", 1, total_candidates=len(candidate_ids))
+        candidates_data, missing = load_candidates(supabase, user_id, candidate_ids)
+        if missing:
+            logger.warning(f"[COMPARISON] No analysis results for candidates: {missing}")
+        if not candidates_data:
+            return {
+                "status": "failed",
+                "user_id": user_id,
+                "error": "No candidate data found",
+                "missing_candidates": missing
+            }
         
-        # Выполняем сравнение кандидатов
-        comparison_results = analyzer.compare_candidates(candidates_data, job_description)
+        progress("comparing", 2, total_candidates=len(candidates_data), missing_candidates=missing)
+        comparison_results = CandidateComparisonMatrix().generate_comparison_matrix(candidates_data, top_n=top_n)
+        if "error" in comparison_results:
+            raise Exception(comparison_results["error"])
         
-        # Добавляем метаданные сравнения
-        comparison_results["comparison_metadata"] = {
-            "analysis_id": analysis_id,
-            "total_candidates": len(candidates_data),
-            "job_description_provided": bool(job_description.strip())
+        logger.info(f"Candidate comparison completed successfully for user {user_id}")
+        return {
+            "status": "completed",
+            "user_id": user_id,
+            "comparison_matrix": comparison_results,
+            "metadata": {
+                "generated_at": datetime.utcnow().isoformat(),
+                "candidates_compared": len(candidates_data),
+                "missing_candidates": missing,
+                "top_n": top_n
+            }
         }
-        
-        # Сохраняем результат в базу данных
-        supabase.table("analyses").update({
-            "results": comparison_results,
-            "status": "completed"
-        }).eq("id", analysis_id).execute()
-            
-        logger.info(f"Candidate comparison completed successfully for analysis_id: {analysis_id}")
-        return {"status": "completed", "analysis_id": analysis_id}
             
     except Exception as e:
-        logger.error(f"Error in candidate comparison for {analysis_id}: {e}")
-        
-        # Обновляем статус на "failed" и сохраняем ошибку
-        try:
-            supabase.table("analyses").update({
-                "status": "failed",
-                "error_message": str(e)
-            }).eq("id", analysis_id).execute()
-        except Exception as update_error:
-            logger.error(f"Failed to update analysis status: {update_error}")
+        logger.error(f"Error in candidate comparison for user {user_id}: {e}")
         
-        # Повторная попытка, если это не последняя
-        if self.request.retries < self.max_retries:
-            logger.info(f"Retrying comparison for {analysis_id} (attempt {self.request.retries + 1})")
-            raise self.retry(countdown=60 * (self.request.retries + 1))
-        else:
-            logger.error(f"Max retries reached for comparison {analysis_id}")
-            raise 
\ No newline at end of file
+        # Повторяются только сбои связи с моделью и нехватка квоты; остальные ошибки повтор не исправит
+        retriable = isinstance(e, (requests.exceptions.RequestException, CircuitOpenError, RateLimitTimeoutError))
+        if retriable and self.request.retries < self.max_retries:
+            logger.info(f"Retrying comparison for user {user_id} (attempt {self.request.retries + 1})")
+            raise self.retry(countdown=_retry_countdown(self, e))
+        if retriable:
+            logger.error(f"Max retries reached for comparison of user {user_id}")
+        return {"status": "failed", "user_id": user_id, "error": str(e)}
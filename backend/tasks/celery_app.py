@@ -2,6 +2,7 @@
 Celery configuration for background tasks
 """
 import os
+import sys
 from celery import Celery
 from celery.schedules import crontab
 
@@ -9,6 +10,28 @@ from celery.schedules import crontab
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/1")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/2")
 
+# Стадии анализа CV на отдельных очередях: extract (извлечение текста, CPU),
+# llm (ожидание ответа модели по каждому файлу, I/O), persist (сборка и запись в БД). Воркер, запущенный
+# ровно с одной очередью стадии (-Q extract), получает ее настройки, если они
+# не заданы в командной строке (--concurrency, --prefetch-multiplier)
+STAGE_WORKER_SETTINGS = {
+    "extract": {
+        "concurrency": int(os.getenv("CELERY_EXTRACT_CONCURRENCY", str(os.cpu_count() or 2))),
+        "prefetch_multiplier": int(os.getenv("CELERY_EXTRACT_PREFETCH", "1")),
+        # Разбор PDF фрагментирует память - процессы перезапускаются чаще
+        "max_tasks_per_child": int(os.getenv("CELERY_EXTRACT_MAX_TASKS_PER_CHILD", "100")),
+    },
+    "llm": {
+        # Задачи в основном ждут сеть: много слотов (лучше с -P threads)
+        "concurrency": int(os.getenv("CELERY_LLM_CONCURRENCY", "16")),
+        "prefetch_multiplier": int(os.getenv("CELERY_LLM_PREFETCH", "1")),
+    },
+    "persist": {
+        "concurrency": int(os.getenv("CELERY_PERSIST_CONCURRENCY", "4")),
+        "prefetch_multiplier": int(os.getenv("CELERY_PERSIST_PREFETCH", "8")),
+    },
+}
+
 # Create Celery app
 celery_app = Celery(
     "noa_metrics",
@@ -29,11 +52,17 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     
-    # Task routing - используем очередь по умолчанию
-    # task_routes={
-    #     "tasks.analysis_tasks.*": {"queue": "analysis"},
-    #     "tasks.maintenance_tasks.*": {"queue": "maintenance"}
-    # },
+    # Task routing: стадии анализа - на свои очереди, остальное - по модулям
+    task_routes={
+        "tasks.analysis_tasks.extract_analysis_stage": {"queue": "extract"},
+        "tasks.analysis_tasks.llm_file_analysis_stage": {"queue": "llm"},
+        "tasks.analysis_tasks.assemble_analysis_stage": {"queue": "persist"},
+        # Сравнение кандидатов - один запрос к модели, как и стадия llm
+        "tasks.analysis_tasks.compare_candidates_background": {"queue": "llm"},
+        "tasks.analysis_tasks.persist_analysis_stage": {"queue": "persist"},
+        "tasks.analysis_tasks.*": {"queue": "analysis"},
+        "tasks.maintenance_tasks.*": {"queue": "maintenance"}
+    },
     
     # Task execution
     task_always_eager=False,  # Set to True for testing
@@ -84,5 +113,35 @@ celery_app.conf.update(
     worker_task_log_format="[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s",
 )
 
+
+def configure_stage_worker(conf, argv):
+    """
+    Применяет STAGE_WORKER_SETTINGS к воркеру одной стадии.
+
+    Вызывается при импорте приложения (-A tasks.celery_app), до разбора
+    параметров команды worker: CLI берет из conf значения по умолчанию, а
+    явные --concurrency/--prefetch-multiplier/--max-tasks-per-child
+    по-прежнему важнее. Сигнал celeryd_init для этого не годится - к нему
+    prefetch_multiplier уже подставлен из conf как явный параметр
+    """
+    if "worker" not in argv:
+        return
+    queues = []
+    for i, arg in enumerate(argv):
+        if arg in ("-Q", "--queues") and i + 1 < len(argv):
+            queues += argv[i + 1].split(",")
+        elif arg.startswith("--queues="):
+            queues += arg[len("--queues="):].split(",")
+        elif arg.startswith("-Q") and len(arg) > 2:
+            queues += arg[2:].split(",")
+    queues = [queue for queue in queues if queue]
+    if len(queues) != 1 or queues[0] not in STAGE_WORKER_SETTINGS:
+        return
+    for setting, value in STAGE_WORKER_SETTINGS[queues[0]].items():
+        conf[f"worker_{setting}"] = value
+
+
+configure_stage_worker(celery_app.conf, sys.argv)
+
 if __name__ == "__main__":
     celery_app.start() 
\ No newline at end of file
@@ -4,14 +4,30 @@ Maintenance tasks for system upkeep
 import logging
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from tasks.celery_app import celery_app
 # from database.connection import db_session  # Commented out - not needed with Supabase SDK
 from database.models import CacheEntry, RateLimit, AuditLog, UploadedFile, User, Analysis
 from cache.redis_client import redis_cache
+from cv_analysis.timing import summarize_latency
+from supabase import create_client, Client
+from config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, LATENCY_REPORT_WINDOW_HOURS, LATENCY_REPORT_MAX_ROWS
 
 logger = logging.getLogger(__name__)
 
+# Supabase клиент создается при первом отчете: задачи обслуживания, которым
+# он не нужен, регистрируются и без настроенного Supabase
+_supabase: Optional[Client] = None
+
+
+def _get_supabase() -> Client:
+    global _supabase
+    if _supabase is None:
+        if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+            raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment variables")
+        _supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _supabase
+
 @celery_app.task
 def clean_expired_cache() -> Dict[str, Any]:
     """
@@ -206,52 +222,67 @@ def cleanup_old_audit_logs() -> Dict[str, Any]:
         raise exc
 
 @celery_app.task
-def generate_system_report() -> Dict[str, Any]:
+def generate_system_report(window_hours: int = LATENCY_REPORT_WINDOW_HOURS) -> Dict[str, Any]:
     """
-    Generate system usage report
+    Generate system usage report with p50/p95 analysis latency (total and per stage)
     """
     try:
-        with db_session() as session:
-            # Get statistics
-            total_users = session.query(User).count()
-            total_analyses = session.query(Analysis).count()
-            completed_analyses = session.query(Analysis).filter(
-                Analysis.status == "completed"
-            ).count()
-            failed_analyses = session.query(Analysis).filter(
-                Analysis.status == "failed"
-            ).count()
-            
-            # Get recent activity
-            last_24h = datetime.utcnow() - timedelta(days=1)
-            recent_analyses = session.query(Analysis).filter(
-                Analysis.created_at >= last_24h
-            ).count()
-            
-            # Get average processing time
-            avg_processing_time = session.query(Analysis).filter(
-                Analysis.processing_time.isnot(None)
-            ).with_entities(
-                session.query(Analysis.processing_time).avg()
-            ).scalar() or 0
-            
-            report = {
-                "status": "success",
-                "timestamp": datetime.utcnow().isoformat(),
-                "statistics": {
-                    "total_users": total_users,
-                    "total_analyses": total_analyses,
-                    "completed_analyses": completed_analyses,
-                    "failed_analyses": failed_analyses,
-                    "success_rate": (completed_analyses / total_analyses * 100) if total_analyses > 0 else 0,
-                    "recent_analyses_24h": recent_analyses,
-                    "avg_processing_time_seconds": round(avg_processing_time, 2)
-                }
+        supabase = _get_supabase()
+        
+        def count(table: str, **filters) -> int:
+            query = supabase.table(table).select("id", count="exact")
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            return query.limit(1).execute().count or 0
+        
+        # Get statistics
+        total_users = count("profiles")
+        total_analyses = count("analyses")
+        completed_analyses = count("analyses", status="completed")
+        failed_analyses = count("analyses", status="failed")
+        
+        # Get recent activity
+        last_24h = datetime.utcnow() - timedelta(days=1)
+        recent_analyses = supabase.table("analyses").select("id", count="exact") \
+            .gte("created_at", last_24h.isoformat()).limit(1).execute().count or 0
+        
+        # Время обработки и стадий завершенных анализов за окно отчета
+        since = datetime.utcnow() - timedelta(hours=window_hours)
+        rows = supabase.table("analyses").select("processing_time, stage_timings") \
+            .eq("status", "completed").gte("created_at", since.isoformat()) \
+            .order("created_at", desc=True).limit(LATENCY_REPORT_MAX_ROWS).execute().data or []
+        latency = summarize_latency(rows)
+        
+        # Среднее время обработки - по тем же анализам, что и перцентили
+        # (завершенные за окно, без legacy processing_time = 0). Прежний
+        # statistics.avg_processing_time_seconds считался по всем анализам за
+        # все время, поэтому метрика переименована, а не подменена
+        processing_times = [row["processing_time"] for row in rows if (row.get("processing_time") or 0) > 0]
+        avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0
+        
+        report = {
+            "status": "success",
+            "timestamp": datetime.utcnow().isoformat(),
+            "statistics": {
+                "total_users": total_users,
+                "total_analyses": total_analyses,
+                "completed_analyses": completed_analyses,
+                "failed_analyses": failed_analyses,
+                "success_rate": (completed_analyses / total_analyses * 100) if total_analyses > 0 else 0,
+                "recent_analyses_24h": recent_analyses
+            },
+            "latency": {
+                "window_hours": window_hours,
+                "sampled_analyses": len(rows),
+                "avg_processing_time_seconds": round(avg_processing_time, 2),
+                **latency
             }
-            
-            logger.info(f"Generated system report: {report['statistics']}")
-            
-            return report
+        }
+        
+        logger.info(f"Generated system report: {report['statistics']}, latency p50/p95: "
+                    f"{latency['processing_time']['p50']}/{latency['processing_time']['p95']}s")
+        
+        return report
             
     except Exception as exc:
         logger.error(f"Failed to generate system report: {exc}")
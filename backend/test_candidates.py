@@ -0,0 +1,88 @@
+"""
+Tests for loading analysed candidates for comparison
+====================================================
+"""
+
+from cv_analysis.candidates import ComparisonJobRegistry, candidate_results, load_candidates
+from test_response_cache import InMemoryRedisCache
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def execute(self):
+        self.client.queries.append(self.table)
+        rows = [row for row in self.client.rows[self.table] if all(f(row) for f in self.filters)]
+        return type("Response", (), {"data": rows})()
+
+
+class FakeClient:
+    def __init__(self, files, analyses):
+        self.rows = {"uploaded_files": files, "analyses": analyses}
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def file_row(file_id, analysis_id, path):
+    return {"id": file_id, "analysis_id": analysis_id, "filename": f"{file_id}.pdf", "file_path": path}
+
+
+def test_per_file_entry_is_used_and_analysis_fields_are_dropped():
+    results = {
+        "overall_score": 90, "best_file": "b.pdf", "analysis_metadata": {"total_files": 2},
+        "candidates": [
+            {"filename": "a.pdf", "file_path": "u/a", "status": "completed", "results": {"full_name": "A"}},
+            {"filename": "b.pdf", "file_path": "u/b", "status": "failed", "error": "timeout"},
+        ],
+    }
+    assert candidate_results(file_row("f1", "an", "u/a"), results) == {
+        "full_name": "A", "candidate_id": "f1", "filename": "f1.pdf",
+    }
+    assert candidate_results(file_row("f2", "an", "u/b"), results) is None
+
+
+def test_legacy_analysis_without_candidates_uses_the_whole_result():
+    results = {"full_name": "Old", "overall_score": 50, "analysis_metadata": {}}
+    data = candidate_results(file_row("f1", "an", "u/a"), results)
+    assert data == {"full_name": "Old", "overall_score": 50, "candidate_id": "f1", "filename": "f1.pdf"}
+    assert candidate_results(file_row("f1", "an", "u/a"), None) is None
+
+
+def test_load_candidates_is_batched_and_scoped_to_the_user():
+    client = FakeClient(
+        files=[file_row("f1", "an1", "u/a"), file_row("f2", "an2", "u/b"), file_row("f3", "an3", "u/c")],
+        analyses=[
+            {"id": "an1", "user_id": "me", "status": "completed", "results": {"full_name": "A"}},
+            {"id": "an2", "user_id": "other", "status": "completed", "results": {"full_name": "B"}},
+            {"id": "an3", "user_id": "me", "status": "processing", "results": None},
+        ],
+    )
+    candidates, missing = load_candidates(client, "me", ["f1", "f2", "f3", "f4", "f1"])
+    assert [c["candidate_id"] for c in candidates] == ["f1"]
+    assert missing == ["f2", "f3", "f4"]
+    assert client.queries == ["uploaded_files", "analyses"]
+    assert load_candidates(client, "me", []) == ([], [])
+
+
+def test_comparison_job_owner_is_known_only_for_registered_jobs():
+    jobs = ComparisonJobRegistry(cache=InMemoryRedisCache())
+    jobs.register("job-1", "me")
+    assert jobs.owner("job-1") == "me"
+    # Неизвестный (или истекший) id - владельца нет, хотя Celery вернет PENDING
+    assert jobs.owner("job-2") is None
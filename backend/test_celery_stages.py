@@ -0,0 +1,49 @@
+"""
+Tests for staged analysis queues and per-stage worker settings
+==============================================================
+"""
+
+from celery import Celery
+from celery.bin.base import CLIContext
+from celery.bin.worker import worker
+
+from tasks.celery_app import STAGE_WORKER_SETTINGS, celery_app, configure_stage_worker
+
+
+def queue_of(task_name):
+    return celery_app.amqp.router.route({}, task_name)["queue"].name
+
+
+def test_stage_tasks_are_routed_to_their_queues():
+    assert queue_of("tasks.analysis_tasks.extract_analysis_stage") == "extract"
+    assert queue_of("tasks.analysis_tasks.llm_file_analysis_stage") == "llm"
+    assert queue_of("tasks.analysis_tasks.assemble_analysis_stage") == "persist"
+    assert queue_of("tasks.analysis_tasks.compare_candidates_background") == "llm"
+    assert queue_of("tasks.analysis_tasks.persist_analysis_stage") == "persist"
+    assert queue_of("tasks.analysis_tasks.analyze_cv_background") == "analysis"
+    assert queue_of("tasks.maintenance_tasks.health_check") == "maintenance"
+
+
+def worker_options(*argv):
+    """Параметры команды worker в том виде, в каком их разбирает celery CLI"""
+    app = Celery("stage-test", set_as_current=False)
+    app.conf.worker_prefetch_multiplier = celery_app.conf.worker_prefetch_multiplier
+    configure_stage_worker(app.conf, ["celery", "-A", "tasks.celery_app", "worker", *argv])
+    ctx = worker.make_context("worker", list(argv), obj=CLIContext(app=app, no_color=True, workdir=None, quiet=True))
+    return ctx.params
+
+
+def test_single_stage_worker_gets_stage_settings_unless_set_on_command_line():
+    settings = STAGE_WORKER_SETTINGS["persist"]
+    options = worker_options("-Q", "persist")
+    assert options["prefetch_multiplier"] == settings["prefetch_multiplier"] != celery_app.conf.worker_prefetch_multiplier
+    assert options["concurrency"] == settings["concurrency"]
+
+    options = worker_options("-Qpersist", "--prefetch-multiplier", "3", "-c", "2")
+    assert (options["prefetch_multiplier"], options["concurrency"]) == (3, 2)
+
+
+def test_multi_queue_worker_keeps_app_settings():
+    options = worker_options("-Q", "celery,extract")
+    assert options["prefetch_multiplier"] == celery_app.conf.worker_prefetch_multiplier
+    assert options["concurrency"] is None
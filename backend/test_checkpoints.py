@@ -0,0 +1,76 @@
+"""
+Tests for analysis idempotency keys and run claims
+==================================================
+
+Redis is replaced with an in-memory stand-in, so these tests run offline.
+"""
+
+from cv_analysis.checkpoints import AnalysisRunRegistry, analysis_run_key, completed_run_key, file_checkpoint_key
+from cv_analysis.result_assembly import assemble_file_results, is_complete_assembly
+from test_single_flight import InMemoryLockingCache
+
+FILES = [{"id": "f1", "file_path": "u/a/cv.pdf"}, {"id": "f2", "file_path": "u/a/cv2.docx"}]
+
+
+def test_run_key_depends_on_inputs_not_on_file_order():
+    key = analysis_run_key("a", "Python developer", FILES)
+    assert key == analysis_run_key("a", "Python developer", list(reversed(FILES)))
+    assert key != analysis_run_key("a", "Go developer", FILES)
+    assert key != analysis_run_key("a", "Python developer", FILES[:1])
+    assert key != analysis_run_key("b", "Python developer", FILES)
+
+
+def test_file_checkpoint_key_changes_with_the_job_description():
+    key = file_checkpoint_key("u/a/cv.pdf", "Python developer")
+    assert key == file_checkpoint_key("u/a/cv.pdf", "Python developer")
+    assert key != file_checkpoint_key("u/a/cv.pdf", "Go developer")
+    assert key != file_checkpoint_key("u/b/cv.pdf", "Python developer")
+
+
+def analysed(run_key, *items):
+    results = assemble_file_results([
+        {"filename": f"cv{i}.pdf", "file_path": f"u/a/cv{i}.pdf", **item} for i, item in enumerate(items)
+    ])
+    results["analysis_metadata"] = {"run_key": run_key}
+    return results
+
+
+COMPLETE = {"results": {"overall_score": 80, "achievers_rating": {"overall_score": 16}}}
+
+
+def test_completed_run_key_comes_from_results_not_status():
+    key = analysis_run_key("a", "Python developer", FILES)
+    # /run и /retry уже сбросили статус, результат прошлого запуска на месте
+    analysis = {"status": "pending", "results": analysed(key, COMPLETE, COMPLETE)}
+    assert completed_run_key(analysis) == key
+    assert completed_run_key({"status": "pending", "results": None}) is None
+    assert completed_run_key({"status": "completed", "results": {"overall_score": 80}}) is None
+
+
+def test_errored_analysis_can_be_retried():
+    key = analysis_run_key("a", "Python developer", FILES)
+    # Ответ-заглушка после ошибки модели и файл, который не удалось разобрать
+    stub = {"results": {"full_name": "Unknown", "overall_score": 0, "summary": "Analysis failed due to technical error"}}
+    for results in (analysed(key, COMPLETE, stub), analysed(key, COMPLETE, {"error": "broken zip"})):
+        assert not is_complete_assembly(results)
+        assert completed_run_key({"status": "completed", "results": results}) is None
+
+
+def test_duplicate_enqueue_is_rejected_until_the_run_is_released():
+    runs = AnalysisRunRegistry(cache=InMemoryLockingCache())
+    assert runs.claim("run", "task-1")
+    assert not runs.claim("run", "task-2")
+    assert runs.owner("run") == "task-1"
+    runs.release("run")
+    assert runs.owner("run") is None
+    assert runs.claim("run", "task-3")
+    runs.release(None)
+    assert runs.owner("run") == "task-3"
+
+
+def test_claim_succeeds_when_redis_is_down():
+    cache = InMemoryLockingCache()
+    cache.is_connected = lambda: False
+    runs = AnalysisRunRegistry(cache=cache)
+    assert runs.claim("run", "task-1")
+    assert runs.claim("run", "task-2")
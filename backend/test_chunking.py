@@ -0,0 +1,80 @@
+"""
+Tests for token-budgeted map-reduce of long CV texts
+====================================================
+"""
+
+import json
+
+import cv_analysis.cv_analyzer as cv_analyzer_module
+from cv_analysis import CVAnalyzer
+from cv_analysis.chunking import split_into_chunks
+from cv_analysis.token_budget import estimate_tokens, truncate_to_tokens
+
+
+def make_cv_text(files=3, paragraphs=20):
+    texts = []
+    for f in range(files):
+        body = "\n\n".join(f"Job {p} at company {f}: " + "built things " * 20 for p in range(paragraphs))
+        texts.append(f"--- cv_{f}.pdf ---\n{body}")
+    return "\n\n".join(texts)
+
+
+def test_chunks_respect_token_budget_and_keep_all_text():
+    text = make_cv_text()
+    chunks = split_into_chunks(text, 300)
+    assert len(chunks) > 3
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    for f in range(3):
+        for p in range(20):
+            assert any(f"Job {p} at company {f}:" in chunk for chunk in chunks)
+
+
+def test_every_chunk_names_its_source_file():
+    chunks = split_into_chunks(make_cv_text(), 300)
+    assert all(chunk.startswith("--- cv_") for chunk in chunks)
+
+
+def test_overlong_line_is_split():
+    chunks = split_into_chunks("x" * 5000, 100)
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == "x" * 5000
+    chunks = split_into_chunks("." * 500, 100)
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+
+
+def test_truncate_to_tokens():
+    assert truncate_to_tokens("short", 10) == "short"
+    assert estimate_tokens(truncate_to_tokens("line\n" * 1000, 50)) <= 60
+
+
+def test_long_cv_is_summarized_in_parallel_and_reduced(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    monkeypatch.setattr(cv_analyzer_module, "CV_CHUNK_TOKENS", 400)
+    analyzer = CVAnalyzer()
+    prompts = []
+
+    def fake_request(prompt, max_retries=3, on_section=None, prompt_type="default"):
+        prompts.append((prompt, prompt_type))
+        return json.dumps({"section_summary": "short summary"})
+
+    monkeypatch.setattr(analyzer, "_make_mistral_request", fake_request)
+
+    short_text = "--- cv.pdf ---\nshort cv"
+    assert analyzer.condense_cv_text(short_text, 1000) == short_text
+    assert prompts == []
+
+    condensed = analyzer.condense_cv_text(make_cv_text(), 1000)
+    assert estimate_tokens(condensed) <= 1000
+    assert condensed.count("short summary") == len(prompts)
+    assert all(prompt_type == "summary" for _, prompt_type in prompts)
+
+
+def test_failed_summary_falls_back_to_chunk_text(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+
+    def failing_request(prompt, max_retries=3, on_section=None, prompt_type="default"):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(analyzer, "_make_mistral_request", failing_request)
+    assert analyzer._summarize_chunk(1, 1, "--- cv.pdf ---\nsome text") == "--- cv.pdf ---\nsome text"
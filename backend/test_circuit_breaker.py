@@ -0,0 +1,149 @@
+"""
+Tests for the shared Mistral circuit breaker
+============================================
+
+Redis is replaced with an in-memory stand-in, so these tests run offline.
+"""
+
+import asyncio
+
+import pytest
+
+from cv_analysis import CandidateComparisonMatrix, CVAnalyzer
+from cv_analysis.circuit_breaker import CircuitBreaker, CircuitOpenError
+from test_single_flight import InMemoryLockingCache
+
+
+class ExpiringCache(InMemoryLockingCache):
+    """Tracks TTLs so tests can expire the open state on demand"""
+
+    def __init__(self):
+        super().__init__()
+        self.ttls = {}
+
+    def set(self, key, value, expire=None):
+        self.ttls[key] = expire
+        return super().set(key, value, expire)
+
+    def set_nx(self, key, value, expire=None):
+        acquired = super().set_nx(key, value, expire)
+        if acquired:
+            self.ttls[key] = expire
+        return acquired
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+    def ttl(self, key):
+        return self.ttls.get(key) or -1
+
+    def expire_now(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(cache=ExpiringCache(), failure_threshold=3, reset_timeout=30)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state() == "open"
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after == 30
+
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state() == "closed"
+
+
+def test_half_open_allows_single_probe_and_closes_on_success(breaker):
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.cache.expire_now(breaker._open_key)
+
+    assert breaker.state() == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state() == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens(breaker):
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.cache.expire_now(breaker._open_key)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state() == "open"
+
+
+def test_analyzer_fails_fast_without_fallback_call(monkeypatch, breaker):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    analyzer.circuit_breaker = breaker
+    calls = []
+    monkeypatch.setattr(analyzer.client, "post", lambda *args: calls.append(args))
+    for _ in range(3):
+        breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        analyzer.analyze_cv_with_score("cv text", "job description")
+    assert calls == []
+
+
+def test_async_candidate_prompts_propagate_open_circuit(monkeypatch, breaker):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    comparison = CandidateComparisonMatrix()
+    comparison.analyzer.circuit_breaker = breaker
+    comparison.analyzer.response_cache.cache = ExpiringCache()
+    calls = []
+
+    async def apost(*args):
+        calls.append(args)
+
+    monkeypatch.setattr(comparison.analyzer.client, "apost", apost)
+    for _ in range(3):
+        breaker.record_failure()
+
+    candidates = [{"filename": "a.pdf", "overall_score": 80}]
+    # Открытый breaker - ошибка 503 в API, а не ответ {"error": ...} с кодом 200
+    for call in (
+        comparison.generate_comparison_matrix_async(candidates),
+        comparison.analyze_candidates_together_async(candidates),
+        comparison.get_hiring_recommendations_async(candidates),
+    ):
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(call)
+    assert calls == []
+
+
+def test_sync_candidate_prompts_fail_fast_on_open_circuit(monkeypatch, breaker):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    analyzer.circuit_breaker = breaker
+    calls = []
+    monkeypatch.setattr(analyzer.client, "post", lambda *args: calls.append(args))
+    for _ in range(3):
+        breaker.record_failure()
+
+    candidates = [{"filename": "a.pdf", "overall_score": 80}]
+    for method in (analyzer.analyze_multiple_candidates, analyzer.get_hiring_recommendations):
+        with pytest.raises(CircuitOpenError):
+            method(candidates)
+    assert calls == []
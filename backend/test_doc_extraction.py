@@ -0,0 +1,159 @@
+"""
+Tests for legacy .doc (Word 97-2003) text extraction
+====================================================
+"""
+
+import struct
+
+import pytest
+
+from cv_analysis.doc_extraction import iter_doc_parts_text
+from cv_analysis.parallel_extraction import extract_file
+
+SECTOR = 512
+MINI_SECTOR = 64
+MINI_CUTOFF = 4096
+FREE, END_OF_CHAIN, FAT_SECT = 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFFD
+TEXT_OFFSET = 1024
+DIR_SECTORS = 2
+
+
+def _pad(data, size):
+    return data + b"\0" * (-len(data) % size)
+
+
+def make_ole(streams):
+    """Минимальный OLE2-файл (версия 3): большие потоки в секторах, малые - в mini stream"""
+    # Сектор 0 - FAT, каталог - цепочка из DIR_SECTORS секторов с первого
+    fat = [FAT_SECT] + list(range(2, DIR_SECTORS + 1)) + [END_OF_CHAIN]
+    body = []
+    mini_stream, minifat, entries = b"", [], []
+
+    def chain(count):
+        start = len(fat)
+        fat.extend(range(start + 1, start + count))
+        fat.append(END_OF_CHAIN)
+        return start
+
+    small = {name: data for name, data in streams.items() if len(data) < MINI_CUTOFF}
+    for name, data in small.items():
+        start = len(mini_stream) // MINI_SECTOR
+        count = len(_pad(data, MINI_SECTOR)) // MINI_SECTOR
+        minifat.extend(range(start + 1, start + count))
+        minifat.append(END_OF_CHAIN)
+        mini_stream += _pad(data, MINI_SECTOR)
+        entries.append((name, 2, start, len(data)))
+
+    first_minifat = END_OF_CHAIN
+    if minifat:
+        first_minifat = chain(1)
+        body.append(_pad(struct.pack(f"<{len(minifat)}I", *minifat), SECTOR))
+    root_start = END_OF_CHAIN
+    if mini_stream:
+        root_start = chain(len(_pad(mini_stream, SECTOR)) // SECTOR)
+        body.append(_pad(mini_stream, SECTOR))
+    for name, data in streams.items():
+        if name not in small:
+            entries.append((name, 2, chain(len(_pad(data, SECTOR)) // SECTOR), len(data)))
+            body.append(_pad(data, SECTOR))
+
+    # Потоки с именем "хранилище/поток" лежат во вложенном хранилище
+    rows = [("Root Entry", 5, root_start, len(mini_stream))] + entries
+    if any("/" in name for name, *_ in entries):
+        rows.append(("ObjectPool", 1, 0, 0))
+    top = [index for index, (name, *_) in enumerate(rows) if index and "/" not in name]
+    nested = [index for index, (name, *_) in enumerate(rows) if "/" in name]
+    children = {0: top, len(rows) - 1: nested} if nested else {0: top}
+
+    directory = b""
+    for index, (name, kind, start, size) in enumerate(rows):
+        encoded = (name.split("/")[-1] + "\0").encode("utf-16-le")
+        siblings = nested if index in nested else top
+        position = siblings.index(index) if index in siblings else -1
+        right = siblings[position + 1] if 0 <= position < len(siblings) - 1 else FREE
+        child = children[index][0] if children.get(index) else FREE
+        directory += (
+            encoded.ljust(64, b"\0")
+            + struct.pack("<HBBIII", len(encoded), kind, 1, FREE, right, child)
+            + b"\0" * 36
+            + struct.pack("<III", start, size, 0)
+        )
+    assert len(directory) <= SECTOR * DIR_SECTORS
+
+    header = bytearray(SECTOR)
+    header[:8] = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+    struct.pack_into("<HHHHH", header, 0x18, 0x3E, 3, 0xFFFE, 9, 6)
+    struct.pack_into(
+        "<IIIIIIII", header, 0x2C,
+        1, 1, 0, MINI_CUTOFF, first_minifat, 1 if minifat else 0, END_OF_CHAIN, 0
+    )
+    struct.pack_into("<109I", header, 0x4C, 0, *[FREE] * 108)
+    fat_sector = struct.pack(f"<{SECTOR // 4}I", *(fat + [FREE] * (SECTOR // 4 - len(fat))))
+    return bytes(header) + fat_sector + directory.ljust(SECTOR * DIR_SECTORS, b"\0") + b"".join(body)
+
+
+def make_doc(pieces, table_padding=0, embedded=None):
+    """
+    .doc с таблицей кусков. pieces - список (текст, compressed): сжатые
+    куски хранятся в cp1252, остальные в UTF-16LE. embedded - потоки
+    вложенного хранилища, идущие в каталоге раньше потоков документа.
+    """
+    word = bytearray(TEXT_OFFSET)
+    struct.pack_into("<HHHHH", word, 0, 0xA5EC, 0xC1, 0, 0, 0x0200)
+    struct.pack_into("<H", word, 32, 14)
+    struct.pack_into("<H", word, 62, 22)
+    struct.pack_into("<H", word, 152, 93)
+
+    cps, pcds, cp = [0], b"", 0
+    for text, compressed in pieces:
+        offset = len(word)
+        if compressed:
+            word += text.encode("cp1252")
+            fc = 0x40000000 | (offset * 2)
+        else:
+            word += text.encode("utf-16-le")
+            fc = offset
+        cp += len(text)
+        cps.append(cp)
+        pcds += struct.pack("<HIH", 0, fc, 0)
+    plc = struct.pack(f"<{len(cps)}I", *cps) + pcds
+    table = b"\0" * 8 + b"\x02" + struct.pack("<I", len(plc)) + plc
+
+    struct.pack_into("<i", word, 76, cp)
+    struct.pack_into("<II", word, 154 + 33 * 8, 8, len(table) - 8)
+    word = bytes(word).ljust(MINI_CUTOFF + 100, b"\0")
+    streams = {f"ObjectPool/{name}": data for name, data in (embedded or {}).items()}
+    streams.update({"WordDocument": word, "1Table": table + b"\0" * table_padding})
+    return make_ole(streams)
+
+
+def test_compressed_text_is_split_into_paragraphs_without_field_codes():
+    data = make_doc([(
+        "Jane Doe\rSenior developer\x0bBerlin\r"
+        "\x13 HYPERLINK \"mailto:jane@example.com\" \x14jane@example.com\x15\r"
+        "Python\x07Django\x07\x07picture\x01 here\x1ewell-known\r",
+        True
+    )])
+
+    assert list(iter_doc_parts_text(data)) == [
+        "Jane Doe", "Senior developer", "Berlin", "jane@example.com",
+        "Python", "Django", "", "picture here-well-known",
+    ]
+
+
+def test_unicode_pieces_and_table_in_regular_sectors():
+    data = make_doc([("Опыт работы\r", False), ("Skills: SQL\r", True)], table_padding=MINI_CUTOFF)
+
+    assert list(iter_doc_parts_text(data)) == ["Опыт работы", "Skills: SQL"]
+
+
+def test_streams_of_embedded_objects_are_ignored():
+    data = make_doc([("Main CV\r", True)], embedded={"WordDocument": b"\0" * 5000, "1Table": b"\0" * 100})
+    assert list(iter_doc_parts_text(data)) == ["Main CV"]
+
+
+def test_extract_file_handles_doc_and_rejects_garbage():
+    assert extract_file("doc", make_doc([("Experience\rPython\r", True)])) == "Experience\nPython"
+    assert extract_file("doc", b"not a word document") == ""
+    with pytest.raises(ValueError):
+        list(iter_doc_parts_text(b"not a word document"))
@@ -0,0 +1,62 @@
+"""
+Tests for the streaming DOCX extractor
+======================================
+"""
+
+import io
+
+import docx
+
+from cv_analysis.docx_extraction import iter_part_text
+from cv_analysis.text_extraction import iter_docx_text
+
+
+def docx_bytes(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_tables_headers_and_footers_are_extracted():
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Jane Doe | jane@example.com"
+    document.sections[0].footer.paragraphs[0].text = "Page footer"
+    document.add_paragraph("Experience")
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "2020-2023"
+    table.cell(0, 1).text = "Backend developer"
+    table.cell(1, 0).text = "2018-2020"
+    document.add_paragraph("Skills")
+
+    lines = list(iter_docx_text(docx_bytes(document)))
+
+    assert lines == [
+        "Jane Doe | jane@example.com",
+        "Experience",
+        "2020-2023 | Backend developer",
+        "2018-2020 | ",
+        "Skills",
+        "Page footer",
+    ]
+
+
+def test_text_box_is_emitted_once_without_fallback_copy():
+    xml = b"""<w:document
+      xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+      xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"
+      xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape">
+      <w:body>
+        <w:p><w:r><w:t>Before</w:t></w:r><w:r><mc:AlternateContent>
+          <mc:Choice Requires="wps"><wps:txbx><w:txbxContent>
+            <w:p><w:r><w:t>Boxed contact</w:t></w:r></w:p>
+          </w:txbxContent></wps:txbx></mc:Choice>
+          <mc:Fallback><w:pict><w:txbxContent>
+            <w:p><w:r><w:t>Boxed contact</w:t></w:r></w:p>
+          </w:txbxContent></w:pict></mc:Fallback>
+        </mc:AlternateContent></w:r></w:p>
+        <w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>
+          <w:r><w:t>Name</w:t><w:tab/><w:t>Role</w:t><w:br/><w:t>Next</w:t></w:r></w:p>
+      </w:body>
+    </w:document>"""
+
+    assert list(iter_part_text(io.BytesIO(xml))) == ["Boxed contact", "Before", "Name\tRole\nNext"]
@@ -0,0 +1,92 @@
+"""
+Tests for streamed LLM responses and incremental JSON parsing
+=============================================================
+"""
+
+import json
+
+from cv_analysis import CVAnalyzer
+from cv_analysis.incremental_json import IncrementalJSONParser
+from cv_analysis.mistral_client import MistralClient
+from cv_analysis.partial_results import PartialResultStore
+from cv_analysis.response_cache import LLMResponseCache
+from test_response_cache import InMemoryRedisCache
+
+
+def feed_in_chunks(parser, text, size):
+    sections = []
+    for i in range(0, len(text), size):
+        sections.extend(parser.feed(text[i:i + size]))
+    return sections
+
+
+def test_sections_are_emitted_as_soon_as_they_close():
+    parser = IncrementalJSONParser()
+    assert parser.feed('```json\n{"experience_summary": {"full_name": "A"') == []
+    assert parser.feed('}, "achievers_rating": {"overall_score": 12},') == [
+        ("experience_summary", {"full_name": "A"}),
+        ("achievers_rating", {"overall_score": 12}),
+    ]
+    assert parser.feed(' "version": "1"}\n```') == [("version", "1")]
+    assert parser.done
+
+
+def test_braces_and_quotes_inside_strings_do_not_split_sections():
+    document = {
+        "overall_assessment": {"summary": 'uses "{braces}" and [brackets], commas'},
+        "recommendations": [{"suggestion": "a}b"}, {"suggestion": "c\\"}],
+        "match": 0.5,
+    }
+    text = json.dumps(document)
+    for size in (1, 3, 7, len(text)):
+        sections = feed_in_chunks(IncrementalJSONParser(), text, size)
+        assert dict(sections) == document
+
+
+def test_partial_store_round_trip():
+    class HashCache(InMemoryRedisCache):
+        def hset(self, name, key, value):
+            self.data.setdefault(name, {})[key] = value
+            return True
+
+        def hgetall(self, name):
+            return dict(self.data.get(name, {}))
+
+        def expire(self, key, seconds):
+            return True
+
+    store = PartialResultStore(cache=HashCache())
+    store.publish("a1", "achievers_rating", {"overall_score": 3})
+    assert store.get("a1") == {"achievers_rating": {"overall_score": 3}}
+    store.clear("a1")
+    assert store.get("a1") == {}
+
+
+def test_sse_lines_are_parsed():
+    assert MistralClient._parse_sse_line("") is None
+    assert MistralClient._parse_sse_line(": keep-alive") is None
+    assert MistralClient._parse_sse_line("data: [DONE]") == "[DONE]"
+    assert MistralClient._parse_sse_line('data: {"a": 1}') == {"a": 1}
+
+
+def test_analyzer_streams_sections_to_callback(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    analyzer.response_cache = LLMResponseCache(cache=InMemoryRedisCache())
+    document = json.dumps({"experience_summary": {"full_name": "A"}, "achievers_rating": {"overall_score": 4}})
+    payloads = []
+
+    def fake_post_stream(url, headers, payload):
+        payloads.append(payload)
+        for i in range(0, len(document), 5):
+            yield {"choices": [{"delta": {"content": document[i:i + 5]}}]}
+        yield {"choices": [], "usage": {"total_tokens": 10}}
+
+    monkeypatch.setattr(analyzer.client, "post_stream", fake_post_stream)
+    seen = []
+
+    content = analyzer._make_mistral_request("prompt", on_section=lambda key, value: seen.append(key))
+
+    assert json.loads(content) == json.loads(document)
+    assert payloads[0]["stream"] is True
+    assert seen == ["experience_summary", "achievers_rating"]
@@ -0,0 +1,124 @@
+"""
+Tests for cached job-description loading and the raw-PDF detector
+==================================================================
+"""
+
+import pytest
+
+from cv_analysis.job_description import (
+    JobDescriptionError, load_job_description, parse_requirements, storage_object_version
+)
+from cv_analysis.text_normalization import is_raw_pdf_garbage
+from cv_analysis.upload_index import UploadIndex, content_hash
+from test_response_cache import InMemoryRedisCache
+
+JOB_TEXT = """Senior Python Developer
+About us:
+We build hiring tools.
+Requirements:
+- 5+ years of Python
+- PostgreSQL
+Nice to have
+• Kubernetes
+Responsibilities
+1. Design APIs
+BENEFITS
+Remote work"""
+
+
+class FakePool:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def extract_text(self, file_type, data):
+        self.calls += 1
+        return self.text
+
+
+def test_requirements_are_parsed_by_section():
+    assert parse_requirements(JOB_TEXT) == {
+        "title": "Senior Python Developer",
+        "requirements": ["5+ years of Python", "PostgreSQL"],
+        "nice_to_have": ["Kubernetes"],
+        "responsibilities": ["Design APIs"],
+    }
+
+
+def test_job_description_is_cached_by_path_and_content():
+    index, pool, downloads = UploadIndex(cache=InMemoryRedisCache()), FakePool(JOB_TEXT), []
+
+    def download(path):
+        downloads.append(path)
+        return b"same pdf bytes"
+
+    def version(path):
+        return "etag-1"
+
+    first = load_job_description("u1/a1/jd.pdf", download, index=index, pool=pool, version=version)
+    again = load_job_description("u1/a1/jd.pdf", download, index=index, pool=pool, version=version)
+    reuploaded = load_job_description("u1/a2/jd.pdf", download, index=index, pool=pool, version=version)
+
+    assert first["text"].startswith("Senior Python Developer")
+    assert first["requirements"]["requirements"] == ["5+ years of Python", "PostgreSQL"]
+    assert again == first and reuploaded == first
+    # По пути - без скачивания; по содержимому - скачали, но не разбирали
+    assert downloads == ["u1/a1/jd.pdf", "u1/a2/jd.pdf"]
+    assert pool.calls == 1
+
+
+def test_raw_pdf_is_rejected_and_not_cached():
+    index = UploadIndex(cache=InMemoryRedisCache())
+    raw = "%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\nstream\nx\x9c\x01\x02\nendstream"
+    with pytest.raises(JobDescriptionError):
+        load_job_description("u1/a1/jd.pdf", lambda path: b"pdf", index=index, pool=FakePool(raw))
+    assert index.get_job_description_by_hash(content_hash(b"pdf")) is None
+
+
+def test_file_replaced_at_the_same_path_is_parsed_again():
+    index, pool = UploadIndex(cache=InMemoryRedisCache()), FakePool(JOB_TEXT)
+    storage = {"data": b"old pdf", "etag": "etag-1"}
+
+    def load(version):
+        return load_job_description(
+            "u1/a1/jd.pdf", lambda path: storage["data"], index=index, pool=pool, version=version
+        )
+
+    assert load(lambda path: storage["etag"])["text"].startswith("Senior Python Developer")
+    pool.text = "Go Developer\nRequirements:\n- Go"
+    storage.update(data=b"new pdf", etag="etag-2")
+    assert load(lambda path: storage["etag"])["text"].startswith("Go Developer")
+    # Без версии объекта путь не кэшируется: файл скачивается и сверяется по содержимому
+    storage["data"] = b"newest pdf"
+    pool.text = "Rust Developer"
+    assert load(None)["text"] == "Rust Developer"
+    assert pool.calls == 3
+
+
+def test_storage_object_version_reads_list_metadata():
+    calls = []
+
+    class Bucket:
+        def list(self, folder, options):
+            calls.append((folder, options))
+            return [
+                {"name": "jd.pdf.bak", "metadata": {"eTag": "other"}},
+                {"name": "jd.pdf", "updated_at": "2026-01-01", "metadata": {"eTag": "\"abc\""}},
+            ]
+
+    class BrokenBucket:
+        def list(self, folder, options):
+            raise IOError("storage down")
+
+    assert storage_object_version(Bucket(), "u1/a1/jd.pdf") == '"abc"'
+    assert calls == [("u1/a1", {"search": "jd.pdf"})]
+    assert storage_object_version(Bucket(), "u1/a1/missing.pdf") is None
+    assert storage_object_version(BrokenBucket(), "u1/a1/jd.pdf") is None
+
+
+def test_raw_pdf_detector():
+    assert is_raw_pdf_garbage("%PDF-1.7\n%\xe2\xe3\xcf\xd3")
+    assert is_raw_pdf_garbage("junk 4 0 obj /FlateDecode endobj xref trailer")
+    assert is_raw_pdf_garbage("\x01\x02\x03\x04 binary \x05\x06\x07\x08")
+    assert not is_raw_pdf_garbage("Jane Doe\nPython developer, 5 years")
+    assert not is_raw_pdf_garbage("")
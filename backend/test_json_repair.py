@@ -0,0 +1,59 @@
+"""
+Tests for local repair of malformed LLM JSON responses
+======================================================
+"""
+
+import json
+
+import pytest
+
+from cv_analysis.json_repair import parse_llm_json, repair_json
+
+
+def test_valid_json_is_clean():
+    assert parse_llm_json('{"a": 1}') == ({"a": 1}, "clean")
+
+
+def test_markdown_and_prose_are_stripped_without_changes():
+    text = 'Here is the analysis result:\n```json\n{"a": [1, 2]}\n```\nLet me know if you need more.'
+    assert parse_llm_json(text) == ({"a": [1, 2]}, "extracted")
+
+
+def test_trailing_commas_are_removed():
+    data, outcome = parse_llm_json('{"a": [1, 2,], "b": {"c": 3,},}')
+    assert data == {"a": [1, 2], "b": {"c": 3}}
+    assert outcome == "repaired"
+
+
+def test_unescaped_inner_quotes_are_escaped():
+    data, _ = parse_llm_json('{"summary": "Known as "Mr. Cloud" in the team", "score": 5}')
+    assert data == {"summary": 'Known as "Mr. Cloud" in the team', "score": 5}
+
+
+def test_raw_newlines_inside_strings_are_escaped():
+    data, _ = parse_llm_json('{"summary": "line one\nline two"}')
+    assert data == {"summary": "line one\nline two"}
+
+
+def test_truncated_string_is_closed():
+    data, _ = parse_llm_json('{"experience_summary": {"full_name": "John", "summary": "Senior eng')
+    assert data == {"experience_summary": {"full_name": "John", "summary": "Senior eng"}}
+
+
+def test_truncated_key_falls_back_to_last_complete_element():
+    data, _ = parse_llm_json('{"a": 1, "b": [1, 2], "overall_ass')
+    assert data == {"a": 1, "b": [1, 2]}
+
+
+def test_truncated_after_colon():
+    data, _ = parse_llm_json('{"a": {"b": 1, "c":')
+    assert data == {"a": {"b": 1}}
+
+
+def test_text_without_json_fails():
+    with pytest.raises(json.JSONDecodeError):
+        parse_llm_json("I'm sorry, I cannot analyze this CV.")
+
+
+def test_repair_reports_unmodified_extraction():
+    assert repair_json('prefix {"a": "b"} suffix') == ('{"a": "b"}', False)
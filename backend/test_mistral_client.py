@@ -0,0 +1,86 @@
+"""
+Tests for the pooled Mistral client and async CVAnalyzer variants
+=================================================================
+
+These tests do not call the real Mistral API: the HTTP layer is replaced
+with an in-process fake, so they run offline.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from cv_analysis import CVAnalyzer
+from cv_analysis.mistral_client import MistralClient
+
+
+DETAILED_RESPONSE = {
+    "experience_summary": {"full_name": "John Doe", "summary": "DevOps engineer"},
+    "achievers_rating": {"overall_score": 16, "skills": {"score": 8}, "experience_bonus": {"score": 4}},
+    "overall_assessment": {"match_score": 0.8, "strengths": ["AWS"], "weaknesses": []},
+    "recommendations": [{"suggestion": "Hire"}],
+}
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    return CVAnalyzer()
+
+
+async def test_async_client_is_reused_within_event_loop():
+    client = MistralClient()
+    first = client.get_async_client()
+    second = client.get_async_client()
+    assert first is second
+    await client.aclose()
+    assert client.get_async_client() is not first
+    await client.aclose()
+
+
+def test_sync_session_is_reused():
+    client = MistralClient()
+    assert client.session is client.session
+    client.close()
+
+
+async def test_analyze_cv_with_score_async_converts_detailed_result(analyzer, monkeypatch):
+    async def fake_request(prompt, max_retries=3, prompt_type="default"):
+        return json.dumps(DETAILED_RESPONSE)
+
+    monkeypatch.setattr(analyzer, "_make_mistral_request_async", fake_request)
+
+    result = await analyzer.analyze_cv_with_score_async("cv text", "job description")
+
+    assert result["full_name"] == "John Doe"
+    assert result["overall_score"] == 80
+    assert result["match_score"] == 80
+    assert result["recommendations"] == ["Hire"]
+
+
+async def test_async_calls_run_concurrently(analyzer, monkeypatch):
+    async def slow_request(prompt, max_retries=3, prompt_type="default"):
+        await asyncio.sleep(0.2)
+        return json.dumps({"summary": "ok"})
+
+    monkeypatch.setattr(analyzer, "_make_mistral_request_async", slow_request)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[analyzer.generate_comparison_matrix_async([{"id": i}]) for i in range(30)])
+    elapsed = time.perf_counter() - started
+
+    assert all(r == {"summary": "ok"} for r in results)
+    assert elapsed < 1.0
+
+
+async def test_async_candidates_prompt_reports_parse_failure(analyzer, monkeypatch):
+    async def bad_request(prompt, max_retries=3, prompt_type="default"):
+        return "not json at all"
+
+    monkeypatch.setattr(analyzer, "_make_mistral_request_async", bad_request)
+
+    result = await analyzer.get_hiring_recommendations_async([{"id": 1}])
+
+    assert result["error"] == "Failed to generate hiring recommendations"
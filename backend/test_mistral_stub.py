@@ -0,0 +1,108 @@
+"""
+Tests for the local Mistral-compatible stub server
+==================================================
+"""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from cv_analysis.mistral_client import MistralClient
+from mistral_stub import CANNED_ANALYSIS, RecordingStore, StubConfig, create_app, request_key
+
+
+def make_payload(prompt, stream=False):
+    return {"model": "m", "messages": [{"role": "user", "content": prompt}], "max_tokens": 10, "temperature": 0.1,
+            "stream": stream}
+
+
+def test_replays_recorded_response(tmp_path):
+    payload = make_payload("recorded prompt")
+    recorded = {"choices": [{"message": {"role": "assistant", "content": '{"ok": true}'}}], "usage": {"total_tokens": 3}}
+    RecordingStore(str(tmp_path)).save(request_key(payload), payload, recorded)
+    client = TestClient(create_app(StubConfig(recordings_dir=str(tmp_path))))
+
+    response = client.post("/v1/chat/completions", json=payload)
+
+    assert response.json() == recorded
+    assert client.get("/stats").json()["replayed"] == 1
+
+
+def test_unknown_request_gets_canned_analysis_or_404(tmp_path):
+    payload = make_payload("new prompt")
+    lenient = TestClient(create_app(StubConfig(recordings_dir=str(tmp_path))))
+    content = lenient.post("/v1/chat/completions", json=payload).json()["choices"][0]["message"]["content"]
+    assert json.loads(content) == CANNED_ANALYSIS
+
+    strict = TestClient(create_app(StubConfig(recordings_dir=str(tmp_path), strict=True)))
+    assert strict.post("/v1/chat/completions", json=payload).status_code == 404
+
+
+def test_faults_are_deterministic_per_seed(tmp_path):
+    def statuses(seed):
+        client = TestClient(create_app(StubConfig(recordings_dir=str(tmp_path), error_rate=0.3, rate_limit_rate=0.3, seed=seed)))
+        return [client.post("/v1/chat/completions", json=make_payload(f"p{i}")).status_code for i in range(30)]
+
+    first = statuses(7)
+    assert first == statuses(7)
+    assert {200, 429, 500} <= set(first)
+
+
+def test_rate_limited_response_has_retry_after(tmp_path):
+    client = TestClient(create_app(StubConfig(recordings_dir=str(tmp_path), rate_limit_rate=1.0, retry_after=3)))
+    response = client.post("/v1/chat/completions", json=make_payload("p"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_stream_reassembles_to_full_content(tmp_path):
+    client = TestClient(create_app(StubConfig(recordings_dir=str(tmp_path), stream_chunk_chars=7)))
+    response = client.post("/v1/chat/completions", json=make_payload("p", stream=True))
+
+    events = [MistralClient._parse_sse_line(line) for line in response.text.splitlines()]
+    events = [event for event in events if event is not None]
+    assert events[-1] == "[DONE]"
+    content = "".join(e["choices"][0]["delta"]["content"] for e in events[:-1] if e["choices"])
+    assert json.loads(content) == CANNED_ANALYSIS
+    assert events[-2]["usage"]["total_tokens"] > 0
+
+
+def test_cv_analyzer_runs_end_to_end_against_stub(tmp_path, monkeypatch):
+    import socket
+    import threading
+    import time
+
+    import uvicorn
+
+    from cv_analysis import CVAnalyzer
+    from cv_analysis.response_cache import LLMResponseCache
+    from test_response_cache import InMemoryRedisCache
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(StubConfig(recordings_dir=str(tmp_path), stream_chunk_chars=16)),
+        host="127.0.0.1", port=port, log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    try:
+        monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+        analyzer = CVAnalyzer()
+        analyzer.api_url = f"http://127.0.0.1:{port}/v1/chat/completions"
+        analyzer.response_cache = LLMResponseCache(cache=InMemoryRedisCache())
+        sections = []
+
+        result = analyzer.analyze_cv_with_score("Python developer, 5 years", "Backend role",
+                                                on_section=lambda key, value: sections.append(key))
+
+        assert result["full_name"] == "Stub Candidate"
+        assert result["overall_score"] == 60
+        assert "achievers_rating" in sections
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
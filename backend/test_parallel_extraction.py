@@ -0,0 +1,102 @@
+"""
+Tests for process-pool text extraction
+======================================
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cv_analysis.parallel_extraction import ExtractionJob, ExtractionPool
+from test_doc_extraction import make_doc
+from test_text_extraction import make_docx, make_pdf
+
+
+def make_jobs():
+    return [
+        ExtractionJob("big.pdf", "pdf", make_pdf(12)),
+        ExtractionJob("cv.docx", "docx", make_docx(2)),
+        ExtractionJob("missing.pdf", "pdf", error="download failed"),
+        ExtractionJob("old.doc", "doc", make_doc([("Legacy CV\r", True)])),
+        ExtractionJob("small.pdf", "PDF", make_pdf(1)),
+    ]
+
+
+def test_process_pool_keeps_file_order_and_matches_sequential():
+    pool = ExtractionPool(workers=2, pages_per_task=5, sandbox=False)
+    try:
+        parallel = pool.extract_files(make_jobs())
+    finally:
+        pool.shutdown()
+    sequential = ExtractionPool(workers=1, pages_per_task=5, sandbox=False).extract_files(make_jobs())
+    sandboxed = ExtractionPool(workers=2, pages_per_task=5, sandbox=True)
+    try:
+        assert sandboxed.extract_files(make_jobs()) == sequential
+    finally:
+        sandboxed.shutdown()
+
+    assert parallel == sequential
+    assert [text.split("\n")[0] for text in parallel] == [
+        "--- big.pdf ---", "--- cv.docx ---", "--- missing.pdf ---", "--- old.doc ---", "--- small.pdf ---"
+    ]
+    assert "[Error extracting text: download failed]" in parallel[2]
+    assert parallel[3] == "--- old.doc ---\nLegacy CV"
+
+
+def test_large_pdf_pages_stay_in_order_across_ranges():
+    text = ExtractionPool(workers=1, pages_per_task=5).extract_files([ExtractionJob("big.pdf", "pdf", make_pdf(12))])[0]
+    positions = [text.index(f"Page {i} experience") for i in range(1, 13)]
+    assert positions == sorted(positions)
+
+
+def test_page_cap_applies_across_ranges():
+    pool = ExtractionPool(workers=1, pages_per_task=5, max_pages=7)
+    text = pool.extract_files([ExtractionJob("big.pdf", "pdf", make_pdf(12))])[0]
+    assert "Page 7 experience" in text
+    assert "Page 8 experience" not in text
+
+
+def test_page_count_comes_from_the_first_range_task():
+    submitted = []
+
+    class RecordingPool(ExtractionPool):
+        def _submit(self, fn, *args):
+            submitted.append((fn.__name__, args[1:-1]))
+            return super()._submit(fn, *args)
+
+    RecordingPool(workers=1, pages_per_task=5).extract_files([ExtractionJob("big.pdf", "pdf", make_pdf(12))])
+    # Отдельной задачи подсчета страниц нет: первая задача сама возвращает их число
+    assert submitted == [("_extract_pdf_head", (5,)), ("_extract_pdf_range", (5, 5)), ("_extract_pdf_range", (10, 2))]
+
+
+def test_files_are_extracted_as_their_downloads_finish():
+    release_slow = threading.Event()
+    extracted = []
+
+    def download(name):
+        if name == "slow":
+            # Медленный файл ждет, пока быстрый уже разобран
+            assert release_slow.wait(5)
+        if name == "broken":
+            raise IOError("storage timeout")
+        return make_docx(1)
+
+    class RecordingPool(ExtractionPool):
+        def _submit_job(self, job):
+            extracted.append(job.filename)
+            if job.filename == "fast.docx":
+                release_slow.set()
+            return super()._submit_job(job)
+
+    with ThreadPoolExecutor(max_workers=3) as downloads:
+        jobs = [
+            ExtractionJob(f"{name}.docx", "docx", download=downloads.submit(download, name))
+            for name in ("slow", "fast", "broken")
+        ]
+        texts = RecordingPool(workers=1, sandbox=False).extract_files(jobs)
+
+    assert extracted == ["fast.docx", "slow.docx"]
+    assert texts == [
+        "--- slow.docx ---\nParagraph 1",
+        "--- fast.docx ---\nParagraph 1",
+        "--- broken.docx ---\n[Error extracting text: storage timeout]",
+    ]
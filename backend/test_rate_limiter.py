@@ -0,0 +1,131 @@
+"""
+Tests for the shared Mistral quota scheduler
+============================================
+
+The Lua token bucket runs inside Redis; here the Redis side is stubbed so
+the waiting and backoff logic can be checked offline.
+"""
+
+import asyncio
+
+import pytest
+
+from cv_analysis import CVAnalyzer
+from cv_analysis.comparison_matrix import CandidateComparisonMatrix
+from cv_analysis.rate_limiter import MistralRateLimiter, RateLimitTimeoutError
+
+
+class ScriptRecorder:
+    """Stands in for RedisCache.eval_script and returns queued replies"""
+
+    def __init__(self, replies=None):
+        self.replies = list(replies or [])
+        self.calls = []
+
+    def eval_script(self, script, keys, args):
+        self.calls.append(args)
+        return self.replies.pop(0) if self.replies else None
+
+
+def test_estimate_cost_counts_prompt_and_completion_budget():
+    limiter = MistralRateLimiter(cache=ScriptRecorder())
+    payload = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 1000}
+    assert limiter.estimate_cost(payload) == 1100
+
+
+def test_acquire_waits_until_quota_is_granted(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("cv_analysis.rate_limiter.time.sleep", sleeps.append)
+    limiter = MistralRateLimiter(cache=ScriptRecorder(["0.5", "0.25", "0"]))
+
+    limiter.acquire(100)
+
+    assert sleeps == [0.5, 0.25]
+
+
+def test_acquire_gives_up_after_max_wait(monkeypatch):
+    monkeypatch.setattr("cv_analysis.rate_limiter.time.sleep", lambda s: None)
+    limiter = MistralRateLimiter(cache=ScriptRecorder(["500"]), max_wait=10)
+
+    with pytest.raises(RateLimitTimeoutError):
+        limiter.acquire(100)
+
+
+def test_acquire_is_noop_without_redis():
+    limiter = MistralRateLimiter(cache=ScriptRecorder())
+    limiter.acquire(100)
+
+
+def test_429_sets_shared_cooldown_from_retry_after():
+    cache = ScriptRecorder(["7"])
+    limiter = MistralRateLimiter(cache=cache)
+
+    delay = limiter.backoff(0, status_code=429, retry_after=7.0)
+
+    # The pause is shared through Redis and enforced by the next acquire()
+    assert delay == 0.0
+    assert cache.calls[-1] == [7.0]
+
+
+def test_429_without_redis_sleeps_locally():
+    limiter = MistralRateLimiter(cache=ScriptRecorder())
+    assert limiter.backoff(0, status_code=429, retry_after=3.0) == 3.0
+
+
+def test_backoff_is_capped():
+    limiter = MistralRateLimiter(cache=ScriptRecorder(), backoff_base=1, backoff_max=4)
+    assert limiter.backoff(10) <= 6.0
+
+
+def test_parse_retry_after():
+    assert MistralRateLimiter.parse_retry_after({"Retry-After": "2"}) == 2.0
+    assert MistralRateLimiter.parse_retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert MistralRateLimiter.parse_retry_after(None) is None
+
+
+def test_analyzer_does_not_wait_again_in_fallback(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    waits = []
+
+    def acquire(cost):
+        waits.append(cost)
+        raise RateLimitTimeoutError("no quota")
+
+    monkeypatch.setattr(analyzer.rate_limiter, "acquire", acquire)
+
+    # Простой анализ после таймаута снова ждал бы квоту - ошибка уходит в повтор задачи
+    with pytest.raises(RateLimitTimeoutError):
+        analyzer.analyze_cv_with_score("cv text", "job description")
+    assert len(waits) == 1
+
+
+def test_comparison_paths_propagate_quota_timeout(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    comparison = CandidateComparisonMatrix()
+
+    def acquire(cost):
+        raise RateLimitTimeoutError("no quota")
+
+    async def acquire_async(cost):
+        raise RateLimitTimeoutError("no quota")
+
+    for limiter in (analyzer.rate_limiter, comparison.analyzer.rate_limiter):
+        monkeypatch.setattr(limiter, "acquire", acquire)
+        monkeypatch.setattr(limiter, "acquire_async", acquire_async)
+
+    candidates = [{"filename": "a.pdf", "overall_score": 80}]
+    # Нехватка квоты - повтор задачи сравнения или 503 в API, а не ответ {"error": ...}
+    for call in (
+        lambda: analyzer.generate_comparison_matrix(candidates),
+        lambda: comparison.generate_comparison_matrix(candidates),
+        lambda: asyncio.run(analyzer.generate_comparison_matrix_async(candidates)),
+        lambda: asyncio.run(analyzer.analyze_multiple_candidates_async(candidates)),
+        lambda: asyncio.run(analyzer.get_hiring_recommendations_async(candidates)),
+        lambda: asyncio.run(comparison.generate_comparison_matrix_async(candidates)),
+        lambda: asyncio.run(comparison.analyze_candidates_together_async(candidates)),
+        lambda: asyncio.run(comparison.get_hiring_recommendations_async(candidates)),
+    ):
+        with pytest.raises(RateLimitTimeoutError):
+            call()
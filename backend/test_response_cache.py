@@ -0,0 +1,114 @@
+"""
+Tests for the content-addressed LLM response cache
+==================================================
+
+Redis is replaced with an in-memory stand-in, so these tests run offline.
+"""
+
+import json
+
+from cv_analysis import CVAnalyzer
+from cv_analysis.response_cache import LLMResponseCache
+
+
+class InMemoryRedisCache:
+    """Minimal in-memory replacement for cache.redis_client.RedisCache"""
+
+    def __init__(self):
+        self.data = {}
+        self.sorted_sets = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value, expire=None):
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+    def incr(self, key, amount=1):
+        self.data[key] = int(self.data.get(key, 0)) + amount
+        return self.data[key]
+
+    def zadd(self, name, mapping):
+        self.sorted_sets.setdefault(name, {}).update(mapping)
+        return len(mapping)
+
+    def zcard(self, name):
+        return len(self.sorted_sets.get(name, {}))
+
+    def zpopmin(self, name, count=1):
+        members = sorted(self.sorted_sets.get(name, {}).items(), key=lambda item: item[1])[:count]
+        for member, _ in members:
+            del self.sorted_sets[name][member]
+        return [member for member, _ in members]
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self._content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}]}
+
+
+def make_payload(prompt, temperature=0.1):
+    return {"model": "m", "messages": [{"role": "user", "content": prompt}], "max_tokens": 10, "temperature": temperature}
+
+
+def test_key_is_stable_and_content_addressed():
+    cache = LLMResponseCache(cache=InMemoryRedisCache())
+    assert cache.make_key(make_payload("a")) == cache.make_key(make_payload("a"))
+    assert cache.make_key(make_payload("a")) != cache.make_key(make_payload("b"))
+
+
+def test_only_valid_json_is_cached():
+    cache = LLMResponseCache(cache=InMemoryRedisCache())
+    key = cache.make_key(make_payload("a"))
+    assert not cache.set(key, "not json")
+    assert cache.get(key) is None
+    assert cache.set(key, '{"ok": true}')
+    assert cache.get(key) == '{"ok": true}'
+
+
+def test_high_temperature_requests_are_not_cacheable():
+    cache = LLMResponseCache(cache=InMemoryRedisCache(), max_temperature=0.2)
+    assert cache.is_cacheable(make_payload("a", temperature=0.1))
+    assert not cache.is_cacheable(make_payload("a", temperature=0.9))
+
+
+def test_oldest_entries_are_evicted_over_size_cap():
+    store = InMemoryRedisCache()
+    cache = LLMResponseCache(cache=store, max_entries=2)
+    keys = [cache.make_key(make_payload(str(i))) for i in range(3)]
+    for key in keys:
+        cache.set(key, "{}")
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == "{}"
+    assert cache.stats()["entries"] == 2
+
+
+def test_analyzer_serves_repeated_prompt_from_cache(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    analyzer.response_cache = LLMResponseCache(cache=InMemoryRedisCache())
+    calls = []
+
+    def fake_post(url, headers, payload):
+        calls.append(payload)
+        return FakeResponse(json.dumps({"summary": "ok"}))
+
+    monkeypatch.setattr(analyzer.client, "post", fake_post)
+
+    first = analyzer._make_mistral_request("same prompt")
+    second = analyzer._make_mistral_request("same prompt")
+
+    assert first == second
+    assert len(calls) == 1
@@ -0,0 +1,51 @@
+"""
+Tests for assembling per-file analyses into one analysis result
+===============================================================
+"""
+
+from cv_analysis.result_assembly import assemble_file_results, file_section
+
+
+def analysis(score, name="Candidate"):
+    return {"full_name": name, "overall_score": score, "achievers_rating": {"overall_score": score / 5}}
+
+
+def test_single_file_keeps_the_top_level_format():
+    result = assemble_file_results([{"filename": "cv.pdf", "file_path": "u/cv.pdf", "results": analysis(70)}])
+    assert result["overall_score"] == 70
+    assert result["full_name"] == "Candidate"
+    assert result["best_file"] == "cv.pdf"
+    assert [c["status"] for c in result["candidates"]] == ["completed"]
+
+
+def test_best_complete_analysis_goes_to_the_top_level_and_order_is_kept():
+    stub = {"overall_score": 99, "error": "model unavailable"}
+    result = assemble_file_results([
+        {"filename": "a.pdf", "file_path": "u/a.pdf", "results": analysis(40, "A")},
+        {"filename": "b.docx", "file_path": "u/b.docx", "error": "Error extracting text: broken zip"},
+        {"filename": "c.pdf", "file_path": "u/c.pdf", "results": analysis(85, "C")},
+        {"filename": "d.pdf", "file_path": "u/d.pdf", "results": stub},
+    ])
+    assert result["full_name"] == "C"
+    assert result["best_file"] == "c.pdf"
+    assert [c["filename"] for c in result["candidates"]] == ["a.pdf", "b.docx", "c.pdf", "d.pdf"]
+    assert result["candidates"][1] == {
+        "filename": "b.docx", "file_path": "u/b.docx", "status": "failed",
+        "error": "Error extracting text: broken zip",
+    }
+    assert result["candidates"][3]["results"] is stub
+
+
+def test_ties_keep_the_first_file_and_all_failures_give_none():
+    result = assemble_file_results([
+        {"filename": "a.pdf", "results": analysis(60, "A")},
+        {"filename": "b.pdf", "results": analysis(60, "B")},
+    ])
+    assert result["best_file"] == "a.pdf"
+    assert assemble_file_results([{"filename": "a.pdf", "error": "timeout"}]) is None
+    assert assemble_file_results([]) is None
+
+
+def test_partial_sections_are_prefixed_only_for_multiple_files():
+    assert file_section("cv.pdf", "experience_summary", False) == "experience_summary"
+    assert file_section("cv.pdf", "experience_summary", True) == "cv.pdf:experience_summary"
@@ -0,0 +1,82 @@
+"""
+Tests for the supervised extraction sandbox
+===========================================
+"""
+
+import time
+
+import pytest
+
+from cv_analysis import parallel_extraction
+from cv_analysis.parallel_extraction import ExtractionJob, ExtractionPool
+from cv_analysis.sandbox import ExtractionLimitError, SandboxLimits, run_sandboxed
+
+
+def spin():
+    while True:
+        pass
+
+
+def sleep_forever():
+    time.sleep(3600)
+
+
+def allocate(mb):
+    return len(bytearray(mb * 1024 * 1024))
+
+
+def fail():
+    raise ValueError("broken xref")
+
+
+def hang_on_bad_data(file_type, data, max_chars):
+    if data == b"hang":
+        sleep_forever()
+    return ORIGINAL_EXTRACT_FILE(file_type, data, max_chars)
+
+
+ORIGINAL_EXTRACT_FILE = parallel_extraction.extract_file
+
+
+def test_result_is_returned_from_child():
+    assert run_sandboxed(sorted, [3, 1, 2]) == [1, 2, 3]
+
+
+def test_wall_clock_limit_kills_child():
+    started = time.monotonic()
+    with pytest.raises(ExtractionLimitError, match="wall-clock"):
+        run_sandboxed(sleep_forever, limits=SandboxLimits(timeout=0.5))
+    assert time.monotonic() - started < 5
+
+
+def test_cpu_limit_stops_spinning_child():
+    with pytest.raises(ExtractionLimitError, match="CPU"):
+        run_sandboxed(spin, limits=SandboxLimits(cpu_seconds=1, timeout=30))
+
+
+def test_memory_limit_stops_allocation():
+    with pytest.raises(ExtractionLimitError, match="memory"):
+        run_sandboxed(allocate, 400, limits=SandboxLimits(memory_mb=100))
+    assert run_sandboxed(allocate, 10, limits=SandboxLimits(memory_mb=100)) == 10 * 1024 * 1024
+
+
+def test_child_exception_is_reported():
+    with pytest.raises(ExtractionLimitError, match="ValueError: broken xref"):
+        run_sandboxed(fail)
+
+
+def test_runaway_file_fails_alone(monkeypatch):
+    # Дочерний процесс получает функцию через pickle - подмена должна быть
+    # функцией модульного уровня
+    monkeypatch.setattr(parallel_extraction, "extract_file", hang_on_bad_data)
+    pool = ExtractionPool(workers=2, sandbox=True, limits=SandboxLimits(timeout=1))
+    try:
+        texts = pool.extract_files([
+            ExtractionJob("bad.docx", "docx", b"hang"),
+            ExtractionJob("old.doc", "unknown", b"data"),
+        ])
+    finally:
+        pool.shutdown()
+
+    assert texts[0] == "--- bad.docx ---\n[Error extracting text: extraction exceeded the wall-clock limit (1s)]"
+    assert texts[1] == "--- old.doc ---\n[Unsupported file type: unknown]"
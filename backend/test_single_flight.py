@@ -0,0 +1,154 @@
+"""
+Tests for cross-worker coalescing of identical LLM requests
+===========================================================
+
+Redis is replaced with an in-memory stand-in, so these tests run offline.
+"""
+
+import asyncio
+import threading
+import time
+
+from cv_analysis.single_flight import CoalescedRequestError, SingleFlight
+from test_response_cache import InMemoryRedisCache
+
+
+class FakePubSub:
+    def subscribe(self, channel):
+        pass
+
+    def get_message(self, timeout=0.0):
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+class InMemoryLockingCache(InMemoryRedisCache):
+    """Adds the lock and pub/sub primitives used by SingleFlight"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def is_connected(self):
+        return True
+
+    def exists(self, key):
+        return key in self.data
+
+    def set_nx(self, key, value, expire=None):
+        with self._lock:
+            if key in self.data:
+                return False
+            self.data[key] = value
+            return True
+
+    def delete_if_equals(self, key, value):
+        with self._lock:
+            if self.data.get(key) == value:
+                del self.data[key]
+                return True
+            return False
+
+    def publish(self, channel, value):
+        return 0
+
+    def pubsub(self):
+        return FakePubSub()
+
+
+def test_concurrent_identical_calls_hit_upstream_once():
+    single_flight = SingleFlight(cache=InMemoryLockingCache(), poll_interval=0.01)
+    calls = []
+    results = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    def worker():
+        results.append(single_flight.run("key", upstream))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["answer"] * 5
+
+
+async def test_async_waiters_reuse_leader_result():
+    single_flight = SingleFlight(cache=InMemoryLockingCache(), poll_interval=0.01)
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    results = await asyncio.gather(*[single_flight.arun("key", upstream) for _ in range(10)])
+
+    assert len(calls) == 1
+    assert results == ["answer"] * 10
+
+
+async def test_leader_failure_is_propagated_to_waiters():
+    single_flight = SingleFlight(cache=InMemoryLockingCache(), poll_interval=0.01)
+
+    async def failing_upstream():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        *[single_flight.arun("key", failing_upstream) for _ in range(3)],
+        return_exceptions=True
+    )
+
+    assert isinstance(results[0], RuntimeError)
+    assert all(isinstance(r, CoalescedRequestError) for r in results[1:])
+
+
+async def test_waiters_do_not_get_the_previous_leaders_failure():
+    cache = InMemoryLockingCache()
+    single_flight = SingleFlight(cache=cache, poll_interval=0.01)
+
+    async def failing_upstream():
+        raise RuntimeError("upstream 500")
+
+    async def upstream():
+        await asyncio.sleep(0.1)
+        return "fresh"
+
+    try:
+        await single_flight.arun("key", failing_upstream)
+    except RuntimeError:
+        pass
+    # Ошибка прошлого лидера еще лежит в ключе результата (RESULT_TTL)
+    assert cache.get(single_flight._result_key("key"))["status"] == "error"
+
+    results = await asyncio.gather(*[single_flight.arun("key", upstream) for _ in range(3)])
+    assert results == ["fresh"] * 3
+
+
+def test_result_of_another_leader_is_ignored_while_the_lock_is_held():
+    cache = InMemoryLockingCache()
+    single_flight = SingleFlight(cache=cache)
+    cache.set(single_flight._result_key("key"), {"status": "error", "error": "old", "token": "old"})
+    cache.set_nx(single_flight._lock_key("key"), "new")
+
+    assert single_flight._poll("key") is SingleFlight._PENDING
+    single_flight._finish("key", "new", result="fresh")
+    assert single_flight._poll("key")["result"] == "fresh"
+
+
+def test_runs_directly_when_redis_is_unavailable():
+    cache = InMemoryLockingCache()
+    cache.is_connected = lambda: False
+    single_flight = SingleFlight(cache=cache)
+
+    assert single_flight.run("key", lambda: "direct") == "direct"
@@ -0,0 +1,67 @@
+"""
+Tests for streaming PDF/DOCX text extraction
+============================================
+"""
+
+import io
+
+import docx
+from reportlab.pdfgen import canvas
+
+from cv_analysis import CVAnalyzer
+from cv_analysis.text_extraction import PAGE_BREAK, collect_text, iter_docx_text, iter_pdf_text
+
+
+def make_pdf(pages):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for i in range(pages):
+        pdf.drawString(72, 720, f"Page {i + 1} experience")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def make_docx(paragraphs):
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(f"Paragraph {i + 1}")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_pdf_pages_are_yielded_lazily_up_to_cap():
+    pages = iter_pdf_text(make_pdf(5), max_pages=3)
+    assert "Page 1" in next(pages)
+    assert len(list(pages)) == 2
+
+
+def test_pdf_accepts_file_objects():
+    assert "Page 2" in list(iter_pdf_text(io.BytesIO(make_pdf(2)), max_pages=None))[1]
+
+
+def test_docx_paragraphs_are_yielded_in_order():
+    assert list(iter_docx_text(make_docx(3))) == ["Paragraph 1", "Paragraph 2", "Paragraph 3"]
+
+
+def test_collect_text_stops_reading_at_char_cap():
+    consumed = []
+
+    def pieces():
+        for i in range(100):
+            consumed.append(i)
+            yield "x" * 10
+
+    text = collect_text(pieces(), max_chars=35)
+    assert len(text) <= 35
+    assert len(consumed) == 4
+
+
+def test_analyzer_extraction_matches_previous_format(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    assert analyzer.extract_text_from_docx(make_docx(2)) == "Paragraph 1\nParagraph 2"
+    # Текст страницы, между страницами - PAGE_BREAK
+    assert analyzer.extract_text_from_pdf(make_pdf(2)) == f"Page 1 experience\n{PAGE_BREAK}Page 2 experience"
+    assert analyzer.extract_text_from_pdf(b"not a pdf") == ""
@@ -0,0 +1,58 @@
+"""
+Tests for pre-prompt text normalization
+=======================================
+"""
+
+from cv_analysis.text_extraction import PAGE_BREAK
+from cv_analysis.text_normalization import normalize_document, normalize_text
+
+
+def test_repeated_page_headers_and_page_numbers_are_removed():
+    pages = [
+        f"Jane Doe - Curriculum\n{body}\nPage {i} of 3"
+        for i, body in enumerate(["Experience at Acme", "Education at MIT", "Skills: Python"], start=1)
+    ]
+    assert normalize_text(PAGE_BREAK.join(pages)) == (
+        # Номер страницы убран, на месте разрыва страницы - пустая строка
+        "Jane Doe - Curriculum\nExperience at Acme\n\nEducation at MIT\n\nSkills: Python"
+    )
+
+
+def test_hyphenation_whitespace_and_noise():
+    text = "Led  the develop-\nment of   APIs\n\n\n\n-----\n•\nReferences available upon request"
+    assert normalize_text(text) == "Led the development of APIs"
+
+
+def test_duplicated_contacts_are_kept_once_but_ordinary_repeats_stay():
+    text = "jane@example.com\n+49 170 1234567\nPython\nDjango\nPython\njane@example.com\n+49 170 1234567"
+    assert normalize_text(text) == "jane@example.com\n+49 170 1234567\nPython\nDjango\nPython"
+
+
+def test_report_counts_saved_tokens():
+    text = PAGE_BREAK.join(f"ACME CONFIDENTIAL\nPage {i}\nProject {i} shipped" for i in range(10))
+    normalized, report = normalize_document(text)
+
+    assert normalized.count("ACME CONFIDENTIAL") == 1
+    assert report.tokens_saved > 0
+    assert report.as_dict()["tokens_saved"] == report.tokens_before - report.tokens_after
+
+
+def test_rows_that_differ_only_in_dates_are_kept():
+    text = "\n".join(f"{year}-{year + 2} | Developer" for year in (2014, 2016, 2018))
+    assert normalize_text(text) == text
+
+
+def test_repeated_lines_and_numbers_inside_pages_are_kept():
+    pages = [
+        "Jane Doe\nSkills\nPython\n5\nyears\nDjango\n5\nyears\nGo\n5\nyears\n1",
+        "Jane Doe\nProjects\nBilling\nPython\nCRM\nPython\nSearch\nPython\njane@example.com\n2",
+    ]
+    assert normalize_text(PAGE_BREAK.join(pages)) == (
+        "Jane Doe\nSkills\nPython\n5\nyears\nDjango\n5\nyears\nGo\n5\nyears\n\n"
+        "Projects\nBilling\nPython\nCRM\nPython\nSearch\nPython\njane@example.com"
+    )
+
+
+def test_text_without_page_breaks_keeps_repeated_lines():
+    text = "\n".join(f"ACME\nProject {i}" for i in range(4))
+    assert normalize_text(text) == text
@@ -0,0 +1,33 @@
+"""
+Tests for persisted extracted text
+==================================
+"""
+
+import cv_analysis.text_store as text_store
+from cv_analysis.parallel_extraction import ExtractionJob, ExtractionPool
+from cv_analysis.text_store import decode_extracted_text, encode_extracted_text
+
+
+def test_round_trip_compresses_text():
+    text = "Senior Python developer. Кириллица тоже. " * 200
+    stored = encode_extracted_text(text)
+    assert stored.startswith("cvtext:")
+    assert len(stored) < len(text) / 2
+    assert decode_extracted_text(stored) == text
+
+
+def test_other_extractor_version_is_ignored(monkeypatch):
+    stored = encode_extracted_text("old text")
+    monkeypatch.setattr(text_store, "EXTRACTOR_VERSION", "999")
+    assert decode_extracted_text(stored) is None
+
+
+def test_missing_legacy_or_corrupted_values_are_ignored():
+    assert decode_extracted_text(None) is None
+    assert decode_extracted_text("plain legacy text") is None
+    assert decode_extracted_text(f"cvtext:{text_store.extractor_tag()}:not-base64!") is None
+
+
+def test_stored_text_skips_extraction():
+    job = ExtractionJob("cv.pdf", "pdf", text="stored cv text")
+    assert ExtractionPool(workers=1).extract_files([job]) == ["--- cv.pdf ---\nstored cv text"]
@@ -0,0 +1,42 @@
+"""
+Tests for per-stage analysis timing and latency percentiles
+===========================================================
+"""
+
+from cv_analysis.timing import percentile, processing_time, stage_durations, summarize_latency
+
+MARKS = {"enqueued": 100.0, "started": 101.5, "downloaded": 103.0, "extracted": 104.0, "analyzed": 130.0, "persisted": 130.5}
+
+
+def test_stage_durations_add_up_to_processing_time():
+    durations = stage_durations(MARKS)
+    assert durations == {"queue_wait": 1.5, "download": 1.5, "extraction": 1.0, "llm": 26.0, "persist": 0.5}
+    assert processing_time(MARKS) == sum(durations.values()) == 30.5
+
+
+def test_stages_with_missing_marks_are_skipped():
+    marks = {key: value for key, value in MARKS.items() if key != "downloaded"}
+    assert set(stage_durations(marks)) == {"queue_wait", "llm", "persist"}
+    assert processing_time(marks) == 30.5
+    assert processing_time({"persisted": 1.0}) is None
+
+
+def test_percentile_interpolates_between_values():
+    values = [10.0, 1.0, 3.0, 2.0]
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 95) == 8.95
+    assert percentile([4.0], 95) == 4.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_latency_ignores_legacy_zero_processing_time():
+    rows = [
+        {"processing_time": 10.0, "stage_timings": {"llm": 8.0, "download": 1.0}},
+        {"processing_time": 20.0, "stage_timings": {"llm": 15.0, "unknown": 1.0}},
+        {"processing_time": 0, "stage_timings": None},
+    ]
+    summary = summarize_latency(rows)
+    assert summary["processing_time"] == {"count": 2, "p50": 15.0, "p95": 19.5}
+    assert summary["stages"]["llm"] == {"count": 2, "p50": 11.5, "p95": 14.65}
+    assert summary["stages"]["download"]["count"] == 1
+    assert summary["stages"]["persist"] == {"count": 0, "p50": None, "p95": None}
@@ -0,0 +1,50 @@
+"""
+Tests for prompt token estimation and dynamic max_tokens
+========================================================
+"""
+
+import pytest
+
+from cv_analysis import CVAnalyzer
+from cv_analysis.token_budget import PromptBudget, estimate_tokens
+
+
+def test_estimate_tracks_text_type():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("word " * 100) == 100
+    # Кириллица и JSON-разметка дороже латиницы той же длины
+    assert estimate_tokens("слово " * 100) > estimate_tokens("words " * 100)
+    assert estimate_tokens('{"a": [1, 2]}') >= 9
+
+
+def test_max_tokens_depends_on_prompt_type():
+    budget = PromptBudget(context_window=32000)
+    assert budget.max_tokens_for("short", "simple") < budget.max_tokens_for("short", "detailed")
+    assert budget.max_tokens_for("short", "unknown") == budget.output_limit("default")
+
+
+def test_max_tokens_shrinks_to_fit_window():
+    budget = PromptBudget(context_window=4000)
+    prompt = "word " * 2500
+    assert budget.max_tokens_for(prompt, "detailed") == int(4000 * 0.9) - 2500
+
+
+def test_prompt_larger_than_window_is_rejected_before_sending():
+    budget = PromptBudget(context_window=1000)
+    with pytest.raises(ValueError):
+        budget.max_tokens_for("word " * 2000, "simple")
+
+
+def test_detailed_prompt_is_trimmed_to_window(monkeypatch):
+    monkeypatch.setenv("MISTRAL_API_KEY", "test-key")
+    analyzer = CVAnalyzer()
+    analyzer.budget = PromptBudget(context_window=8000)
+    monkeypatch.setattr(analyzer, "condense_cv_text", lambda text, token_budget: text)
+
+    prompt = analyzer._fit_prompt(
+        lambda text: analyzer._build_detailed_prompt(text, "Python developer"), "experience " * 20000, "detailed"
+    )
+    _, data = analyzer._build_request(prompt, "detailed")
+
+    assert estimate_tokens(prompt) + data["max_tokens"] <= 8000
+    assert data["max_tokens"] == analyzer.budget.output_limit("detailed")
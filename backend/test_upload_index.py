@@ -0,0 +1,62 @@
+"""
+Tests for content-hash deduplication of uploads
+===============================================
+"""
+
+import cv_analysis.text_store as text_store
+import cv_analysis.upload_index as upload_index_module
+from cv_analysis.text_store import decode_extracted_text
+from cv_analysis.upload_index import UploadIndex, content_hash
+from test_response_cache import InMemoryRedisCache
+
+
+def test_same_content_maps_to_first_storage_object():
+    index = UploadIndex(cache=InMemoryRedisCache())
+    digest = content_hash(b"resume bytes")
+    assert digest == content_hash(b"resume bytes")
+    assert index.find_object("user-1", digest) is None
+
+    index.register_object("user-1", digest, "user-1/a1/cv.pdf")
+
+    assert index.find_object("user-1", digest) == "user-1/a1/cv.pdf"
+    # Индекс разделен по пользователям
+    assert index.find_object("user-2", digest) is None
+
+
+def test_text_is_shared_by_storage_object():
+    index = UploadIndex(cache=InMemoryRedisCache())
+    index.set_text("user-1/a1/cv.pdf", "extracted cv")
+    assert index.get_text("user-1/a1/cv.pdf") == "extracted cv"
+    assert index.get_text("user-1/a2/cv.pdf") is None
+
+
+def test_encoded_text_is_copied_to_duplicate_rows(monkeypatch):
+    index = UploadIndex(cache=InMemoryRedisCache())
+    index.set_text("user-1/a1/cv.pdf", "extracted cv")
+    # В строку дубликата пишется значение в формате колонки extracted_text
+    assert decode_extracted_text(index.get_encoded_text("user-1/a1/cv.pdf")) == "extracted cv"
+    assert index.get_encoded_text("user-1/a2/cv.pdf") is None
+    monkeypatch.setattr(text_store, "EXTRACTOR_VERSION", "next")
+    assert index.get_encoded_text("user-1/a1/cv.pdf") is None
+
+
+def test_result_requires_same_files_and_job_description():
+    index = UploadIndex(cache=InMemoryRedisCache())
+    index.set_result(["user-1/a1/cv.pdf"], "Python developer", {"overall_score": 80})
+
+    assert index.get_result(["user-1/a1/cv.pdf"], "Python developer") == {"overall_score": 80}
+    assert index.get_result(["user-1/a1/cv.pdf"], "Java developer") is None
+    assert index.get_result(["user-1/a1/cv.pdf", "user-1/a1/cv2.pdf"], "Python developer") is None
+
+
+def test_result_is_invalidated_by_new_extractor_or_prompt_version(monkeypatch):
+    index = UploadIndex(cache=InMemoryRedisCache())
+    index.set_result(["user-1/a1/cv.pdf"], "Python developer", {"overall_score": 80})
+
+    monkeypatch.setattr(upload_index_module, "PROMPT_TEMPLATE_VERSION", "next")
+    assert index.get_result(["user-1/a1/cv.pdf"], "Python developer") is None
+    monkeypatch.undo()
+    monkeypatch.setattr(upload_index_module, "extractor_tag", lambda: "v-next")
+    assert index.get_result(["user-1/a1/cv.pdf"], "Python developer") is None
+    monkeypatch.undo()
+    assert index.get_result(["user-1/a1/cv.pdf"], "Python developer") == {"overall_score": 80}